@@ -1,5 +1,5 @@
 from flask import Flask, render_template
-from datetime import datetime
+from pathlib import Path
 import os
 from dotenv import load_dotenv
 
@@ -12,25 +12,42 @@ def create_app():
     # Registrar blueprints
     from app.controllers.usuarios import bp as usuarios_bp
     from app.controllers.viajes import bp as viajes_bp
+    from app.controllers.salud import bp as salud_bp
     app.register_blueprint(usuarios_bp)
     app.register_blueprint(viajes_bp)
+    app.register_blueprint(salud_bp)
 
+    # Devolver la conexión MySQL al pool al terminar cada petición
+    from app.config.mysqlconnection import liberar_conexion, consultas_realizadas, registrar_resumen_peticion
+    app.teardown_appcontext(liberar_conexion)
+    app.teardown_request(registrar_resumen_peticion)
+
+    # En pruebas se informa cuántas consultas hizo cada petición
+    @app.after_request
+    def informar_consultas(response):
+        if app.testing:
+            response.headers['X-Consultas-DB'] = str(consultas_realizadas())
+        return response
     
-    # Filtro personalizado para formatear fechas
-    @app.template_filter('format_date')
-    def format_date(date_str):
-        if isinstance(date_str, str):
-            try:
-                date_obj = datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
-            except ValueError:
-                try:
-                    date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-                except ValueError:
-                    return date_str
-        else:
-            date_obj = date_str
-            
-        return date_obj.strftime('%d/%m/%Y')
+    # Filtro personalizado para formatear fechas: {{ fecha|format_date }} o
+    # {{ fecha|format_date('larga') }}. Las fechas llegan como objetos date y
+    # cada una se formatea una sola vez (ver app/config/fechas.py)
+    from app.config.fechas import formatear_fecha
+    app.add_template_filter(formatear_fecha, 'format_date')
+
+    # Fragmentos HTML de viajes compartidos entre usuarios: {% set f = fragmento_viaje(v) %}
+    from app.config.fragmentos import fragmento_viaje
+    app.add_template_global(fragmento_viaje)
+
+    # Forma parte de los ETag: al desplegar plantillas nuevas no se reutilizan
+    # las páginas que el navegador tenía guardadas
+    plantillas = Path(app.root_path, app.template_folder).glob('*.html')
+    app.config['VERSION_PLANTILLAS'] = str(max((p.stat().st_mtime_ns for p in plantillas), default=0))
+
+    # Eventos en vivo de los viajes: el servidor SSE valida la cookie de sesión
+    # de esta aplicación. Se inicia en cada worker (gunicorn.conf.py, server.py)
+    from app.config.servidor_eventos import servidor_eventos
+    servidor_eventos.configurar(app)
     
     @app.route('/')
     def index():
@@ -0,0 +1,84 @@
+# Índice invertido en memoria para la búsqueda de texto en desarrollo y pruebas,
+# cuando no se usa el índice FULLTEXT de MySQL (BUSQUEDA_BACKEND=memoria)
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from dotenv import load_dotenv
+
+load_dotenv()
+# "mysql" usa MATCH ... AGAINST sobre el índice FULLTEXT; "memoria" usa este índice
+BUSQUEDA_BACKEND = os.getenv("BUSQUEDA_BACKEND", "mysql")
+
+_PALABRAS = re.compile(r"\w+")
+# Igual que innodb_ft_min_token_size: las palabras más cortas no se indexan
+LONGITUD_MINIMA = 3
+
+
+def tokenizar(texto):
+    """Palabras en minúsculas y sin tildes, de al menos LONGITUD_MINIMA letras."""
+    texto = unicodedata.normalize("NFKD", (texto or "").lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return [p for p in _PALABRAS.findall(texto) if len(p) >= LONGITUD_MINIMA]
+
+
+class IndiceInvertido:
+    """
+    Índice palabra -> {id: frecuencia} con ranking TF-IDF. Seguro entre hilos;
+    se actualiza desde los métodos de escritura del modelo.
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(dict)
+        self._palabras_por_doc = {}
+        self._lock = threading.RLock()
+        self.construido = False
+
+    def agregar(self, doc_id, *textos):
+        palabras = defaultdict(int)
+        for texto in textos:
+            for palabra in tokenizar(texto):
+                palabras[palabra] += 1
+        with self._lock:
+            self._quitar(doc_id)
+            for palabra, frecuencia in palabras.items():
+                self._postings[palabra][doc_id] = frecuencia
+            self._palabras_por_doc[doc_id] = tuple(palabras)
+
+    def quitar(self, doc_id):
+        with self._lock:
+            self._quitar(doc_id)
+
+    def _quitar(self, doc_id):
+        for palabra in self._palabras_por_doc.pop(doc_id, ()):
+            docs = self._postings.get(palabra)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self._postings[palabra]
+
+    def buscar(self, texto, limite, desplazamiento=0):
+        """Ids ordenados por relevancia (y por id ante empates)."""
+        with self._lock:
+            total_docs = len(self._palabras_por_doc) or 1
+            puntajes = defaultdict(float)
+            for palabra in set(tokenizar(texto)):
+                docs = self._postings.get(palabra)
+                if not docs:
+                    continue
+                idf = math.log(1 + total_docs / len(docs))
+                for doc_id, frecuencia in docs.items():
+                    puntajes[doc_id] += (1 + math.log(frecuencia)) * idf
+        ordenados = sorted(puntajes.items(), key=lambda par: (-par[1], par[0]))
+        return [doc_id for doc_id, _ in ordenados[desplazamiento:desplazamiento + limite]]
+
+    def limpiar(self):
+        with self._lock:
+            self._postings.clear()
+            self._palabras_por_doc.clear()
+            self.construido = False
+
+
+indice_viajes = IndiceInvertido()
@@ -0,0 +1,222 @@
+# Caché de lectura para filas de viajes y usuarios
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+# Entradas máximas de la caché local del proceso y segundos de vida en el
+# backend compartido
+CACHE_MAX_ENTRADAS = int(os.getenv("CACHE_MAX_ENTRADAS", "2000"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+# Segundos de vida de la copia local. La invalidación solo borra la copia del
+# proceso que escribe (y la del backend): los demás workers pueden servir el
+# valor anterior hasta que venza la suya, así que se mantiene corta
+CACHE_TTL_LOCAL = float(os.getenv("CACHE_TTL_LOCAL", str(min(CACHE_TTL, 5))))
+# "" (solo local), "memoria" (backend compartido simulado) o una URL redis://
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "")
+
+# Valor centinela para distinguir "no está en caché" de un valor guardado
+FALTA = object()
+# Contadores de invalidación: cada clave cae en uno según su hash
+GENERACIONES = 1024
+
+
+def con_version(clave, version=None):
+    """
+    Clave atada a una versión de app/models/versiones.py. Las páginas con ETag
+    leen la caché con las mismas versiones con que arman el ETag, así el cuerpo
+    no mezcla datos de otra versión aunque la copia local de este proceso no se
+    haya enterado de la invalidación; al subir la versión la entrada vieja deja
+    de leerse y vence sola.
+    """
+    return clave if version is None else f"{clave}:{version}"
+
+
+class CacheLRU:
+    """
+    Caché en memoria acotada por número de entradas (LRU) y con vencimiento por
+    tiempo (TTL). Segura entre hilos.
+    """
+
+    def __init__(self, max_entradas=CACHE_MAX_ENTRADAS, ttl=CACHE_TTL):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.expulsiones = 0
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return FALTA
+            vence, valor = entrada
+            if vence < time.monotonic():
+                del self._datos[clave]
+                return FALTA
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor, ttl=None):
+        vence = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._datos[clave] = (vence, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self.expulsiones += 1
+
+    def delete(self, *claves):
+        with self._lock:
+            for clave in claves:
+                self._datos.pop(clave, None)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+
+# Backends compartidos entre procesos. Guardan bytes y deben ofrecer
+# get(clave) -> bytes | None, set(clave, bytes, ttl) y delete(*claves).
+
+
+class BackendMemoria:
+    """Backend compartido simulado en memoria, para pruebas y desarrollo local."""
+
+    def __init__(self):
+        self._cache = CacheLRU(max_entradas=CACHE_MAX_ENTRADAS * 10)
+
+    def get(self, clave):
+        valor = self._cache.get(clave)
+        return None if valor is FALTA else valor
+
+    def set(self, clave, valor, ttl):
+        self._cache.set(clave, valor, ttl)
+
+    def delete(self, *claves):
+        self._cache.delete(*claves)
+
+
+class BackendRedis:
+    """Backend compartido sobre Redis (requiere el paquete opcional `redis`)."""
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis:// requiere instalar el paquete 'redis'") from e
+        self._cliente = redis.Redis.from_url(url)
+
+    def get(self, clave):
+        return self._cliente.get(clave)
+
+    def set(self, clave, valor, ttl):
+        self._cliente.set(clave, valor, ex=max(1, int(ttl)))
+
+    def delete(self, *claves):
+        if claves:
+            self._cliente.delete(*claves)
+
+
+def crear_backend(config=CACHE_BACKEND):
+    if not config:
+        return None
+    if config == "memoria":
+        return BackendMemoria()
+    if config.startswith(("redis://", "rediss://")):
+        return BackendRedis(config)
+    raise ValueError(f"CACHE_BACKEND no reconocido: {config}")
+
+
+class Cache:
+    """
+    Caché de lectura de dos niveles: LRU local del proceso y, opcionalmente,
+    un backend compartido. Lleva contadores de aciertos, fallos y expulsiones.
+    """
+
+    def __init__(self, backend=None, max_entradas=CACHE_MAX_ENTRADAS, ttl=CACHE_TTL, ttl_local=CACHE_TTL_LOCAL):
+        self.backend = backend
+        self.ttl = ttl
+        self.local = CacheLRU(max_entradas, ttl_local)
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock_contadores = threading.Lock()
+        self._generaciones = [0] * GENERACIONES
+        self._lock_generaciones = threading.Lock()
+
+    def get(self, clave):
+        valor = self.local.get(clave)
+        if valor is FALTA and self.backend is not None:
+            crudo = self.backend.get(clave)
+            if crudo is not None:
+                valor = pickle.loads(crudo)
+                self.local.set(clave, valor)
+        # += no es atómico entre hilos: sin el lock se pierden cuentas
+        with self._lock_contadores:
+            if valor is FALTA:
+                self.fallos += 1
+            else:
+                self.aciertos += 1
+        return valor
+
+    def set(self, clave, valor):
+        self.local.set(clave, valor)
+        if self.backend is not None:
+            self.backend.set(clave, pickle.dumps(valor), self.ttl)
+
+    def invalidar(self, *claves):
+        with self._lock_generaciones:
+            for clave in claves:
+                self._generaciones[hash(clave) % GENERACIONES] += 1
+        self.local.delete(*claves)
+        if self.backend is not None:
+            self.backend.delete(*claves)
+
+    def generacion(self, clave):
+        """Contador de invalidaciones de la clave; se toma antes de leer de la base."""
+        return self._generaciones[hash(clave) % GENERACIONES]
+
+    def guardar_si_vigente(self, clave, valor, generacion):
+        """
+        Guarda el valor solo si la clave no se invalidó desde que se tomó
+        generacion: lo leído antes de una escritura no debe quedar en caché
+        después de ella. Las invalidaciones de otros procesos no se ven aquí;
+        esas las acota el TTL.
+        """
+        with self._lock_generaciones:
+            if self._generaciones[hash(clave) % GENERACIONES] != generacion:
+                return False
+            self.set(clave, valor)
+            return True
+
+    def obtener_o_cargar(self, clave, cargar):
+        """Lectura a través de la caché: si la clave no está, llama a cargar() y guarda el resultado (salvo None/False)."""
+        valor = self.get(clave)
+        if valor is FALTA:
+            generacion = self.generacion(clave)
+            valor = cargar()
+            if valor is not None and valor is not False:
+                self.guardar_si_vigente(clave, valor, generacion)
+        return valor
+
+    def estadisticas(self):
+        with self._lock_contadores:
+            aciertos, fallos = self.aciertos, self.fallos
+        total = aciertos + fallos
+        return {
+            "aciertos": aciertos,
+            "fallos": fallos,
+            "tasa_aciertos": round(aciertos / total, 3) if total else 0.0,
+            "expulsiones": self.local.expulsiones,
+            "entradas_locales": len(self.local),
+            "backend": type(self.backend).__name__ if self.backend else None,
+        }
+
+
+cache = Cache(crear_backend())
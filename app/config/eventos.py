@@ -0,0 +1,131 @@
+# Publicación de eventos de los viajes (uniones, salidas, ediciones) para las
+# páginas abiertas, que los reciben por server-sent events
+# (ver app/config/servidor_eventos.py).
+#
+# Los modelos publican en un canal por viaje ("viaje:<id>") después de
+# escribir; quien escucha recibe (canal, mensaje JSON). El backend decide el
+# alcance: el local solo reparte dentro del proceso y Redis reparte entre todos
+# los workers y máquinas.
+import json
+import logging
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+# "" (bus local del proceso) o una URL redis://
+EVENTOS_BACKEND = os.getenv("EVENTOS_BACKEND", "")
+# Prefijo de los canales en Redis, por si se comparte el servidor
+EVENTOS_PREFIJO = os.getenv("EVENTOS_PREFIJO", "viajes:eventos:")
+
+logger = logging.getLogger("app.eventos")
+
+
+# Backends del bus. Deben ofrecer publicar(canal, mensaje) y
+# escuchar(entregar), donde entregar(canal, mensaje) se llama con cada mensaje
+# publicado (por cualquier proceso, si el backend es compartido).
+
+
+class BackendLocal:
+    """Bus dentro del proceso: para desarrollo y despliegues de un solo worker."""
+
+    def __init__(self):
+        self._entregar = None
+
+    def publicar(self, canal, mensaje):
+        if self._entregar is not None:
+            self._entregar(canal, mensaje)
+
+    def escuchar(self, entregar):
+        self._entregar = entregar
+
+
+class BackendRedis:
+    """Bus compartido sobre Redis pub/sub (requiere el paquete opcional `redis`)."""
+
+    def __init__(self, url, prefijo=EVENTOS_PREFIJO):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("EVENTOS_BACKEND=redis:// requiere instalar el paquete 'redis'") from e
+        self._cliente = redis.Redis.from_url(url)
+        self.prefijo = prefijo
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def publicar(self, canal, mensaje):
+        self._cliente.publish(self.prefijo + canal, mensaje)
+
+    def escuchar(self, entregar):
+        # Un solo hilo por proceso recibe todos los canales (psubscribe); los
+        # hilos no sobreviven al fork, así que se arranca en cada worker
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._recibir, args=(entregar,), name="eventos-redis", daemon=True).start()
+
+    def _recibir(self, entregar):
+        while True:
+            try:
+                suscripcion = self._cliente.pubsub(ignore_subscribe_messages=True)
+                suscripcion.psubscribe(self.prefijo + "*")
+                for mensaje in suscripcion.listen():
+                    canal = mensaje["channel"].decode()[len(self.prefijo):]
+                    entregar(canal, mensaje["data"].decode())
+            except Exception as e:
+                logger.warning("Bus de eventos: se perdió la conexión con Redis: %s", e)
+                time.sleep(1)
+
+
+def crear_backend(config=EVENTOS_BACKEND):
+    if not config:
+        return BackendLocal()
+    if config.startswith(("redis://", "rediss://")):
+        return BackendRedis(config)
+    raise ValueError(f"EVENTOS_BACKEND no reconocido: {config}")
+
+
+class Eventos:
+    """
+    Pub/sub de eventos de la aplicación. Publicar nunca hace fallar la
+    escritura que lo origina: un error del bus solo se registra.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._oyentes = []
+        self._lock = threading.Lock()
+        self.publicados = 0
+        self.errores = 0
+
+    def escuchar(self, oyente):
+        # oyente(canal, mensaje) corre en el hilo que entrega: debe ser rápido
+        with self._lock:
+            if oyente not in self._oyentes:
+                self._oyentes = self._oyentes + [oyente]
+        self.backend.escuchar(self._entregar)
+
+    def dejar(self, oyente):
+        with self._lock:
+            self._oyentes = [o for o in self._oyentes if o != oyente]
+
+    def _entregar(self, canal, mensaje):
+        for oyente in self._oyentes:
+            try:
+                oyente(canal, mensaje)
+            except Exception:
+                logger.exception("Error al entregar un evento de %s", canal)
+
+    def publicar(self, canal, tipo, **datos):
+        mensaje = json.dumps({"tipo": tipo, **datos}, default=str)
+        try:
+            self.backend.publicar(canal, mensaje)
+            self.publicados += 1
+        except Exception as e:
+            self.errores += 1
+            logger.warning("No se pudo publicar el evento %s de %s: %s", tipo, canal, e)
+
+
+eventos = Eventos(crear_backend())
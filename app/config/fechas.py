@@ -0,0 +1,71 @@
+# Formato de fechas para las plantillas. Las fechas llegan de MySQL como
+# objetos date/datetime, así que mostrar un listado no requiere parsear texto:
+# cada fecha distinta se formatea una sola vez y queda en caché.
+import os
+from datetime import date, datetime
+from functools import lru_cache
+from dotenv import load_dotenv
+
+load_dotenv()
+# Idioma por defecto de los textos de fecha
+LOCALE_FECHAS = os.getenv("LOCALE_FECHAS", "es")
+
+# Nombres de los meses por idioma (sin depender del locale del sistema operativo)
+MESES = {
+    "es": ("enero", "febrero", "marzo", "abril", "mayo", "junio", "julio",
+           "agosto", "septiembre", "octubre", "noviembre", "diciembre"),
+    "en": ("January", "February", "March", "April", "May", "June", "July",
+           "August", "September", "October", "November", "December"),
+}
+
+# Estilos de formato por idioma: "corta" (03/05/2026) y "larga" (3 de mayo de 2026)
+FORMATOS = {
+    "es": {
+        "corta": "{d:02d}/{m:02d}/{a}",
+        "larga": "{d} de {mes} de {a}",
+    },
+    "en": {
+        "corta": "{m:02d}/{d:02d}/{a}",
+        "larga": "{mes} {d}, {a}",
+    },
+}
+
+
+@lru_cache(maxsize=4096)
+def _formatear(dia, estilo, locale):
+    formatos = FORMATOS.get(locale) or FORMATOS["es"]
+    meses = MESES.get(locale) or MESES["es"]
+    plantilla = formatos.get(estilo) or formatos["corta"]
+    return plantilla.format(d=dia.day, m=dia.month, a=dia.year, mes=meses[dia.month - 1])
+
+
+@lru_cache(maxsize=1024)
+def fecha_desde_texto(texto):
+    """Convierte 'AAAA-MM-DD' o 'AAAA-MM-DD HH:MM:SS' en date; None si no es una fecha."""
+    try:
+        return date.fromisoformat(texto[:10])
+    except ValueError:
+        return None
+
+
+def formatear_fecha(valor, estilo="corta", locale=LOCALE_FECHAS):
+    """
+    Texto de la fecha en el estilo e idioma pedidos. Acepta date y datetime
+    (se muestra solo el día); el texto solo se parsea como compatibilidad.
+    """
+    if isinstance(valor, datetime):
+        valor = valor.date()
+    elif not isinstance(valor, date):
+        if not isinstance(valor, str):
+            return valor
+        dia = fecha_desde_texto(valor)
+        if dia is None:
+            return valor
+        valor = dia
+    return _formatear(valor, estilo, locale)
+
+
+def estadisticas():
+    """Aciertos y fallos de la caché de formato (para el micro-benchmark)."""
+    info = _formatear.cache_info()
+    return {"aciertos": info.hits, "fallos": info.misses, "entradas": info.currsize}
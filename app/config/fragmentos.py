@@ -0,0 +1,30 @@
+# Caché de fragmentos HTML de los viajes: título, descripción recortada y
+# fechas formateadas son iguales para todos los usuarios, así que se renderizan
+# una vez por viaje. La clave lleva una huella de los datos que se muestran
+# y de las plantillas (fragmento:viaje:<id>:<huella>): el fragmento siempre
+# corresponde al viaje recién leído, aunque otro worker lo haya editado, y no
+# hace falta invalidarlo.
+import hashlib
+
+from flask import current_app
+from markupsafe import Markup
+
+from app.config.cache import cache, FALTA
+
+PLANTILLA = "_fragmento_viaje.html"
+PARTES = ("encabezado", "fecha_inicio", "fecha_fin")
+
+
+def fragmento_viaje(viaje):
+    """Partes HTML del viaje: {{ f.encabezado }}, {{ f.fecha_inicio }} y {{ f.fecha_fin }}."""
+    datos = (current_app.config.get("VERSION_PLANTILLAS", ""), viaje.titulo, viaje.descripcion,
+             viaje.fecha_inicio, viaje.fecha_fin)
+    huella = hashlib.sha1(repr(datos).encode("utf-8")).hexdigest()[:16]
+    clave = f"fragmento:viaje:{viaje.id}:{huella}"
+    partes = cache.get(clave)
+    if partes is FALTA:
+        modulo = current_app.jinja_env.get_template(PLANTILLA).make_module({"v": viaje})
+        # Se guarda como texto para que también sirva con un backend compartido
+        partes = {parte: str(getattr(modulo, parte)) for parte in PARTES}
+        cache.set(clave, partes)
+    return {parte: Markup(html) for parte, html in partes.items()}
@@ -1,7 +1,19 @@
 # Importamos la librería pymysql para interactuar con MySQL
 import pymysql.cursors
+from pymysql.constants import SERVER_STATUS
+import logging
 import os
+import itertools
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
 from dotenv import load_dotenv
+from flask import g, has_app_context, has_request_context, request, session
+
+from app.config.sentencias import Sentencia, enviar_sentencia, olvidar_preparadas
 
 load_dotenv(".env")
 MYSQL_HOST = os.getenv("MYSQL_HOST")
@@ -9,18 +21,62 @@ MYSQL_PORT = int(os.getenv("MYSQL_PORT"))
 MYSQL_USER = os.getenv("MYSQL_USER")
 MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
 MYSQL_DB = os.getenv("MYSQL_DB")
+# Máximo de conexiones abiertas por proceso y segundos que se espera por una libre
+MYSQL_POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "10"))
+MYSQL_POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", "5"))
+# Consultas que tarden al menos estos milisegundos se registran como lentas (0 desactiva)
+MYSQL_SLOW_QUERY_MS = float(os.getenv("MYSQL_SLOW_QUERY_MS", "200"))
+# Réplicas de lectura como "host:puerto,host:puerto" (vacío: todo va a la primaria)
+MYSQL_REPLICAS = os.getenv("MYSQL_REPLICAS", "")
+# Segundos que una réplica que falló queda fuera de la rotación
+MYSQL_REPLICA_PAUSA = float(os.getenv("MYSQL_REPLICA_PAUSA", "30"))
+# Retraso de replicación tolerado y cada cuántos segundos se mide (0 no lo mide)
+MYSQL_REPLICA_MAX_RETRASO = float(os.getenv("MYSQL_REPLICA_MAX_RETRASO", "10"))
+MYSQL_REPLICA_CHEQUEO = float(os.getenv("MYSQL_REPLICA_CHEQUEO", "15"))
+# Segundos que un usuario lee de la primaria después de escribir, para ver lo que escribió
+MYSQL_LEER_PRIMARIA = float(os.getenv("MYSQL_LEER_PRIMARIA", "5"))
 
+# Registro de consultas: DEBUG muestra cada consulta, INFO el resumen por petición
+# y WARNING las consultas lentas. Nunca se registran los parámetros.
+logger = logging.getLogger("app.db")
 
-# Esta clase proporciona una instancia para conectarse a la base de datos MySQL
 
+class PoolAgotadoError(Exception):
+    """Se lanza cuando no se obtiene una conexión libre dentro del tiempo de espera."""
 
-class MySQLConnection:
-    # Método constructor que recibe el nombre de la base de datos como parámetro
-    def __init__(self, db):
+
+class ReplicaNoDisponible(Exception):
+    """Se lanza cuando una réplica está demasiado atrasada para atender lecturas."""
+
+
+# Errores que indican que el servidor no responde (y no un problema de la consulta)
+ERRORES_CONEXION = (pymysql.err.OperationalError, pymysql.err.InterfaceError, OSError)
+
+
+# Pool de conexiones acotado y seguro entre hilos. Las conexiones se reutilizan
+# en lugar de abrir un socket nuevo (TCP + autenticación) en cada consulta.
+
+
+class ConnectionPool:
+    def __init__(self, max_size=MYSQL_POOL_SIZE, timeout=MYSQL_POOL_TIMEOUT, host=MYSQL_HOST, port=MYSQL_PORT):
+        self.host = host
+        self.port = port
+        self.max_size = max_size
+        self.timeout = timeout
+        self._libres = deque()
+        self._en_uso = 0
+        self._condicion = threading.Condition()
+        # Contadores para estadísticas
+        self._esperas = 0
+        self._tiempo_espera = 0.0
+        self._creadas = 0
+        self._reconexiones = 0
+
+    def _crear_conexion(self):
         # Configuración de la conexión, se pueden ajustar el usuario, la contraseña y otros parámetros según sea necesario
         connection = pymysql.connect(
-            host=MYSQL_HOST,  # Dirección del servidor de la base de datos
-            port=MYSQL_PORT,  # Puerto de la base de datos
+            host=self.host,  # Dirección del servidor de la base de datos
+            port=self.port,  # Puerto de la base de datos
             user=MYSQL_USER,  # Nombre de usuario de la base de datos
             password=MYSQL_PASSWORD,  # Contraseña del usuario de la base de datos
             db=MYSQL_DB,  # Nombre de la base de datos
@@ -29,43 +85,545 @@ class MySQLConnection:
             cursorclass=pymysql.cursors.DictCursor,
             autocommit=True,
         )  # Realiza automáticamente un commit después de cada consulta
-        # Se almacena la conexión establecida en un atributo de la clase
-        self.connection = connection
+        self._creadas += 1
+        return connection
 
-    # Método para ejecutar consultas SQL en la base de datos
-    # Recibe una consulta SQL (query) y opcionalmente datos (data) para consultas parametrizadas
-    def query_db(self, query, data=None):
-        with self.connection.cursor() as cursor:
+    def obtener(self):
+        """
+        Entrega una conexión sana del pool. Si no hay libres y se alcanzó el
+        máximo, espera hasta `timeout` segundos a que otra sea devuelta.
+        """
+        inicio = time.perf_counter()
+        with self._condicion:
+            esperado = False
+            while not self._libres and self._en_uso >= self.max_size:
+                esperado = True
+                restante = self.timeout - (time.perf_counter() - inicio)
+                if restante <= 0:
+                    raise PoolAgotadoError(
+                        f"No hay conexiones libres tras {self.timeout}s (máximo {self.max_size})"
+                    )
+                self._condicion.wait(restante)
+            if esperado:
+                self._esperas += 1
+                self._tiempo_espera += time.perf_counter() - inicio
+            connection = self._libres.pop() if self._libres else None
+            self._en_uso += 1
+
+        try:
+            if connection is None:
+                connection = self._crear_conexion()
+            else:
+                # Verifica la salud de la conexión y reconecta si el enlace se cayó
+                try:
+                    connection.ping(reconnect=False)
+                except Exception:
+                    connection.ping(reconnect=True)
+                    olvidar_preparadas(connection)
+                    self._reconexiones += 1
+        except Exception:
+            with self._condicion:
+                self._en_uso -= 1
+                self._condicion.notify()
+            raise
+        return connection
+
+    def devolver(self, connection, descartar=False):
+        """
+        Devuelve una conexión al pool. Una transacción que quedó abierta (un
+        BEGIN sin commit, o autocommit desactivado) se deshace antes de
+        reutilizarla. Con `descartar=True`, o si falla el rollback, se cierra.
+        """
+        if not descartar:
+            try:
+                # server_status dice si el servidor tiene una transacción abierta;
+                # get_autocommit() solo informa la configuración de la sesión
+                if connection.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                    connection.rollback()
+                if connection.get_autocommit() is False:
+                    connection.rollback()
+                    connection.autocommit(True)
+            except Exception:
+                descartar = True
+        if descartar:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        with self._condicion:
+            self._en_uso -= 1
+            if not descartar:
+                self._libres.append(connection)
+            self._condicion.notify()
+
+    def cerrar(self):
+        """Cierra todas las conexiones libres."""
+        with self._condicion:
+            while self._libres:
+                try:
+                    self._libres.pop().close()
+                except Exception:
+                    pass
+
+    def reiniciar_tras_fork(self):
+        """
+        En el proceso hijo de un fork: olvida las conexiones heredadas sin
+        cerrarlas (el socket sigue siendo del padre) y crea un lock nuevo.
+        """
+        self._libres = deque()
+        self._en_uso = 0
+        self._condicion = threading.Condition()
+        self._esperas = 0
+        self._tiempo_espera = 0.0
+        self._creadas = 0
+        self._reconexiones = 0
+
+    def estadisticas(self):
+        """Estado actual del pool: conexiones en uso, libres y tiempo total de espera."""
+        with self._condicion:
+            return {
+                "max": self.max_size,
+                "en_uso": self._en_uso,
+                "libres": len(self._libres),
+                "creadas": self._creadas,
+                "reconexiones": self._reconexiones,
+                "esperas": self._esperas,
+                "tiempo_espera_ms": round(self._tiempo_espera * 1000, 3),
+            }
+
+
+# Réplicas de lectura. Cada una tiene su propio pool y queda fuera de la
+# rotación por MYSQL_REPLICA_PAUSA segundos si no responde o si su retraso de
+# replicación supera MYSQL_REPLICA_MAX_RETRASO.
+
+
+def medir_retraso(columnas, fila):
+    """
+    Segundos de retraso según una fila de SHOW REPLICA STATUS. None si no se
+    sabe (el servidor no es réplica); infinito si la replicación está detenida.
+    """
+    if not fila:
+        return None
+    retraso = dict(zip(columnas, fila)).get("Seconds_Behind_Source")
+    return float("inf") if retraso is None else float(retraso)
+
+
+class Replica:
+    CONSULTA_RETRASO = "SHOW REPLICA STATUS"
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.nombre = f"{host}:{port}"
+        self.pool = ConnectionPool(host=host, port=port)
+        self.fuera_hasta = 0.0
+        self.retraso = None
+        self.fallos = 0
+        self._proximo_chequeo = 0.0
+
+    def disponible(self):
+        return time.monotonic() >= self.fuera_hasta
+
+    def marcar_caida(self, motivo):
+        """Saca la réplica de la rotación por MYSQL_REPLICA_PAUSA segundos."""
+        self.fuera_hasta = time.monotonic() + MYSQL_REPLICA_PAUSA
+        self.fallos += 1
+        logger.warning("Réplica %s fuera de la rotación por %.0f s: %s", self.nombre, MYSQL_REPLICA_PAUSA, motivo)
+
+    def toca_chequeo(self):
+        # True una vez cada MYSQL_REPLICA_CHEQUEO segundos
+        ahora = time.monotonic()
+        if not MYSQL_REPLICA_CHEQUEO or ahora < self._proximo_chequeo:
+            return False
+        self._proximo_chequeo = ahora + MYSQL_REPLICA_CHEQUEO
+        return True
+
+    def registrar_retraso(self, retraso):
+        """Guarda el retraso medido; devuelve False (y la saca de la rotación) si es excesivo."""
+        self.retraso = retraso
+        if retraso is not None and retraso > MYSQL_REPLICA_MAX_RETRASO:
+            self.marcar_caida(f"retraso de replicación de {retraso} s")
+            return False
+        return True
+
+    def obtener(self):
+        """Conexión del pool de la réplica, verificando de vez en cuando su retraso."""
+        try:
+            connection = self.pool.obtener()
+        except ERRORES_CONEXION as e:
+            self.marcar_caida(e)
+            raise
+        if self.toca_chequeo():
+            try:
+                with connection.cursor(pymysql.cursors.Cursor) as cursor:
+                    cursor.execute(self.CONSULTA_RETRASO)
+                    retraso = medir_retraso([c[0] for c in cursor.description or ()], cursor.fetchone())
+            except Exception:
+                # Sin permiso REPLICATION CLIENT no se puede medir
+                retraso = None
+            if not self.registrar_retraso(retraso):
+                self.pool.devolver(connection)
+                raise ReplicaNoDisponible(f"{self.nombre} atrasada {retraso} s")
+        return connection
+
+    def estadisticas(self):
+        return {
+            "disponible": self.disponible(),
+            "retraso_s": self.retraso,
+            "fallos": self.fallos,
+            "pool": self.pool.estadisticas(),
+        }
+
+
+class Replicas:
+    """Conjunto de réplicas con balanceo round-robin entre las disponibles."""
+
+    def __init__(self, servidores):
+        self.lista = [Replica(host, port) for host, port in servidores]
+        self._turno = itertools.count()
+
+    def __bool__(self):
+        return bool(self.lista)
+
+    def elegir(self):
+        """Siguiente réplica disponible, o None si ninguna lo está."""
+        for _ in range(len(self.lista)):
+            replica = self.lista[next(self._turno) % len(self.lista)]
+            if replica.disponible():
+                return replica
+        return None
+
+    def cerrar(self):
+        for replica in self.lista:
+            replica.pool.cerrar()
+
+    def reiniciar_tras_fork(self):
+        for replica in self.lista:
+            replica.pool.reiniciar_tras_fork()
+
+    def estadisticas(self):
+        return {replica.nombre: replica.estadisticas() for replica in self.lista}
+
+
+def _servidores(texto):
+    # "host:puerto,host" -> [(host, puerto)]; sin puerto se usa MYSQL_PORT
+    servidores = []
+    for servidor in filter(None, (s.strip() for s in texto.split(","))):
+        host, _, puerto = servidor.partition(":")
+        servidores.append((host, int(puerto) if puerto else MYSQL_PORT))
+    return servidores
+
+
+pool = ConnectionPool()
+replicas = Replicas(_servidores(MYSQL_REPLICAS))
+# Con preload los workers nacen por fork del proceso maestro: cada uno abre
+# sus propias conexiones en lugar de compartir sockets con el padre
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=pool.reiniciar_tras_fork)
+    os.register_at_fork(after_in_child=replicas.reiniciar_tras_fork)
+
+
+# Enrutamiento de lecturas. Solo las lecturas de una petición van a réplicas:
+# los scripts, las transacciones y las lecturas posteriores a una escritura
+# usan la primaria. Tras escribir, la sesión guarda hasta cuándo el usuario lee
+# de la primaria, así la redirección siguiente ya muestra lo que guardó.
+
+
+def replica_para_lectura():
+    """Réplica para las lecturas de la petición actual, o None si van a la primaria."""
+    if not replicas or not has_request_context() or g.get("db_escritura"):
+        return None
+    hasta = session.get("_leer_primaria_hasta")
+    if hasta and hasta > time.time():
+        return None
+    # Todas las lecturas de una petición van a la misma réplica
+    if "replica_lectura" not in g:
+        replica = replicas.elegir()
+        if replica is None:
+            return None
+        g.replica_lectura = replica
+    return g.replica_lectura
+
+
+def marcar_escritura():
+    """Envía a la primaria las lecturas siguientes de la petición y del usuario."""
+    if replicas and has_request_context():
+        g.db_escritura = True
+        session["_leer_primaria_hasta"] = time.time() + MYSQL_LEER_PRIMARIA
+
+
+def soltar_replica(descartar=False):
+    """Devuelve la conexión de réplica de la petición; la próxima lectura elige de nuevo."""
+    replica = g.pop("replica_lectura", None)
+    connection = g.pop("mysql_replica", None)
+    if connection is not None:
+        replica.pool.devolver(connection, descartar)
+
+
+# Esta clase proporciona una instancia para conectarse a la base de datos MySQL
+
+
+class MySQLConnection:
+    # Método constructor que recibe el nombre de la base de datos como parámetro.
+    # Con primaria=True también las lecturas van a la primaria
+    def __init__(self, db, primaria=False):
+        self.db = db
+        self.primaria = primaria
+        # Último id generado (o fijado con LAST_INSERT_ID(expr)) por una sentencia
+        # y filas que afectó
+        self.lastrowid = None
+        self.filas_afectadas = None
+        # Conexión reservada mientras hay una transacción abierta
+        self._transaccion = None
+
+    @property
+    def connection(self):
+        if self._transaccion is not None:
+            return self._transaccion
+        # Dentro de una petición se reutiliza la misma conexión hasta el teardown
+        if has_app_context():
+            if "mysql_connection" not in g:
+                g.mysql_connection = pool.obtener()
+            return g.mysql_connection
+        return pool.obtener()
+
+    def _liberar(self, connection, descartar=False):
+        # Fuera de una petición (scripts) la conexión se devuelve tras cada consulta
+        if self._transaccion is None and not has_app_context():
+            pool.devolver(connection, descartar)
+
+    def _conexion_lectura(self):
+        # (conexión, réplica) para una lectura; réplica None si va a la primaria
+        replica = None
+        if not self.primaria and self._transaccion is None:
+            replica = replica_para_lectura()
+        if replica is None:
+            return self.connection, None
+        try:
+            if "mysql_replica" not in g:
+                g.mysql_replica = replica.obtener()
+            return g.mysql_replica, replica
+        except Exception as e:
+            # Réplica caída, atrasada o sin conexiones libres: se lee de la primaria
+            logger.warning("Lectura desviada a la primaria desde %s: %s", replica.nombre, e)
+            g.pop("replica_lectura", None)
+            return self.connection, None
+
+    def _correr(self, connection, query, data, resultado, cursorclass, varias):
+        # Ejecuta la sentencia (con executemany si `varias`) y devuelve resultado(cursor)
+        try:
+            with connection.cursor(cursorclass) as cursor:
+                inicio = time.perf_counter()
+                try:
+                    if isinstance(query, Sentencia):
+                        enviar_sentencia(connection, cursor, query, data, varias)
+                    elif varias:
+                        cursor.executemany(query, data)
+                    else:
+                        cursor.execute(query, data)
+                    self.lastrowid = cursor.lastrowid
+                    self.filas_afectadas = cursor.rowcount
+                    return resultado(cursor)
+                finally:
+                    registrar_consulta(query, time.perf_counter() - inicio, cursor.rowcount)
+        finally:
+            # La conexión no se cierra: vuelve al pool para reutilizarse
+            self._liberar(connection)
+
+    def _ejecutar(self, query, data, resultado, cursorclass=None, varias=False, lectura=False):
+        # Las lecturas pueden ir a una réplica; las escrituras van a la primaria.
+        # Fuera de una transacción los errores se registran y se devuelve False;
+        # dentro de una transacción se propagan para que se haga rollback.
+        if lectura:
+            connection, replica = self._conexion_lectura()
+        else:
+            connection, replica = self.connection, None
+        try:
             try:
-                # Si deseas depurar, imprime la consulta generada con mogrify
-                if data:
-                    print("Running Query:", cursor.mogrify(query, data))
+                valor = self._correr(connection, query, data, resultado, cursorclass, varias)
+                # Solo una escritura que cambió filas manda a la primaria las
+                # lecturas siguientes: una unión repetida no debe desviarlas
+                if not lectura and self.filas_afectadas > 0:
+                    marcar_escritura()
+                return valor
+            except ERRORES_CONEXION as e:
+                if replica is None:
+                    raise
+                # La réplica dejó de responder: sale de la rotación y se lee de la primaria
+                replica.marcar_caida(e)
+                soltar_replica(descartar=True)
+                return self._correr(self.connection, query, data, resultado, cursorclass, varias)
+        except Exception as e:
+            logger.error("Error en la consulta %s: %s", huella_consulta(query), e)
+            if self._transaccion is not None:
+                raise
+            return False
+
+    # SELECT: devuelve todas las filas como una lista de diccionarios
+    def fetch_all(self, query, data=None):
+        return self._ejecutar(query, data, lambda cursor: cursor.fetchall(), lectura=True)
+
+    # SELECT: devuelve la primera fila como diccionario, o None si no hay filas
+    def fetch_one(self, query, data=None):
+        return self._ejecutar(query, data, lambda cursor: cursor.fetchone(), lectura=True)
+
+    # SELECT: devuelve las filas como tuplas en el orden de las columnas pedidas.
+    # Son más livianas que los diccionarios para listados grandes
+    def fetch_rows(self, query, data=None):
+        return self._ejecutar(query, data, lambda cursor: cursor.fetchall(), pymysql.cursors.Cursor, lectura=True)
 
-                # Ejecutamos la consulta directamente
+    # SELECT: devuelve la primera fila como tupla, o None si no hay filas
+    def fetch_row(self, query, data=None):
+        return self._ejecutar(query, data, lambda cursor: cursor.fetchone(), pymysql.cursors.Cursor, lectura=True)
+
+    # UPDATE / DELETE / INSERT especiales: devuelve el número de filas afectadas
+    def execute(self, query, data=None):
+        return self._ejecutar(query, data, lambda cursor: cursor.rowcount)
+
+    # INSERT: devuelve el id de la fila insertada
+    def insert(self, query, data=None):
+        return self._ejecutar(query, data, lambda cursor: cursor.lastrowid)
+
+    # Misma sentencia para muchas filas: un INSERT ... VALUES se envía como
+    # INSERT de varias filas. Devuelve el número de filas afectadas
+    def execute_many(self, query, filas):
+        return self._ejecutar(query, filas, lambda cursor: cursor.rowcount, varias=True)
+
+    # SELECT de muchas filas: las entrega como tuplas a medida que llegan
+    # (cursor del lado del servidor), sin cargarlas todas en memoria. La
+    # conexión queda ocupada hasta agotar o cerrar el generador, y los errores
+    # se propagan
+    def iterar_filas(self, query, data=None, tamano=1000):
+        connection, _ = self._conexion_lectura()
+        inicio = time.perf_counter()
+        filas = 0
+        cursor = connection.cursor(pymysql.cursors.SSCursor)
+        try:
+            if isinstance(query, Sentencia):
+                enviar_sentencia(connection, cursor, query, data)
+            else:
                 cursor.execute(query, data)
+            while True:
+                lote = cursor.fetchmany(tamano)
+                if not lote:
+                    break
+                filas += len(lote)
+                yield from lote
+        finally:
+            # Cerrar descarta las filas pendientes para dejar libre la conexión
+            cursor.close()
+            registrar_consulta(query, time.perf_counter() - inicio, filas)
+            self._liberar(connection)
 
-                # Si la consulta es un INSERT, se devuelve el ID de la última fila insertada
-                if query.lower().find("insert") >= 0:
-                    self.connection.commit()
-                    return cursor.lastrowid
-
-                # Si es una consulta SELECT, devolvemos el resultado como una lista de diccionarios
-                elif query.lower().find("select") >= 0:
-                    result = cursor.fetchall()
-                    return result
-
-                # Para consultas UPDATE o DELETE, confirmamos la transacción
-                else:
-                    self.connection.commit()
-            except Exception as e:
-                print("Something went wrong", e)
-                return False
-            finally:
-                # No cierres la conexión aquí, solo asegúrate de que el cursor se libere correctamente.
-                pass
+    # Método heredado: decide por la primera palabra de la sentencia.
+    # El código nuevo debe usar fetch_all / fetch_one / execute / insert.
+    def query_db(self, query, data=None):
+        verbo = query.lstrip()[:6].upper()
+        if verbo == "INSERT":
+            return self.insert(query, data)
+        if verbo == "SELECT":
+            return self.fetch_all(query, data)
+        return self.execute(query, data)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Ejecuta varias sentencias en una sola conexión con un único commit:
+
+            with connectToMySQL(db).transaction() as conexion:
+                conexion.execute(...)
+                conexion.execute(...)
+
+        Si alguna sentencia falla se hace rollback y la excepción se propaga.
+        """
+        marcar_escritura()
+        connection = self.connection
+        connection.begin()
+        self._transaccion = connection
+        try:
+            yield self
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            self._transaccion = None
+            self._liberar(connection)
+
+
+# Instrumentación de consultas
+
+_LITERALES = re.compile(r"'(?:[^'\\]|\\.|'')*'|\b\d+\b|%\(\w+\)s|%s")
+_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ESPACIOS = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=512)
+def huella_consulta(query):
+    """
+    Forma normalizada de una sentencia para agrupar métricas: literales y
+    parámetros se reemplazan por ? y los espacios se colapsan. Las sentencias
+    registradas se identifican por su nombre.
+    """
+    if isinstance(query, Sentencia):
+        return query.nombre
+    huella = _LITERALES.sub("?", query)
+    huella = _LISTAS.sub("(?, ...)", huella)
+    return _ESPACIOS.sub(" ", huella).strip().rstrip(";")
+
+
+def registrar_consulta(query, duracion, filas):
+    """Acumula la consulta en el resumen de la petición y la registra si es lenta."""
+    if has_app_context():
+        g.num_consultas = g.get("num_consultas", 0) + 1
+        g.tiempo_db = g.get("tiempo_db", 0.0) + duracion
+        if duracion >= g.get("duracion_mas_lenta", 0.0):
+            g.duracion_mas_lenta = duracion
+            g.consulta_mas_lenta = query
+    # La huella solo se calcula si el mensaje realmente se va a registrar
+    ms = duracion * 1000
+    if MYSQL_SLOW_QUERY_MS and ms >= MYSQL_SLOW_QUERY_MS:
+        if logger.isEnabledFor(logging.WARNING):
+            logger.warning("Consulta lenta: %.1f ms, %s filas: %s", ms, filas, huella_consulta(query))
+    elif logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Consulta: %.1f ms, %s filas: %s", ms, filas, huella_consulta(query))
+
+
+def consultas_realizadas():
+    """Número de consultas ejecutadas en la petición actual."""
+    return g.get("num_consultas", 0) if has_app_context() else 0
+
+
+def resumen_peticion():
+    """Resumen de la petición actual: número de consultas, tiempo total y la más lenta."""
+    if not has_app_context() or not g.get("num_consultas"):
+        return {"consultas": 0, "tiempo_db_ms": 0.0, "mas_lenta_ms": 0.0, "mas_lenta": None}
+    return {
+        "consultas": g.num_consultas,
+        "tiempo_db_ms": round(g.tiempo_db * 1000, 3),
+        "mas_lenta_ms": round(g.duracion_mas_lenta * 1000, 3),
+        "mas_lenta": huella_consulta(g.consulta_mas_lenta),
+    }
+
+
+def registrar_resumen_peticion(exception=None):
+    """Registra el resumen de consultas de la petición (se registra como teardown)."""
+    if logger.isEnabledFor(logging.INFO) and g.get("num_consultas"):
+        resumen = resumen_peticion()
+        logger.info(
+            "%s %s: %d consultas, %.1f ms en DB, más lenta %.1f ms: %s",
+            request.method, request.path, resumen["consultas"], resumen["tiempo_db_ms"],
+            resumen["mas_lenta_ms"], resumen["mas_lenta"],
+        )
 
 
-def connectToMySQL(db):
-    return MySQLConnection(db)
+def connectToMySQL(db, primaria=False):
+    return MySQLConnection(db, primaria)
 
 
+def liberar_conexion(exception=None):
+    """Devuelve al pool las conexiones de la petición actual (se registra como teardown)."""
+    connection = g.pop("mysql_connection", None)
+    if connection is not None:
+        pool.devolver(connection, descartar=exception is not None)
+    soltar_replica(descartar=exception is not None)
@@ -0,0 +1,121 @@
+# Hash y verificación de contraseñas con bcrypt fuera del hilo de la petición
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as EsperaVencida
+from concurrent.futures.process import BrokenProcessPool
+from bcrypt import hashpw, checkpw, gensalt
+from dotenv import load_dotenv
+
+load_dotenv()
+# Factor de costo de bcrypt para los hashes nuevos (y para el rehash al iniciar sesión)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Procesos dedicados a bcrypt y máximo de operaciones en curso o en cola
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(os.cpu_count() or 2)))
+BCRYPT_MAX_PENDIENTES = int(os.getenv("BCRYPT_MAX_PENDIENTES", str(BCRYPT_WORKERS * 4)))
+BCRYPT_TIMEOUT = float(os.getenv("BCRYPT_TIMEOUT", "10"))
+
+
+class HashingSobrecargadoError(Exception):
+    """
+    Se lanza cuando bcrypt no puede atender: la cola está llena, la operación
+    tardó más de BCRYPT_TIMEOUT o el pool de procesos se rompió. La petición
+    se rechaza con 503.
+    """
+
+
+# Funciones que se ejecutan en los procesos del pool
+
+
+def _hashear(password, rounds):
+    return hashpw(password, gensalt(rounds)).decode('utf-8')
+
+
+def _verificar(password, password_hash):
+    return checkpw(password, password_hash)
+
+
+# bcrypt retiene el GIL durante cientos de milisegundos, por eso se ejecuta en
+# procesos separados. El pool se crea de forma perezosa en cada proceso (así
+# cada worker creado por fork tiene el suyo) y el semáforo limita la cola.
+# Los procesos salen de un forkserver y no de fork: el worker gthread ya tiene
+# hilos, y un fork podría heredar un lock tomado por otro hilo y bloquearse.
+
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+_cupos = threading.BoundedSemaphore(BCRYPT_MAX_PENDIENTES)
+
+
+def _obtener_executor():
+    global _executor, _executor_pid
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(
+                max_workers=BCRYPT_WORKERS, mp_context=multiprocessing.get_context("forkserver")
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _reiniciar_executor(roto):
+    # Solo si nadie lo reemplazó ya; el siguiente uso crea uno nuevo
+    global _executor
+    with _lock:
+        if _executor is roto and _executor_pid == os.getpid():
+            roto.shutdown(wait=False)
+            _executor = None
+
+
+def _ejecutar(funcion, *args):
+    # Admisión: si no hay cupo se falla de inmediato en lugar de acumular espera
+    if not _cupos.acquire(blocking=False):
+        raise HashingSobrecargadoError("Demasiadas operaciones de contraseña en curso")
+    executor = _obtener_executor()
+    try:
+        futuro = executor.submit(funcion, *args)
+    except BrokenProcessPool as e:
+        _reiniciar_executor(executor)
+        _cupos.release()
+        raise HashingSobrecargadoError("El pool de bcrypt dejó de funcionar") from e
+    except Exception:
+        _cupos.release()
+        raise
+    # El cupo se libera cuando termina el trabajo, aunque la petición deje de esperar
+    futuro.add_done_callback(lambda _: _cupos.release())
+    try:
+        return futuro.result(timeout=BCRYPT_TIMEOUT)
+    except EsperaVencida as e:
+        futuro.cancel()
+        raise HashingSobrecargadoError(f"La operación de contraseña superó {BCRYPT_TIMEOUT} s") from e
+    except BrokenProcessPool as e:
+        # Un proceso del pool murió (p. ej. por memoria): se reemplaza el pool
+        _reiniciar_executor(executor)
+        raise HashingSobrecargadoError("El pool de bcrypt dejó de funcionar") from e
+
+
+def hashear_password(password):
+    """Devuelve el hash bcrypt (str) de la contraseña con el costo configurado."""
+    return _ejecutar(_hashear, password.encode('utf-8'), BCRYPT_ROUNDS)
+
+
+def verificar_password(password, password_hash):
+    """Comprueba la contraseña contra el hash almacenado."""
+    return _ejecutar(_verificar, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+def necesita_rehash(password_hash):
+    """True si el hash se generó con un costo distinto al configurado ($2b$<costo>$...)."""
+    try:
+        return int(password_hash.split('$')[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+def cerrar():
+    """Detiene los procesos de bcrypt (al apagar el servidor)."""
+    global _executor
+    with _lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown(wait=False)
+        _executor = None
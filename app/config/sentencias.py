@@ -0,0 +1,118 @@
+# Registro de sentencias con nombre para las consultas frecuentes de los modelos.
+#
+# Cada sentencia se declara una vez al importar el modelo, con su texto
+# normalizado y sus formas preparadas ya armadas; los registros y métricas de
+# consultas la identifican por su nombre.
+#
+# PyMySQL no implementa el protocolo binario de sentencias preparadas. Con
+# MYSQL_PREPARAR=1 se usan las sentencias preparadas de SQL (PREPARE / SET /
+# EXECUTE): cada conexión prepara la sentencia la primera vez y luego solo
+# envía los valores, a cambio de un viaje de red más por ejecución. Conviene
+# activarlo solo si benchmarks/bench_sentencias.py muestra ganancia contra el
+# servidor real. Todo envío de una Sentencia pasa por enviar_sentencia.
+import os
+import re
+from dotenv import load_dotenv
+import pymysql.err
+from pymysql.converters import escape_string
+
+load_dotenv()
+MYSQL_PREPARAR = os.getenv("MYSQL_PREPARAR", "").lower() in ("1", "true", "si")
+
+# Sentencia desconocida para el servidor (la conexión se reabrió o hizo DEALLOCATE)
+ER_SENTENCIA_DESCONOCIDA = 1243
+
+_PARAMETRO = re.compile(r"%\((\w+)\)s")
+
+
+class Sentencia:
+    __slots__ = ("nombre", "sql", "parametros", "sql_preparar", "sql_valores", "sql_ejecutar")
+
+    def __init__(self, nombre, sql):
+        texto = " ".join(sql.split()).rstrip(";")
+        self.nombre = nombre
+        self.sql = texto + ";"
+        # Nombres de los parámetros en el orden en que aparecen (con repetidos)
+        self.parametros = tuple(_PARAMETRO.findall(texto))
+        # Forma preparada: un identificador por sentencia y una variable por parámetro
+        identificador = "s_" + re.sub(r"\W", "_", nombre)
+        variables = {p: f"@{identificador}_{p}" for p in self.parametros}
+        preparada = _PARAMETRO.sub("?", texto).replace("%%", "%")
+        self.sql_preparar = f"PREPARE {identificador} FROM '{escape_string(preparada)}';"
+        self.sql_valores = "SET " + ", ".join(f"{v} = %s" for v in variables.values()) + ";" if variables else None
+        usando = " USING " + ", ".join(variables[p] for p in self.parametros) if self.parametros else ""
+        self.sql_ejecutar = f"EXECUTE {identificador}{usando};"
+
+    def valores_unicos(self, data):
+        # Un valor por variable, en el orden de sql_valores
+        return tuple(data[p] for p in dict.fromkeys(self.parametros))
+
+    def preparable(self, data):
+        # Las listas de IN (...) cambian de largo en cada llamada: van como texto
+        return not any(isinstance(data[p], (list, tuple, set)) for p in self.parametros)
+
+    def __repr__(self):
+        return f"<Sentencia {self.nombre}>"
+
+
+_registro = {}
+
+
+def registrar(nombre, sql):
+    """
+    Declara la sentencia `nombre`. Volver a registrar el mismo nombre con el
+    mismo texto devuelve la ya registrada; con otro texto es un error.
+    """
+    sentencia = Sentencia(nombre, sql)
+    existente = _registro.setdefault(nombre, sentencia)
+    if existente.sql != sentencia.sql:
+        raise ValueError(f"La sentencia {nombre!r} ya está registrada con otro texto")
+    return existente
+
+
+def registradas():
+    """Sentencias registradas por nombre (para benchmarks y diagnóstico)."""
+    return dict(_registro)
+
+
+def preparadas_de(connection):
+    """Nombres de las sentencias ya preparadas en esta conexión."""
+    preparadas = getattr(connection, "sentencias_preparadas", None)
+    if preparadas is None:
+        preparadas = connection.sentencias_preparadas = set()
+    return preparadas
+
+
+def olvidar_preparadas(connection):
+    # Tras reconectar, el servidor ya no tiene las sentencias de la sesión anterior
+    if getattr(connection, "sentencias_preparadas", None):
+        connection.sentencias_preparadas = set()
+
+
+def usar_preparada(sentencia, data):
+    return MYSQL_PREPARAR and sentencia.preparable(data)
+
+
+def enviar_sentencia(connection, cursor, sentencia, data, varias=False):
+    """
+    Ejecuta una Sentencia registrada en el cursor de `connection`: como texto
+    o, con MYSQL_PREPARAR, como sentencia preparada de la conexión (se prepara
+    la primera vez y se vuelve a preparar si el servidor ya no la tiene).
+    """
+    if varias:
+        return cursor.executemany(sentencia.sql, data)
+    if not usar_preparada(sentencia, data):
+        return cursor.execute(sentencia.sql, data)
+    preparadas = preparadas_de(connection)
+    for intento in range(2):
+        try:
+            if sentencia.nombre not in preparadas:
+                cursor.execute(sentencia.sql_preparar)
+                preparadas.add(sentencia.nombre)
+            if sentencia.sql_valores:
+                cursor.execute(sentencia.sql_valores, sentencia.valores_unicos(data))
+            return cursor.execute(sentencia.sql_ejecutar)
+        except pymysql.err.MySQLError as e:
+            if intento or e.args[0] != ER_SENTENCIA_DESCONOCIDA:
+                raise
+            preparadas.discard(sentencia.nombre)
@@ -0,0 +1,298 @@
+# Servidor de server-sent events para las páginas de detalle de los viajes:
+#     GET /travels/eventos/<viaje_id>
+#
+# Los workers gthread de gunicorn ocupan un hilo por conexión abierta, y cada
+# página de detalle deja la suya abierta mientras se mira. Por eso los eventos
+# se sirven aparte: cada worker corre un servidor asyncio mínimo en un hilo
+# propio, donde una suscripción inactiva es solo una corrutina con su cola.
+# Los workers comparten el puerto (SO_REUSEPORT) y el kernel reparte las
+# conexiones entre ellos, así que cada uno debe recibir del bus de
+# app/config/eventos.py todo lo que publican los modelos: con varios workers
+# hace falta un bus compartido (ver comprobar_bus).
+#
+# Es opcional (EVENTOS_BIND vacío por defecto). Escucha solo en local: el proxy publica la ruta en el mismo origen que la
+# aplicación. La sesión se valida con la misma cookie firmada de Flask; si el
+# navegador llega directo al puerto (desarrollo, EVENTOS_URL con otro origen)
+# se responde con CORS para el mismo host, y otros orígenes reciben 403.
+import asyncio
+import logging
+import os
+import re
+import socket
+import threading
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+
+from app.config.eventos import BackendLocal, eventos
+
+load_dotenv()
+# Dirección del servidor de eventos de cada worker, p. ej. 127.0.0.1:8001
+# ("" los desactiva)
+EVENTOS_BIND = os.getenv("EVENTOS_BIND", "")
+# Segundos entre comentarios de latido (mantienen viva la conexión en proxies)
+EVENTOS_LATIDO = float(os.getenv("EVENTOS_LATIDO", "20"))
+# Suscripciones abiertas por worker; las demás reciben 503
+EVENTOS_MAX_CONEXIONES = int(os.getenv("EVENTOS_MAX_CONEXIONES", "5000"))
+# Eventos pendientes por suscripción; un cliente que no lee se desconecta
+EVENTOS_MAX_PENDIENTES = int(os.getenv("EVENTOS_MAX_PENDIENTES", "100"))
+# Milisegundos que espera el navegador antes de reconectar
+EVENTOS_REINTENTO = int(os.getenv("EVENTOS_REINTENTO", "3000"))
+
+RUTA = re.compile(r"^/travels/eventos/(\d+)$")
+# Segundos para recibir la cabecera de la petición y para entregar cada envío
+TIEMPO_PETICION = 10
+TIEMPO_ENVIO = 10
+# Marca de fin de suscripción en la cola (desbordada o servidor cerrando)
+FIN = None
+
+logger = logging.getLogger("app.eventos")
+
+
+def _separar_bind(bind):
+    host, _, puerto = bind.rpartition(":")
+    return host or "127.0.0.1", int(puerto)
+
+
+class ServidorEventos:
+    """
+    Servidor SSE del proceso. configurar(app) se llama al crear la aplicación;
+    iniciar() en cada worker (tras el fork) y cerrar() al terminar.
+    """
+
+    def __init__(self, bind=EVENTOS_BIND):
+        self.bind = bind
+        self._app = None
+        self._loop = None
+        self._servidor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        # (host, puerto) en que escucha; con puerto 0 el que asignó el sistema
+        self.direccion = None
+        # Colas de las suscripciones abiertas, por canal. Solo se toca desde el loop
+        self._suscripciones = {}
+        self.conexiones = 0
+        self.rechazadas = 0
+        self.desbordadas = 0
+        self.enviados = 0
+
+    def configurar(self, app):
+        self._app = app
+
+    def comprobar_bus(self, procesos):
+        """
+        Desactiva los eventos si corren en varios procesos con el bus local:
+        cada worker solo ve lo que publica él mismo y la suscripción pudo caer
+        en otro, así que se perderían sin aviso. Devuelve False si los desactivó.
+        """
+        if self.bind and procesos > 1 and isinstance(eventos.backend, BackendLocal):
+            self.bind = ""
+            return False
+        return True
+
+    @property
+    def habilitado(self):
+        # Si la página debe suscribirse (configurado, aunque el worker aún no arrancó)
+        return bool(self.bind)
+
+    def iniciar(self):
+        if not self.bind or self._app is None:
+            return False
+        with self._lock:
+            if self._pid == os.getpid():
+                return True
+            host, puerto = _separar_bind(self.bind)
+            try:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                if hasattr(socket, "SO_REUSEPORT"):
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+                sock.bind((host, puerto))
+                sock.listen(1024)
+                sock.setblocking(False)
+            except OSError as e:
+                logger.warning("Servidor de eventos sin iniciar en %s: %s", self.bind, e)
+                return False
+            # Hilos y loops no sobreviven al fork: cada worker arranca los suyos
+            self._loop = asyncio.new_event_loop()
+            self._suscripciones = {}
+            self.conexiones = 0
+            self._pid = os.getpid()
+            self.direccion = sock.getsockname()
+            listo = threading.Event()
+            threading.Thread(
+                target=self._correr, args=(sock, listo), name="servidor-eventos", daemon=True
+            ).start()
+            listo.wait()
+        eventos.escuchar(self._recibir)
+        logger.info("Servidor de eventos en %s:%s (pid %s)", *self.direccion, self._pid)
+        return True
+
+    def _correr(self, sock, listo):
+        asyncio.set_event_loop(self._loop)
+        self._servidor = self._loop.run_until_complete(asyncio.start_server(self._atender, sock=sock))
+        listo.set()
+        self._loop.run_forever()
+
+    def cerrar(self):
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                return
+            eventos.dejar(self._recibir)
+            futuro = asyncio.run_coroutine_threadsafe(self._detener(), self._loop)
+            try:
+                futuro.result(timeout=5)
+            except Exception as e:
+                logger.warning("Cierre incompleto del servidor de eventos: %s", e)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+            self._pid = None
+
+    async def _detener(self):
+        self._servidor.close()
+        for colas in self._suscripciones.values():
+            for cola in colas:
+                self._terminar(cola)
+        # Deja que cada suscripción lea su marca de fin y cierre el socket
+        while self.conexiones:
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0)
+
+    def estadisticas(self):
+        return {
+            "activo": self._pid == os.getpid(),
+            "conexiones": self.conexiones,
+            "canales": len(self._suscripciones),
+            "rechazadas": self.rechazadas,
+            "desbordadas": self.desbordadas,
+            "enviados": self.enviados,
+        }
+
+    # Reparto de eventos
+
+    def _recibir(self, canal, mensaje):
+        # Llega desde el hilo del bus (o de la petición que escribió, con el
+        # backend local). La lectura del dict es solo un filtro: el reparto
+        # vuelve a mirar dentro del loop
+        loop = self._loop
+        if loop is not None and canal in self._suscripciones:
+            loop.call_soon_threadsafe(self._repartir, canal, mensaje)
+
+    def _repartir(self, canal, mensaje):
+        for cola in tuple(self._suscripciones.get(canal, ())):
+            try:
+                cola.put_nowait(mensaje)
+            except asyncio.QueueFull:
+                self.desbordadas += 1
+                self._terminar(cola)
+
+    @staticmethod
+    def _terminar(cola):
+        # Vacía la cola para que la marca de fin entre y se lea enseguida
+        while not cola.empty():
+            cola.get_nowait()
+        cola.put_nowait(FIN)
+
+    # Conexiones
+
+    async def _atender(self, reader, writer):
+        try:
+            try:
+                metodo, ruta, cabeceras = await asyncio.wait_for(self._leer_peticion(reader), TIEMPO_PETICION)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+                return
+            cors = self._cabeceras_cors(cabeceras)
+            if cors is None:
+                return await self._responder(writer, "403 Forbidden", [])
+            coincidencia = RUTA.match(urlsplit(ruta).path)
+            if metodo != "GET" or not coincidencia:
+                return await self._responder(writer, "404 Not Found", cors)
+            if self._usuario_id(cabeceras.get("cookie")) is None:
+                return await self._responder(writer, "401 Unauthorized", cors)
+            if self.conexiones >= EVENTOS_MAX_CONEXIONES:
+                self.rechazadas += 1
+                return await self._responder(writer, "503 Service Unavailable", cors + ["Retry-After: 30"])
+            await self._transmitir(writer, f"viaje:{coincidencia.group(1)}", cors)
+        except (ConnectionError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _leer_peticion(reader):
+        cabecera = await reader.readuntil(b"\r\n\r\n")
+        lineas = cabecera.decode("latin-1").split("\r\n")
+        metodo, ruta, _ = lineas[0].split(" ", 2)
+        cabeceras = {}
+        for linea in lineas[1:]:
+            nombre, separador, valor = linea.partition(":")
+            if separador:
+                cabeceras[nombre.strip().lower()] = valor.strip()
+        return metodo, ruta, cabeceras
+
+    def _usuario_id(self, cookies):
+        # Misma validación que Flask: firma, vigencia y usuario en la sesión
+        if not cookies:
+            return None
+        morsel = SimpleCookie(cookies).get(self._app.config["SESSION_COOKIE_NAME"])
+        serializador = self._app.session_interface.get_signing_serializer(self._app)
+        if morsel is None or serializador is None:
+            return None
+        try:
+            sesion = serializador.loads(
+                morsel.value, max_age=int(self._app.permanent_session_lifetime.total_seconds())
+            )
+        except Exception:
+            return None
+        return sesion.get("usuario_id")
+
+    @staticmethod
+    def _cabeceras_cors(cabeceras):
+        # Sin Origin es una petición del mismo origen (vía proxy). Con Origin
+        # solo se admiten páginas del mismo host (la aplicación en otro
+        # puerto); None si el origen es otro
+        origen = cabeceras.get("origin")
+        if not origen:
+            return []
+        host = cabeceras.get("host", "").rpartition(":")[0] or cabeceras.get("host", "")
+        if urlsplit(origen).hostname != host:
+            return None
+        return [f"Access-Control-Allow-Origin: {origen}", "Access-Control-Allow-Credentials: true", "Vary: Origin"]
+
+    @staticmethod
+    async def _responder(writer, estado, extra):
+        lineas = [f"HTTP/1.1 {estado}", "Content-Length: 0", "Connection: close", *extra]
+        writer.write(("\r\n".join(lineas) + "\r\n\r\n").encode())
+        await asyncio.wait_for(writer.drain(), TIEMPO_ENVIO)
+
+    async def _transmitir(self, writer, canal, cors):
+        cola = asyncio.Queue(EVENTOS_MAX_PENDIENTES)
+        self._suscripciones.setdefault(canal, set()).add(cola)
+        self.conexiones += 1
+        try:
+            lineas = [
+                "HTTP/1.1 200 OK", "Content-Type: text/event-stream; charset=utf-8",
+                "Cache-Control: no-cache", "Connection: close", "X-Accel-Buffering: no", *cors,
+            ]
+            writer.write(("\r\n".join(lineas) + f"\r\n\r\nretry: {EVENTOS_REINTENTO}\n\n").encode())
+            await asyncio.wait_for(writer.drain(), TIEMPO_ENVIO)
+            while True:
+                try:
+                    mensaje = await asyncio.wait_for(cola.get(), EVENTOS_LATIDO)
+                except asyncio.TimeoutError:
+                    writer.write(b": latido\n\n")
+                else:
+                    if mensaje is FIN:
+                        return
+                    writer.write(f"data: {mensaje}\n\n".encode())
+                    self.enviados += 1
+                await asyncio.wait_for(writer.drain(), TIEMPO_ENVIO)
+        finally:
+            colas = self._suscripciones.get(canal)
+            colas.discard(cola)
+            if not colas:
+                del self._suscripciones[canal]
+            self.conexiones -= 1
+
+
+servidor_eventos = ServidorEventos()
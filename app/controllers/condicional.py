@@ -0,0 +1,53 @@
+import hashlib
+from datetime import timezone
+from flask import current_app, request, session
+
+# GET condicional (ETag / Last-Modified) para páginas que dependen de las
+# versiones de app/models/versiones.py. Si el navegador ya tiene la versión
+# vigente se responde 304 sin consultar el resto de los datos ni renderizar.
+
+def validadores(resultado_versiones, usuario_id):
+    """
+    ETag y Last-Modified de la página para estas versiones y este usuario.
+    Devuelve (None, None) si no se pudieron leer las versiones o si hay mensajes
+    flash pendientes (la página con el mensaje no debe reutilizarse).
+    """
+    if not resultado_versiones or '_flashes' in session:
+        return None, None
+    versiones, ultima = resultado_versiones
+    partes = [current_app.config.get('VERSION_PLANTILLAS', ''), str(usuario_id)]
+    partes += [f"{clave}={version}" for clave, version in sorted(versiones.items())]
+    etag = hashlib.sha1("|".join(partes).encode('utf-8')).hexdigest()[:20]
+    if ultima is not None:
+        ultima = ultima.replace(microsecond=0, tzinfo=timezone.utc)
+    return etag, ultima
+
+def version(resultado_versiones, clave):
+    """
+    Versión de la clave en lo leído por versiones.obtener (None si no se pudo
+    leer), para pedir a la caché los datos de esa misma versión.
+    """
+    return resultado_versiones[0][clave] if resultado_versiones else None
+
+def sin_cambios(etag, ultima):
+    """True si el navegador envió validadores que coinciden con la versión vigente."""
+    if etag is None:
+        return False
+    # If-None-Match tiene prioridad sobre If-Modified-Since
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    return bool(ultima and request.if_modified_since and ultima <= request.if_modified_since)
+
+def con_validadores(response, etag, ultima):
+    """Agrega ETag y Last-Modified; el navegador debe revalidar en cada visita."""
+    if etag is None:
+        return response
+    response.set_etag(etag, weak=True)
+    if ultima is not None:
+        response.last_modified = ultima
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    return response
+
+def no_modificado(etag, ultima):
+    return con_validadores(current_app.response_class(status=304), etag, ultima)
@@ -0,0 +1,30 @@
+from app.config.mysqlconnection import connectToMySQL, pool, replicas, MYSQL_DB, logger
+from app.config.servidor_eventos import servidor_eventos
+from app.config.cache import cache
+from flask import Blueprint, jsonify
+
+# Endpoints para el balanceador de carga. No requieren sesión.
+bp = Blueprint('salud', __name__, url_prefix='/salud')
+
+@bp.route('/', methods=['GET'])
+def vivo():
+    # El proceso responde (liveness); no toca la base de datos
+    return jsonify({'estado': 'ok'})
+
+@bp.route('/lista', methods=['GET'])
+def lista():
+    # Readiness: el worker solo recibe tráfico si llega a la primaria. Las
+    # réplicas caídas no lo impiden (sus lecturas van a la primaria)
+    try:
+        disponible = bool(connectToMySQL(MYSQL_DB, primaria=True).fetch_row("SELECT 1;"))
+    except Exception as e:
+        logger.warning("Readiness: sin conexión a la base de datos: %s", e)
+        disponible = False
+    cuerpo = {
+        'estado': 'ok' if disponible else 'sin_base_de_datos',
+        'pool': pool.estadisticas(),
+        'replicas': replicas.estadisticas(),
+        'cache': cache.estadisticas(),
+        'eventos': servidor_eventos.estadisticas(),
+    }
+    return jsonify(cuerpo), 200 if disponible else 503
@@ -1,18 +1,24 @@
-from flask import redirect, request, session, Blueprint, flash
+from flask import redirect, request, session, Blueprint, flash, render_template
 from app.models.usuario_model import Usuario
-from bcrypt import hashpw, gensalt
+from app.config.seguridad import hashear_password, HashingSobrecargadoError
 
 bp = Blueprint('usuarios', __name__, url_prefix='/usuarios')
 
+@bp.errorhandler(HashingSobrecargadoError)
+def servicio_sobrecargado(error):
+    # Con la cola de bcrypt llena se responde de inmediato en lugar de acumular espera
+    flash("El servicio está ocupado. Inténtalo de nuevo en unos segundos.", 'login')
+    return render_template('auth.html'), 503, {'Retry-After': '2'}
+
 @bp.route('/procesar_registro', methods=['POST'])
 def procesar_registro():
     if not Usuario.validar_registro(request.form):
         return redirect('/')
    
-    password_hash = hashpw(request.form['password'].encode('utf-8'), gensalt())
+    password_hash = hashear_password(request.form['password'])
     data ={
         **request.form,
-        'password' : password_hash.decode('utf-8')
+        'password' : password_hash
     }
    
     usuario_id = Usuario.guardar_usuario(data)
@@ -22,10 +28,11 @@ def procesar_registro():
 
 @bp.route('/procesar_login', methods=['POST'])
 def procesar_login():
-    if not Usuario.validar_login(request.form):
+    # La validación devuelve el usuario ya cargado: una sola consulta por login
+    usuario_db = Usuario.validar_login(request.form)
+    if not usuario_db:
         return redirect('/')
    
-    usuario_db = Usuario.obtener_por_email(request.form)
     session['usuario_id'] = usuario_db.id
     flash(f"!Bienvenido de nuevo, {usuario_db.nombre}!", 'exito')
     return redirect('/travels')
@@ -1,6 +1,24 @@
 from app.models.usuario_model import Usuario
-from app.models.viaje_model import Viaje
-from flask import render_template, redirect, request, session, Blueprint, flash
+from app.models.viaje_model import Viaje, MAX_PAGINAS_BUSQUEDA
+from app.models import versiones
+from app.controllers import condicional
+from app.config.servidor_eventos import servidor_eventos
+from datetime import date
+import os
+from dotenv import load_dotenv
+from flask import (
+    render_template, stream_template, redirect, request, session, Blueprint, flash, jsonify,
+    make_response, current_app, get_flashed_messages,
+)
+
+load_dotenv()
+# Dashboard transmitido a medida que se renderiza (memoria constante y primer
+# byte inmediato con agendas muy grandes) y tamaño de cada envío en caracteres
+DASHBOARD_STREAMING = os.getenv("DASHBOARD_STREAMING", "").lower() in ("1", "true", "si")
+BLOQUE_STREAMING = int(os.getenv("DASHBOARD_BLOQUE_STREAMING", "8192"))
+# Origen del servidor de eventos para el navegador. Vacío: el mismo origen de
+# la página, donde el proxy publica /travels/eventos/ hacia EVENTOS_BIND
+EVENTOS_URL = os.getenv("EVENTOS_URL", "").rstrip("/")
 
 bp = Blueprint('citas', __name__, url_prefix='/travels')
 
@@ -10,32 +28,167 @@ def verificar_sesion():
         return redirect('/')
     return True
 
+def cuenta_inexistente():
+    # La cookie sigue firmada aunque la cuenta se haya eliminado: se cierra la sesión
+    session.clear()
+    flash("Tu cuenta ya no existe.", 'error')
+    return redirect('/')
+
 @bp.route('/', methods=['GET'])
 def dashboard():
     resp = verificar_sesion()
     if resp is not True:
         return resp
     
-    usuario = Usuario.obtener_por_id(session['usuario_id'])
+    if DASHBOARD_STREAMING:
+        return _dashboard_streaming()
     
-    viajes = Viaje.obtener_todos()
-    viajes_creados_por_usuario = [v for v in viajes if v.creado_por == usuario.id]
-    viajes_unidos = Viaje.obtener_viajes_usuario(usuario.id)
+    # Si nada cambió desde la última visita se responde 304 sin más consultas
+    estado = versiones.obtener("viajes", "usuarios")
+    etag, ultima = condicional.validadores(estado, session['usuario_id'])
+    if condicional.sin_cambios(etag, ultima):
+        return condicional.no_modificado(etag, ultima)
     
-    # Filtramos disponibles: no creados y no unidos
-    ids_unidos = [v.id for v in viajes_unidos]
-    viajes_disponibles = [
-        v for v in viajes 
-        if v.creado_por != usuario.id and v.id not in ids_unidos
-    ]
+    usuario = Usuario.obtener_por_id(session['usuario_id'], condicional.version(estado, "usuarios"))
+    if not usuario:
+        return cuenta_inexistente()
     
-    return render_template(
+    # Los grupos y sus totales se calculan en la base de datos
+    datos = Viaje.obtener_dashboard(usuario.id)
+    
+    respuesta = make_response(render_template(
         'dashboard.html',
         usuario=usuario,
-        viajes_creados_por_usuario=viajes_creados_por_usuario,
-        viajes_unidos=viajes_unidos,
-        viajes_disponibles=viajes_disponibles
+        agenda=datos['creados'] + datos['unidos'],
+        num_creados=len(datos['creados']),
+        num_unidos=len(datos['unidos']),
+        viajes_disponibles=datos['disponibles'],
+        total_disponibles=datos['total_disponibles'],
+        siguiente=datos['siguiente']
+    ))
+    return condicional.con_validadores(respuesta, etag, ultima)
+
+def _dashboard_streaming():
+    estado = versiones.obtener("viajes", "usuarios")
+    etag, ultima = condicional.validadores(estado, session['usuario_id'])
+    if condicional.sin_cambios(etag, ultima):
+        return condicional.no_modificado(etag, ultima)
+    
+    # Antes de enviar nada solo se leen el usuario, los totales de la agenda y
+    # la primera página de disponibles; las filas de la agenda se renderizan
+    # a medida que llegan del cursor del lado del servidor
+    usuario = Usuario.obtener_por_id(session['usuario_id'], condicional.version(estado, "usuarios"))
+    if not usuario:
+        return cuenta_inexistente()
+    datos = Viaje.obtener_dashboard_streaming(session['usuario_id'])
+    # Los mensajes flash se sacan de la sesión ahora: la cookie se envía con
+    # los encabezados, antes de que la plantilla los muestre
+    get_flashed_messages(with_categories=True)
+    
+    partes = stream_template(
+        'dashboard.html',
+        usuario=usuario,
+        agenda=datos['agenda'],
+        num_creados=datos['num_creados'],
+        num_unidos=datos['num_unidos'],
+        viajes_disponibles=datos['disponibles'],
+        total_disponibles=datos['total_disponibles'],
+        siguiente=datos['siguiente']
     )
+    respuesta = current_app.response_class(_en_bloques(partes), mimetype='text/html')
+    return condicional.con_validadores(respuesta, etag, ultima)
+
+def _en_bloques(partes, tamano=BLOQUE_STREAMING):
+    # Jinja produce muchos trozos pequeños: se agrupan para no escribir al
+    # socket por cada uno
+    bloque, largo = [], 0
+    for parte in partes:
+        bloque.append(parte)
+        largo += len(parte)
+        if largo >= tamano:
+            yield "".join(bloque)
+            bloque, largo = [], 0
+    if bloque:
+        yield "".join(bloque)
+
+@bp.route('/disponibles', methods=['GET'])
+def viajes_disponibles():
+    # Página siguiente de viajes disponibles para la carga progresiva del dashboard
+    if 'usuario_id' not in session:
+        return jsonify({'error': 'Debes iniciar sesión.'}), 401
+    
+    try:
+        viajes, siguiente, _ = Viaje.obtener_disponibles(
+            session['usuario_id'], despues=request.args.get('despues')
+        )
+        Viaje.cargar_participantes(viajes)
+    except ValueError:
+        return jsonify({'error': 'Cursor de paginación inválido.'}), 400
+    
+    return jsonify({
+        'html': render_template('_filas_disponibles.html', viajes_disponibles=viajes),
+        'siguiente': siguiente
+    })
+
+@bp.route('/compatibles', methods=['GET'])
+def viajes_compatibles():
+    # Como /disponibles, solo con los viajes que caben en las fechas libres del usuario
+    if 'usuario_id' not in session:
+        return jsonify({'error': 'Debes iniciar sesión.'}), 401
+    
+    try:
+        viajes, siguiente = Viaje.obtener_compatibles(
+            session['usuario_id'], despues=request.args.get('despues')
+        )
+        Viaje.cargar_participantes(viajes)
+    except ValueError:
+        return jsonify({'error': 'Cursor de paginación inválido.'}), 400
+    
+    return jsonify({
+        'html': render_template('_filas_disponibles.html', viajes_disponibles=viajes),
+        'siguiente': siguiente
+    })
+
+@bp.route('/buscar', methods=['GET'])
+def buscar_viajes():
+    # Búsqueda por rango de fecha de inicio (desde/hasta, AAAA-MM-DD) y creador
+    if 'usuario_id' not in session:
+        return jsonify({'error': 'Debes iniciar sesión.'}), 401
+    
+    try:
+        desde = request.args.get('desde')
+        hasta = request.args.get('hasta')
+        viajes, siguiente = Viaje.buscar(
+            desde=date.fromisoformat(desde) if desde else None,
+            hasta=date.fromisoformat(hasta) if hasta else None,
+            creado_por=request.args.get('creador', type=int),
+            despues=request.args.get('despues')
+        )
+    except ValueError:
+        return jsonify({'error': 'Parámetros de búsqueda inválidos.'}), 400
+    
+    return jsonify({
+        'viajes': [v.como_dict() for v in viajes],
+        'siguiente': siguiente
+    })
+
+@bp.route('/buscar_texto', methods=['GET'])
+def buscar_texto():
+    # Búsqueda por palabras en título y descripción, ordenada por relevancia
+    if 'usuario_id' not in session:
+        return jsonify({'error': 'Debes iniciar sesión.'}), 401
+    
+    texto = request.args.get('q', '').strip()
+    if len(texto) < 3:
+        return jsonify({'error': 'La búsqueda debe tener al menos 3 caracteres.'}), 400
+    
+    pagina = max(1, min(request.args.get('pagina', 1, type=int), MAX_PAGINAS_BUSQUEDA))
+    viajes, hay_mas = Viaje.buscar_texto(texto, pagina)
+    return jsonify({
+        'viajes': [v.como_dict() for v in viajes],
+        'pagina': pagina,
+        'siguiente_pagina': pagina + 1 if hay_mas else None
+    })
 
 @bp.route('/crear', methods=['POST'])
 def crear_viaje():
@@ -103,8 +256,10 @@ def eliminar_viaje(viaje_id):
         flash("No tienes permiso para eliminar este viaje.", 'error')
         return redirect('/travels')
     
-    Viaje.eliminar_viaje(viaje_id, session['usuario_id'])
-    flash("¡Viaje eliminado exitosamente!", 'exito')
+    if Viaje.eliminar_viaje(viaje_id, session['usuario_id']) is False:
+        flash("No se pudo eliminar el viaje. Inténtalo nuevamente.", 'error')
+    else:
+        flash("¡Viaje eliminado exitosamente!", 'exito')
     return redirect('/travels')
 
 @bp.route('/unir/<int:viaje_id>', methods=['POST'])
@@ -113,27 +268,21 @@ def unir_viaje(viaje_id):
     if resp is not True:
         return resp
     
-    viaje = Viaje.obtener_por_id(viaje_id)
-    if not viaje:
-        flash("El viaje no existe.", 'error')
-        return redirect('/travels')
-    
-    if viaje.creado_por == session['usuario_id']:
-        flash("No puedes unirte a tu propio viaje.", 'error')
-        return redirect('/travels')
-    
-    # Verificar si ya está unido
-    if Viaje.usuario_ya_unido(session['usuario_id'], viaje_id):
-        flash("Ya estás unido a este viaje.", 'error')
-        return redirect('/travels')
-    
+    # Una sola sentencia valida el viaje, evita duplicados e inserta la unión
     resultado = Viaje.unir_usuario(session['usuario_id'], viaje_id)
-    if resultado is None:
+    if resultado == Viaje.UNION_CREADA:
+        flash("¡Te has unido al viaje exitosamente!", 'exito')
+        # La unión no se bloquea: se avisa si choca con otros viajes de la agenda
+        conflictos = Viaje.conflictos(session['usuario_id'], viaje_id)
+        if conflictos:
+            titulos = ", ".join(f"{v.titulo} ({v.fecha_inicio:%d/%m} - {v.fecha_fin:%d/%m})" for v in conflictos)
+            flash(f"Atención: las fechas se solapan con {titulos}.", 'advertencia')
+    elif resultado == Viaje.UNION_EXISTENTE:
         flash("Ya estás unido a este viaje.", 'error')
-    elif resultado is False:
-        flash("No se pudo unir al viaje. Inténtalo nuevamente.", 'error')
+    elif resultado == Viaje.VIAJE_NO_DISPONIBLE:
+        flash("El viaje no existe o no puedes unirte a tu propio viaje.", 'error')
     else:
-        flash("¡Te has unido al viaje exitosamente!", 'exito')
+        flash("No se pudo unir al viaje. Inténtalo nuevamente.", 'error')
     
     return redirect('/travels')
 
@@ -143,13 +292,13 @@ def salir_viaje(viaje_id):
     if resp is not True:
         return resp
     
-    viaje = Viaje.obtener_por_id(viaje_id)
-    if not viaje:
-        flash("El viaje no existe.", 'error')
-        return redirect('/travels')
-    
-    Viaje.salir_usuario(session['usuario_id'], viaje_id)
-    flash("¡Has salido del viaje exitosamente!", 'exito')
+    resultado = Viaje.salir_usuario(session['usuario_id'], viaje_id)
+    if resultado is False:
+        flash("No se pudo salir del viaje. Inténtalo nuevamente.", 'error')
+    elif resultado:
+        flash("¡Has salido del viaje exitosamente!", 'exito')
+    else:
+        flash("No estás unido a este viaje.", 'error')
     return redirect('/travels')
 
 
@@ -159,20 +308,42 @@ def detalle_viaje(viaje_id):
     if resp is not True:
         return resp
     
-    viaje = Viaje.obtener_por_id(viaje_id)
+    estado = versiones.obtener(f"viaje:{viaje_id}", "usuarios")
+    etag, ultima = condicional.validadores(estado, session['usuario_id'])
+    if condicional.sin_cambios(etag, ultima):
+        return condicional.no_modificado(etag, ultima)
+    
+    # La caché se lee con las mismas versiones del ETag
+    version_viaje = condicional.version(estado, f"viaje:{viaje_id}")
+    version_usuarios = condicional.version(estado, "usuarios")
+    usuario = Usuario.obtener_por_id(session['usuario_id'], version_usuarios)
+    if not usuario:
+        return cuenta_inexistente()
+    viaje = Viaje.obtener_por_id(viaje_id, version_viaje)
     if not viaje:
         flash("El viaje no existe.", 'error')
         return redirect('/travels')
     
-    usuario = Usuario.obtener_por_id(session['usuario_id'])
-    participantes = Usuario.obtener_usuarios_por_viaje(viaje_id)
+    participantes = Usuario.obtener_usuarios_por_viaje(viaje_id, version_viaje, version_usuarios)
     
     # Asegurar que el creador esté en la lista de participantes
     creador_en_lista = any(p.id == viaje.creado_por for p in participantes)
     if not creador_en_lista:
-        creador = Usuario.obtener_por_id(viaje.creado_por)
+        creador = Usuario.obtener_por_id(viaje.creado_por, version_usuarios)
         if creador:
             participantes.insert(0, creador)
     
-    return render_template('detalle_viaje.html', viaje=viaje, usuario=usuario, participantes=participantes)
+    # Conteo y "ya estoy unido" salen de la lista ya cargada, sin otra consulta
+    ya_unido = any(p.id == usuario.id for p in participantes)
+    
+    respuesta = make_response(render_template(
+        'detalle_viaje.html',
+        viaje=viaje,
+        usuario=usuario,
+        participantes=participantes,
+        num_participantes=len(participantes),
+        ya_unido=ya_unido,
+        eventos_url=EVENTOS_URL if servidor_eventos.habilitado else None,
+    ))
+    return condicional.con_validadores(respuesta, etag, ultima)
 
@@ -0,0 +1,32 @@
+from flask import g, has_app_context
+
+# Mapa de identidad con alcance de petición: cada fila cargada por id se guarda
+# en flask.g y las búsquedas repetidas dentro de la misma petición no vuelven
+# a consultar la base de datos. Fuera de una petición no se guarda nada.
+
+NO_CARGADO = object()
+
+
+def _mapa(clase):
+    mapas = g.setdefault('identidad', {})
+    return mapas.setdefault(clase.__name__, {})
+
+
+def obtener(clase, entidad_id):
+    """Devuelve la instancia cargada en esta petición, None si se sabe que no existe, o NO_CARGADO."""
+    if not has_app_context():
+        return NO_CARGADO
+    return _mapa(clase).get(entidad_id, NO_CARGADO)
+
+
+def registrar(clase, entidad_id, instancia):
+    """Guarda la instancia (o None si la fila no existe) para el resto de la petición."""
+    if has_app_context():
+        _mapa(clase)[entidad_id] = instancia
+    return instancia
+
+
+def olvidar(clase, entidad_id):
+    """Quita una entidad del mapa tras modificarla o eliminarla."""
+    if has_app_context():
+        _mapa(clase).pop(entidad_id, None)
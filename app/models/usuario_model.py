@@ -1,31 +1,79 @@
 from app.config.mysqlconnection import connectToMySQL
+from app.config.sentencias import registrar
+from app.models import identidad, versiones
+from app.config.cache import cache, con_version, FALTA
 import re
 from flask import flash
-from bcrypt import checkpw
+from app.config.seguridad import verificar_password, necesita_rehash, hashear_password
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
 EMAIL_REGEX = re.compile(r'^[a-zA-Z0-9.+_-]+@[a-zA-Z0-9]+\.[a-zA-Z]+$')
+# Columnas públicas de usuarios, en el orden que espera Usuario.desde_fila.
+# El hash de la contraseña solo se lee en obtener_por_email (para el login)
+COLUMNAS_USUARIO = "id, nombre, apellido, email, fecha_registro"
+# Sentencias registradas (ver app/config/sentencias.py)
+CONSULTA_POR_ID = registrar("usuario.por_id", f"SELECT {COLUMNAS_USUARIO} FROM usuarios WHERE id = %(id)s;")
+CONSULTA_VARIOS_POR_ID = registrar("usuario.varios_por_id", f"SELECT {COLUMNAS_USUARIO} FROM usuarios WHERE id IN %(ids)s;")
+CONSULTA_PARTICIPANTES = registrar("usuario.participantes", "SELECT usuario_id FROM usuarios_viajes WHERE viaje_id = %(viaje_id)s;")
+CONSULTA_POR_EMAIL = registrar("usuario.por_email", f"SELECT {COLUMNAS_USUARIO}, password FROM usuarios WHERE email = %(email)s;")
+CONSULTA_EMAIL_EXISTE = registrar("usuario.email_existe", "SELECT 1 FROM usuarios WHERE email = %(email)s LIMIT 1;")
+CONSULTA_EMAIL = registrar("usuario.email", "SELECT email FROM usuarios WHERE id = %(id)s;")
+INSERTAR_USUARIO = registrar("usuario.insertar", """
+    INSERT INTO usuarios (nombre, apellido, email, password)
+    VALUES (%(nombre)s, %(apellido)s, %(email)s, %(password)s);
+""")
+ACTUALIZAR_USUARIO = registrar("usuario.actualizar", """
+    UPDATE usuarios SET nombre = %(nombre)s, apellido = %(apellido)s, email = %(email)s
+    WHERE id = %(id)s;
+""")
+ACTUALIZAR_PASSWORD = registrar("usuario.actualizar_password", "UPDATE usuarios SET password = %(password)s WHERE id = %(id)s;")
 
 class Usuario:
     """
     Clase que representa a un usuario y sus operaciones en la base de datos.
     """
     db = os.getenv("MYSQL_DB") 
+    # Sin __dict__ por instancia: las listas de participantes ocupan menos memoria
+    __slots__ = ('id', '_nombre', '_apellido', 'email', 'fecha_registro', 'password')
 
     def __init__(self, data):
         """
         Constructor: inicializa los atributos del usuario
         """
         self.id= data['id']
-        self.nombre = data['nombre'].capitalize()
-        self.apellido = data['apellido'].capitalize()
+        self._nombre = data['nombre']
+        self._apellido = data['apellido']
         self.email = data['email']
-        self.password = data['password']
+        self.password = data.get('password')
         self.fecha_registro = data['fecha_registro']
 
+    @classmethod
+    def desde_fila(cls, fila):
+        """
+        Construye el usuario desde una tupla con las columnas de COLUMNAS_USUARIO
+        (y el hash de la contraseña al final, si se pidió)
+        """
+        usuario = cls.__new__(cls)
+        usuario.id = fila[0]
+        usuario._nombre = fila[1]
+        usuario._apellido = fila[2]
+        usuario.email = fila[3]
+        usuario.fecha_registro = fila[4]
+        usuario.password = fila[5] if len(fila) > 5 else None
+        return usuario
+
+    # Nombre y apellido se capitalizan al mostrarse, no al construir cada fila
+    @property
+    def nombre(self):
+        return self._nombre.capitalize()
+
+    @property
+    def apellido(self):
+        return self._apellido.capitalize()
+
     @classmethod
     def guardar_usuario(cls, data):
         """
@@ -34,45 +82,43 @@ class Usuario:
         #Normaliza nombre y apellido aantes de guardar
         data['nombre'] = data['nombre'].capitalize()
         data['apellido'] = data['apellido'].capitalize()
-        query = "INSERT INTO usuarios (nombre, apellido, email, password) VALUES (%(nombre)s, %(apellido)s,%(email)s,%(password)s);"
-        resultado = connectToMySQL(cls.db).query_db(query, data)
+        resultado = connectToMySQL(cls.db).insert(INSERTAR_USUARIO, data)
         return resultado
     @classmethod
     def obtener_por_email(cls, data):
         """
         Buscar un usuario por su email.
         """
-        query = "SELECT * FROM usuarios WHERE email =%(email)s;"
-        resultado = connectToMySQL(cls.db).query_db(query, data)
+        resultado = connectToMySQL(cls.db).fetch_row(CONSULTA_POR_EMAIL, data)
         if not resultado:
             return None
-        return cls(resultado[0])
+        usuario = cls.desde_fila(resultado)
+        return identidad.registrar(cls, usuario.id, usuario)
     
    
     @classmethod
-    def obtener_por_id(cls, usuario_id):
+    def obtener_por_id(cls, usuario_id, version=None):
         """
-        Buscar un usuario por su ID
+        Buscar un usuario por su ID. `version` es la de "usuarios" con que la
+        página arma su ETag (ver cache.con_version)
         """
-        query = "SELECT * FROM usuarios WHERE id = %(id)s;"
+        usuario = identidad.obtener(cls, usuario_id)
+        if usuario is not identidad.NO_CARGADO:
+            return usuario
         data = {"id": usuario_id}
-        resultado = connectToMySQL(cls.db).query_db(query, data)
-        if not resultado:
-            return None
-        return cls(resultado[0])
-   
+        resultado = cache.obtener_o_cargar(
+            con_version(f"usuario:{usuario_id}", version), lambda: connectToMySQL(cls.db).fetch_row(CONSULTA_POR_ID, data)
+        )
+        return identidad.registrar(cls, usuario_id, cls.desde_fila(resultado) if resultado else None)
+
     @staticmethod
     def validar_registro(usuario):
         """
         Valida los datos del formulario de registro.
         Devuelve True si todo es válido, False se hay errores (y los muestra con flash).
+        La consulta del email solo se hace si las validaciones locales pasan.
         """
         is_valid = True
-        query = "SELECT * FROM usuarios WHERE email = %(email)s;"
-        resultado = connectToMySQL(Usuario.db).query_db(query,usuario)
-        if resultado:
-            flash("El email ya está registro.",'registro')
-            is_valid = False
         if not EMAIL_REGEX.match(usuario['email']):
             flash("Formato de email es inválido.", 'registro')
             is_valid = False
@@ -88,49 +134,95 @@ class Usuario:
         if usuario['password'] != usuario['confirm_password']:
             flash("Las contraseña no coinciden.", 'registro')
             is_valid = False
+        if not is_valid:
+            return False
+        resultado = connectToMySQL(Usuario.db).fetch_one(CONSULTA_EMAIL_EXISTE, usuario)
+        if resultado:
+            flash("El email ya está registro.",'registro')
+            is_valid = False
         return is_valid
     
-    @staticmethod
-    def validar_login(usuario):
+    @classmethod
+    def validar_login(cls, usuario):
         """
         Valida los datos del formulario de login.
-        Devuelve True si todo es válido, False se hay errores (y los muestra con flash).
+        Devuelve el Usuario autenticado, o None si hay errores (y los muestra con flash).
         """
-        is_valid = True
-        query = "SELECT * FROM usuarios WHERE email = %(email)s;"
-        resultado = connectToMySQL(Usuario.db).query_db(query, usuario)
-        if not resultado:
+        if not EMAIL_REGEX.match(usuario['email']) or not usuario['password']:
+            flash("Email o contraseña inválidos.", 'login')
+            return None
+        usuario_db = cls.obtener_por_email(usuario)
+        if not usuario_db:
             flash("Email no registrado.", 'login')
-            is_valid = False
-        elif not checkpw(usuario['password'].encode(), resultado[0]['password'].encode()):
+            return None
+        if not verificar_password(usuario['password'], usuario_db.password):
             flash("Contraseña incorrecta.", 'login')
-            is_valid = False
-        return is_valid
+            return None
+        if necesita_rehash(usuario_db.password):
+            # El hash se creó con otro costo: se actualiza con el costo configurado
+            cls.actualizar_password(usuario_db.id, hashear_password(usuario['password']))
+        return usuario_db
+
+    @classmethod
+    def actualizar_password(cls, usuario_id, password_hash):
+        """
+        Reemplaza el hash de la contraseña del usuario
+        """
+        data = {"id": usuario_id, "password": password_hash}
+        resultado = connectToMySQL(cls.db).execute(ACTUALIZAR_PASSWORD, data)
+        identidad.olvidar(cls, usuario_id)
+        cache.invalidar(f"usuario:{usuario_id}")
+        return resultado
 
     @classmethod
-    def obtener_usuarios_por_viaje(cls, viaje_id):
+    def obtener_usuarios_por_viaje(cls, viaje_id, version=None, version_usuarios=None):
         """
         Lista los usuarios que se unieron a un viaje (incluye creador si está en la tabla de relación).
+        `version` es la de "viaje:<id>" y `version_usuarios` la de "usuarios".
         """
-        query = (
-            "SELECT u.* FROM usuarios u "
-            "JOIN usuarios_viajes uv ON u.id = uv.usuario_id "
-            "WHERE uv.viaje_id = %(viaje_id)s;"
+        # Se cachean solo los ids; los datos de cada usuario salen de su propia
+        # entrada, así un cambio de nombre no deja listas de participantes viejas
+        ids = cache.obtener_o_cargar(
+            con_version(f"participantes:{viaje_id}", version),
+            lambda: [r[0] for r in connectToMySQL(cls.db).fetch_rows(CONSULTA_PARTICIPANTES, {"viaje_id": viaje_id}) or []],
         )
-        resultados = connectToMySQL(cls.db).query_db(query, {"viaje_id": viaje_id})
-        return [cls(r) for r in resultados] if resultados else []
+        return cls.obtener_varios_por_id(ids, version_usuarios) if ids else []
+
+    @classmethod
+    def obtener_varios_por_id(cls, usuario_ids, version=None):
+        """
+        Buscar varios usuarios por ID (en el mismo orden), consultando en un
+        solo SELECT ... IN los que no estén en caché
+        """
+        filas = {}
+        # faltantes: id -> generación de su clave antes de consultar
+        faltantes = {}
+        for usuario_id in usuario_ids:
+            clave = con_version(f"usuario:{usuario_id}", version)
+            fila = cache.get(clave)
+            if fila is FALTA:
+                faltantes[usuario_id] = cache.generacion(clave)
+            else:
+                filas[usuario_id] = fila
+        if faltantes:
+            nuevas = connectToMySQL(cls.db).fetch_rows(CONSULTA_VARIOS_POR_ID, {"ids": list(faltantes)})
+            for fila in nuevas or []:
+                cache.guardar_si_vigente(con_version(f"usuario:{fila[0]}", version), fila, faltantes[fila[0]])
+                filas[fila[0]] = fila
+        return [cls.desde_fila(filas[u]) for u in usuario_ids if u in filas]
 
     @classmethod
     def actualizar_usuario(cls, data, usuario_id):
         """
         Actualizar información del usuario
         """
-        query = """
-        UPDATE usuarios SET nombre = %(nombre)s, apellido = %(apellido)s, 
-                           email = %(email)s WHERE id = %(id)s;
-        """
         data['id'] = usuario_id
-        resultado = connectToMySQL(cls.db).query_db(query, data)
+        resultado = connectToMySQL(cls.db).execute(ACTUALIZAR_USUARIO, data)
+        identidad.olvidar(cls, usuario_id)
+        cache.invalidar(f"usuario:{usuario_id}")
+        if resultado:
+            # Los nombres aparecen en el dashboard y en el detalle de los viajes
+            versiones.incrementar("usuarios")
         return resultado
 
     @staticmethod
@@ -141,13 +233,11 @@ class Usuario:
         is_valid = True
         
         # Validar email si ha cambiado
-        query = "SELECT email FROM usuarios WHERE id = %(id)s;"
-        resultado = connectToMySQL(Usuario.db).query_db(query, {'id': usuario_id})
-        email_actual = resultado[0]['email'] if resultado else ''
+        resultado = connectToMySQL(Usuario.db).fetch_row(CONSULTA_EMAIL, {'id': usuario_id})
+        email_actual = resultado[0] if resultado else ''
         
         if data['email'] != email_actual:
-            query = "SELECT * FROM usuarios WHERE email = %(email)s;"
-            resultado = connectToMySQL(Usuario.db).query_db(query, data)
+            resultado = connectToMySQL(Usuario.db).fetch_one(CONSULTA_EMAIL_EXISTE, data)
             if resultado:
                 flash("El email ya está registrado.", 'error')
                 is_valid = False
@@ -172,11 +262,6 @@ class Usuario:
         """
         Devuelve todos los viajes en los que un usuario está unido
         """
-        query = """
-            SELECT v.* FROM viajes v
-            JOIN usuarios_viajes uv ON v.id = uv.viaje_id
-            WHERE uv.usuario_id = %(usuario_id)s;
-        """
-        data = {"usuario_id": usuario_id}
-        resultados = connectToMySQL(cls.db).query_db(query, data)
-        return [cls(resultado) for resultado in resultados] if resultados else []
\ No newline at end of file
+        # Import diferido para no crear un ciclo entre los modelos
+        from app.models.viaje_model import Viaje
+        return Viaje.obtener_viajes_usuario(usuario_id)
\ No newline at end of file
@@ -0,0 +1,35 @@
+from app.config.mysqlconnection import connectToMySQL, MYSQL_DB
+from app.config.sentencias import registrar
+
+# Versiones por clave en la tabla `versiones` (migración 003). Las escrituras
+# las incrementan después de modificar los datos; las páginas las leen con una
+# búsqueda por clave primaria para decidir si pueden responder 304. Al vivir en
+# la base, todos los workers ven la misma versión.
+
+CONSULTA_VERSIONES = registrar(
+    "versiones.obtener", "SELECT clave, version, actualizado_en FROM versiones WHERE clave IN %(claves)s;"
+)
+
+
+def incrementar(*claves):
+    """Sube la versión de cada clave (la crea si no existe)."""
+    if not claves:
+        return None
+    query = (
+        "INSERT INTO versiones (clave, version) VALUES "
+        + ", ".join(["(%s, 1)"] * len(claves))
+        + " ON DUPLICATE KEY UPDATE version = version + 1, actualizado_en = CURRENT_TIMESTAMP(6);"
+    )
+    return connectToMySQL(MYSQL_DB).execute(query, claves)
+
+
+def obtener(*claves):
+    """Devuelve ({clave: versión}, última modificación) o None si no se pudo leer."""
+    filas = connectToMySQL(MYSQL_DB).fetch_rows(CONSULTA_VERSIONES, {"claves": list(claves)})
+    if filas is False:
+        return None
+    por_clave = {f[0]: f for f in filas or []}
+    versiones = {c: por_clave[c][1] if c in por_clave else 0 for c in claves}
+    fechas = [por_clave[c][2] for c in claves if c in por_clave]
+    return versiones, max(fechas) if fechas else None
+
@@ -1,141 +1,601 @@
 from app.config.mysqlconnection import connectToMySQL
+from app.config.sentencias import registrar
+from app.models import identidad, versiones
+from app.config.cache import cache, con_version
+from app.config.busqueda import BUSQUEDA_BACKEND, indice_viajes
+from app.config.eventos import eventos
+from app.config.fechas import formatear_fecha
 from flask import flash
+from datetime import date, timedelta
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 db = os.getenv("MYSQL_DB")
+# Cantidad de viajes disponibles que se envían al dashboard en la primera carga
+LIMITE_DISPONIBLES = int(os.getenv("DASHBOARD_LIMITE_DISPONIBLES", "50"))
+# Resultados por página de la búsqueda de texto y páginas máximas que se pueden pedir
+POR_PAGINA_BUSQUEDA = 20
+MAX_PAGINAS_BUSQUEDA = 50
+# Columnas que se leen de viajes, en el orden que espera Viaje.desde_fila
+COLUMNAS_VIAJE = "v.id, v.titulo, v.descripcion, v.fecha_inicio, v.fecha_fin, v.creado_por, v.fecha_creacion"
+
+# Sentencias registradas (ver app/config/sentencias.py)
+CONSULTA_POR_ID = registrar("viaje.por_id", f"SELECT {COLUMNAS_VIAJE} FROM viajes v WHERE v.id = %(id)s;")
+CONSULTA_VARIOS_POR_ID = registrar("viaje.varios_por_id", f"SELECT {COLUMNAS_VIAJE} FROM viajes v WHERE v.id IN %(ids)s;")
+CONSULTA_CREADOS = registrar("viaje.creados", f"SELECT {COLUMNAS_VIAJE} FROM viajes v WHERE v.creado_por = %(usuario_id)s;")
+CONSULTA_UNIDOS = registrar("viaje.unidos", f"""
+    SELECT {COLUMNAS_VIAJE} FROM viajes v
+    JOIN usuarios_viajes uv ON v.id = uv.viaje_id
+    WHERE uv.usuario_id = %(usuario_id)s;
+""")
+# Agenda del usuario: creados + unidos en una sola consulta
+CONSULTA_AGENDA = registrar("viaje.agenda", f"""
+    SELECT {COLUMNAS_VIAJE}, 1 AS es_creador FROM viajes v
+    WHERE v.creado_por = %(usuario_id)s
+    UNION ALL
+    SELECT {COLUMNAS_VIAJE}, 0 AS es_creador FROM viajes v
+    JOIN usuarios_viajes uv ON v.id = uv.viaje_id
+    WHERE uv.usuario_id = %(usuario_id)s;
+""")
+# Para el dashboard en streaming: la agenda con el conteo de participantes en
+# la misma consulta (una sola sentencia abierta mientras se recorren las filas)
+# y los totales de la agenda, que se muestran antes de las filas
+CONSULTA_AGENDA_PARTICIPANTES = registrar("viaje.agenda_con_participantes", f"""
+    SELECT {COLUMNAS_VIAJE}, 1 + (
+        SELECT COUNT(*) FROM usuarios_viajes p WHERE p.viaje_id = v.id AND p.usuario_id <> v.creado_por
+    ) AS participantes
+    FROM viajes v
+    WHERE v.creado_por = %(usuario_id)s
+    UNION ALL
+    SELECT {COLUMNAS_VIAJE}, 1 + (
+        SELECT COUNT(*) FROM usuarios_viajes p WHERE p.viaje_id = v.id AND p.usuario_id <> v.creado_por
+    ) AS participantes
+    FROM viajes v
+    JOIN usuarios_viajes uv ON v.id = uv.viaje_id
+    WHERE uv.usuario_id = %(usuario_id)s;
+""")
+CONSULTA_RESUMEN_AGENDA = registrar("viaje.resumen_agenda", """
+    SELECT (SELECT COUNT(*) FROM viajes WHERE creado_por = %(usuario_id)s) AS creados,
+           (SELECT COUNT(*) FROM usuarios_viajes WHERE usuario_id = %(usuario_id)s) AS unidos;
+""")
+CONSULTA_PARTICIPANTES = registrar("viaje.participantes", """
+    SELECT uv.viaje_id, SUM(uv.usuario_id <> v.creado_por) AS participantes
+    FROM usuarios_viajes uv
+    JOIN viajes v ON v.id = uv.viaje_id
+    WHERE uv.viaje_id IN %(ids)s
+    GROUP BY uv.viaje_id;
+""")
+CONSULTA_YA_UNIDO = registrar("viaje.ya_unido", """
+    SELECT 1 FROM usuarios_viajes
+    WHERE usuario_id = %(usuario_id)s AND viaje_id = %(viaje_id)s;
+""")
+CONSULTA_INDICE = registrar("viaje.indice_texto", "SELECT id, titulo, descripcion FROM viajes;")
+CONSULTA_TEXTO = registrar("viaje.buscar_texto", f"""
+    SELECT {COLUMNAS_VIAJE}, MATCH (v.titulo, v.descripcion) AGAINST (%(texto)s IN NATURAL LANGUAGE MODE) AS relevancia
+    FROM viajes v
+    WHERE MATCH (v.titulo, v.descripcion) AGAINST (%(texto)s IN NATURAL LANGUAGE MODE)
+    ORDER BY relevancia DESC, v.id
+    LIMIT %(limite)s OFFSET %(desplazamiento)s;
+""")
+
+
+def _consulta_disponibles(con_cursor, con_total):
+    filtro_cursor = """
+      AND (v.fecha_inicio > %(cursor_fecha)s
+           OR (v.fecha_inicio = %(cursor_fecha)s AND v.id > %(cursor_id)s))
+    """ if con_cursor else ""
+    columna_total = ", COUNT(*) OVER () AS total_disponibles" if con_total else ""
+    return f"""
+        SELECT {COLUMNAS_VIAJE}{columna_total} FROM viajes v
+        WHERE v.creado_por <> %(usuario_id)s
+          AND NOT EXISTS (
+              SELECT 1 FROM usuarios_viajes uv
+              WHERE uv.usuario_id = %(usuario_id)s AND uv.viaje_id = v.id
+          ){filtro_cursor}
+        ORDER BY v.fecha_inicio, v.id
+        LIMIT %(limite)s;
+    """
+
+
+# Variantes por (página siguiente, con total). El total solo se calcula en la primera página
+CONSULTAS_DISPONIBLES = {
+    (False, True): registrar("viaje.disponibles_con_total", _consulta_disponibles(False, True)),
+    (False, False): registrar("viaje.disponibles", _consulta_disponibles(False, False)),
+    (True, False): registrar("viaje.disponibles_siguientes", _consulta_disponibles(True, False)),
+}
+
+# Dos viajes se solapan si comparten al menos un día (fechas inclusivas).
+# Viajes de la agenda del usuario (creados o unidos) que se solapan con el
+# viaje indicado; cada mitad recorre un rango de índice, no toda la agenda
+CONSULTA_CONFLICTOS = registrar("viaje.conflictos", f"""
+    SELECT {COLUMNAS_VIAJE} FROM viajes o
+    JOIN viajes v ON v.creado_por = %(usuario_id)s
+     AND v.fecha_inicio <= o.fecha_fin AND v.fecha_fin >= o.fecha_inicio
+    WHERE o.id = %(viaje_id)s AND v.id <> o.id
+    UNION ALL
+    SELECT {COLUMNAS_VIAJE} FROM viajes o
+    JOIN usuarios_viajes uv ON uv.usuario_id = %(usuario_id)s AND uv.viaje_id <> o.id
+    JOIN viajes v ON v.id = uv.viaje_id
+     AND v.fecha_inicio <= o.fecha_fin AND v.fecha_fin >= o.fecha_inicio
+    WHERE o.id = %(viaje_id)s
+    ORDER BY 4, 1;
+""")
+# Fechas centinela para los huecos abiertos antes y después de la agenda
+FECHA_MINIMA = date(1000, 1, 1)
+FECHA_MAXIMA = date(9999, 12, 31)
+
+
+def _consulta_compatibles(con_cursor):
+    # La agenda ordenada por fecha de inicio se convierte en huecos libres
+    # (fin máximo de los anteriores, inicio del siguiente), disjuntos entre sí.
+    # Un viaje es compatible si cabe entero en un hueco: cada hueco es un rango
+    # del índice (fecha_inicio, id, fecha_fin), sin comparar viaje contra viaje.
+    # Los viajes propios y los ya unidos ocupan su propio intervalo, así que
+    # nunca caen en un hueco.
+    recorte, origen, filtro_cursor = "", "huecos", ""
+    if con_cursor:
+        # Solo los huecos que siguen al cursor, recortados para empezar en su
+        # fecha: el límite inferior del rango sigue siendo una sola expresión
+        recorte = """, pendientes AS (
+            SELECT CASE WHEN desde < %(cursor_previo)s THEN %(cursor_previo)s ELSE desde END AS desde, hasta
+            FROM huecos WHERE hasta > %(cursor_fecha)s
+        )"""
+        origen = "pendientes"
+        filtro_cursor = " AND (v.fecha_inicio > %(cursor_fecha)s OR v.id > %(cursor_id)s)"
+    return f"""
+        WITH agenda AS (
+            SELECT fecha_inicio, fecha_fin FROM viajes WHERE creado_por = %(usuario_id)s
+            UNION ALL
+            SELECT v.fecha_inicio, v.fecha_fin FROM usuarios_viajes uv
+            JOIN viajes v ON v.id = uv.viaje_id
+            WHERE uv.usuario_id = %(usuario_id)s
+        ), huecos AS (
+            SELECT COALESCE(MAX(fecha_fin) OVER (
+                       ORDER BY fecha_inicio ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+                   ), %(minima)s) AS desde,
+                   fecha_inicio AS hasta
+            FROM agenda
+            UNION ALL
+            SELECT COALESCE(MAX(fecha_fin), %(minima)s), %(maxima)s FROM agenda
+        ){recorte}
+        SELECT {COLUMNAS_VIAJE} FROM {origen} h
+        JOIN viajes v ON v.fecha_inicio > h.desde AND v.fecha_inicio < h.hasta AND v.fecha_fin < h.hasta
+        WHERE h.desde < h.hasta{filtro_cursor}
+        ORDER BY v.fecha_inicio, v.id
+        LIMIT %(limite)s;
+    """
+
+
+CONSULTAS_COMPATIBLES = {
+    False: registrar("viaje.compatibles", _consulta_compatibles(False)),
+    True: registrar("viaje.compatibles_siguientes", _consulta_compatibles(True)),
+}
+
+INSERTAR_VIAJE = registrar("viaje.insertar", """
+    INSERT INTO viajes (titulo, descripcion, fecha_inicio, fecha_fin, creado_por)
+    VALUES (%(titulo)s, %(descripcion)s, %(fecha_inicio)s, %(fecha_fin)s, %(creado_por)s);
+""")
+# El SELECT no devuelve filas si el viaje no existe o es del usuario.
+# Si la unión ya existe, la clave UNIQUE (usuario_id, viaje_id) dispara el
+# UPDATE, que no modifica la fila pero deja su id en LAST_INSERT_ID.
+UNIR_USUARIO = registrar("viaje.unir", """
+    INSERT INTO usuarios_viajes (usuario_id, viaje_id, rol_id)
+    SELECT %(usuario_id)s, v.id, 2 FROM viajes v
+    WHERE v.id = %(viaje_id)s AND v.creado_por <> %(usuario_id)s
+    ON DUPLICATE KEY UPDATE usuarios_viajes.id = LAST_INSERT_ID(usuarios_viajes.id);
+""")
+SALIR_USUARIO = registrar("viaje.salir", """
+    DELETE FROM usuarios_viajes
+    WHERE usuario_id = %(usuario_id)s AND viaje_id = %(viaje_id)s;
+""")
+ACTUALIZAR_VIAJE = registrar("viaje.actualizar", """
+    UPDATE viajes SET titulo = %(titulo)s, descripcion = %(descripcion)s,
+                      fecha_inicio = %(fecha_inicio)s, fecha_fin = %(fecha_fin)s
+    WHERE id = %(id)s AND creado_por = %(creado_por)s;
+""")
+# Relaciones primero por integridad referencial (solo si el viaje es del usuario)
+ELIMINAR_UNIONES = registrar("viaje.eliminar_uniones", """
+    DELETE uv FROM usuarios_viajes uv JOIN viajes v ON v.id = uv.viaje_id
+    WHERE v.id = %(id)s AND v.creado_por = %(creado_por)s;
+""")
+ELIMINAR_VIAJE = registrar("viaje.eliminar", "DELETE FROM viajes WHERE id = %(id)s AND creado_por = %(creado_por)s;")
 
 class Viaje:
+    # Sin __dict__ por instancia: los listados grandes ocupan menos memoria
+    __slots__ = (
+        'id', '_titulo', 'descripcion', 'fecha_inicio', 'fecha_fin',
+        'creado_por', 'fecha_creacion', 'num_participantes',
+    )
+
+    # Resultados posibles de unir_usuario
+    UNION_CREADA = 'creada'
+    UNION_EXISTENTE = 'existente'
+    VIAJE_NO_DISPONIBLE = 'no_disponible'
+
     def __init__(self, data):
         self.id = data['id']
-        self.titulo = data['titulo'].capitalize()
+        self._titulo = data['titulo']
         self.descripcion = data['descripcion']
         self.fecha_inicio = data['fecha_inicio']
         self.fecha_fin = data['fecha_fin']
         self.creado_por = data['creado_por']
         self.fecha_creacion = data['fecha_creacion']
+        # Se completa con cargar_participantes
+        self.num_participantes = None
 
     @classmethod
-    def obtener_todos(cls):
-        query = "SELECT * FROM viajes;"
-        resultados = connectToMySQL(db).query_db(query)
-        viajes = [cls(viaje) for viaje in resultados]
-        return viajes
-    
+    def desde_fila(cls, fila):
+        """
+        Construye el viaje desde una tupla con las columnas de COLUMNAS_VIAJE
+        (la consulta puede agregar columnas extra al final).
+        """
+        viaje = cls.__new__(cls)
+        viaje.id = fila[0]
+        viaje._titulo = fila[1]
+        viaje.descripcion = fila[2]
+        viaje.fecha_inicio = fila[3]
+        viaje.fecha_fin = fila[4]
+        viaje.creado_por = fila[5]
+        viaje.fecha_creacion = fila[6]
+        viaje.num_participantes = None
+        return viaje
+
+    @property
+    def titulo(self):
+        # Se capitaliza al mostrarse, no al construir cada fila
+        return self._titulo.capitalize()
+
     @classmethod
     def guardar_viaje(cls, data):
-        query = """
-        INSERT INTO viajes (titulo, descripcion, fecha_inicio, fecha_fin, creado_por) 
-        VALUES (%(titulo)s, %(descripcion)s, %(fecha_inicio)s, %(fecha_fin)s, %(creado_por)s);
-        """
-        resultado = connectToMySQL(db).query_db(query, data)
+        resultado = connectToMySQL(db).insert(INSERTAR_VIAJE, data)
+        if resultado:
+            versiones.incrementar("viajes")
+        if resultado and indice_viajes.construido:
+            indice_viajes.agregar(resultado, data['titulo'], data['descripcion'])
         return resultado
     
     @classmethod
     def unir_usuario(cls, usuario_id, viaje_id):
-        # Verificar que el viaje existe
-        viaje = cls.obtener_por_id(viaje_id)
-        if not viaje:
-            return False
-        
-        # Evitar duplicados
-        existe_q = "SELECT 1 FROM usuarios_viajes WHERE usuario_id=%(usuario_id)s AND viaje_id=%(viaje_id)s;"
-        data = {"usuario_id": usuario_id, "viaje_id": viaje_id}
-        existe = connectToMySQL(db).query_db(existe_q, data)
-        if existe:
-            return None
-        
-        # Unir usuario con rol_id = 2 (participante)
-        query = """
-            INSERT INTO usuarios_viajes (usuario_id, viaje_id, rol_id)
-            VALUES (%(usuario_id)s, %(viaje_id)s, 2);
         """
-        return connectToMySQL(db).query_db(query, data)
+        Une al usuario al viaje como participante (rol_id = 2) en una sola
+        sentencia atómica e idempotente. Devuelve UNION_CREADA, UNION_EXISTENTE,
+        VIAJE_NO_DISPONIBLE (no existe o es del propio usuario) o False si falla.
+        """
+        data = {"usuario_id": usuario_id, "viaje_id": viaje_id}
+        conexion = connectToMySQL(db)
+        filas = conexion.execute(UNIR_USUARIO, data)
+        if filas is False:
+            return False
+        if filas == 1:
+            cache.invalidar(f"participantes:{viaje_id}")
+            versiones.incrementar("viajes", f"viaje:{viaje_id}")
+            # Solo el id: la página que lo recibe vuelve a pedir la lista
+            eventos.publicar(f"viaje:{viaje_id}", "union", usuario_id=usuario_id)
+            return cls.UNION_CREADA
+        if conexion.lastrowid:
+            return cls.UNION_EXISTENTE
+        return cls.VIAJE_NO_DISPONIBLE
 
     @classmethod
     def salir_usuario(cls, usuario_id, viaje_id):
-        query = """
-            DELETE FROM usuarios_viajes
-            WHERE usuario_id = %(usuario_id)s AND viaje_id = %(viaje_id)s;
+        """
+        Quita al usuario del viaje. Devuelve el número de uniones eliminadas
+        (0 si no estaba unido o el viaje no existe) o False si falla.
         """
         data = {
             "usuario_id": usuario_id,
             "viaje_id": viaje_id
         }
-        return connectToMySQL(db).query_db(query, data)
+        filas = connectToMySQL(db).execute(SALIR_USUARIO, data)
+        if filas:
+            cache.invalidar(f"participantes:{viaje_id}")
+            versiones.incrementar("viajes", f"viaje:{viaje_id}")
+            eventos.publicar(f"viaje:{viaje_id}", "salida", usuario_id=usuario_id)
+        return filas
 
     @classmethod
     def obtener_viajes_usuario(cls, usuario_id):
-        query = """
-            SELECT v.* FROM viajes v
-            JOIN usuarios_viajes uv ON v.id = uv.viaje_id
-            WHERE uv.usuario_id = %(usuario_id)s;
+        data = {"usuario_id": usuario_id}
+        resultados = connectToMySQL(db).fetch_rows(CONSULTA_UNIDOS, data)
+        return [cls.desde_fila(r) for r in resultados] if resultados else []
+
+    @classmethod
+    def obtener_dashboard(cls, usuario_id, limite=LIMITE_DISPONIBLES):
+        """
+        Calcula en la base de datos los tres grupos del dashboard:
+        viajes creados, viajes unidos y viajes disponibles (con su total).
+        """
+        data = {"usuario_id": usuario_id}
+        resultados = connectToMySQL(db).fetch_rows(CONSULTA_AGENDA, data) or []
+        # es_creador es la columna que sigue a las de COLUMNAS_VIAJE
+        creados = [cls.desde_fila(r) for r in resultados if r[7]]
+        unidos = [cls.desde_fila(r) for r in resultados if not r[7]]
+
+        disponibles, siguiente, total = cls.obtener_disponibles(usuario_id, limite=limite, con_total=True)
+        # Conteo de participantes de todos los viajes visibles en una consulta
+        cls.cargar_participantes(creados + unidos + disponibles)
+        return {
+            "creados": creados,
+            "unidos": unidos,
+            "disponibles": disponibles,
+            "siguiente": siguiente,
+            "total_disponibles": total,
+        }
+
+    @classmethod
+    def obtener_dashboard_streaming(cls, usuario_id, limite=LIMITE_DISPONIBLES):
+        """
+        Como obtener_dashboard, pero sin cargar la agenda: devuelve sus totales
+        y en 'agenda' un generador que la lee con un cursor del lado del
+        servidor recién cuando se recorre (al transmitir la página).
+        """
+        resumen = connectToMySQL(db).fetch_row(CONSULTA_RESUMEN_AGENDA, {"usuario_id": usuario_id})
+        disponibles, siguiente, total = cls.obtener_disponibles(usuario_id, limite=limite, con_total=True)
+        cls.cargar_participantes(disponibles)
+        return {
+            "num_creados": int(resumen[0]) if resumen else 0,
+            "num_unidos": int(resumen[1]) if resumen else 0,
+            "agenda": cls.iterar_agenda(usuario_id),
+            "disponibles": disponibles,
+            "siguiente": siguiente,
+            "total_disponibles": total,
+        }
+
+    @classmethod
+    def iterar_agenda(cls, usuario_id):
+        """
+        Genera los viajes creados y unidos del usuario, con num_participantes,
+        de a uno: la memoria no crece con el tamaño de la agenda.
         """
         data = {"usuario_id": usuario_id}
-        resultados = connectToMySQL(db).query_db(query, data)
-        return [cls(r) for r in resultados] if resultados else []
+        for fila in connectToMySQL(db).iterar_filas(CONSULTA_AGENDA_PARTICIPANTES, data, tamano=200):
+            viaje = cls.desde_fila(fila)
+            viaje.num_participantes = int(fila[7])
+            yield viaje
+
+    @classmethod
+    def obtener_disponibles(cls, usuario_id, despues=None, limite=LIMITE_DISPONIBLES, con_total=False):
+        """
+        Página de viajes disponibles (ni creados ni unidos por el usuario) con
+        paginación por cursor sobre (fecha_inicio, id).
+        `despues` es el cursor devuelto por la página anterior.
+        Devuelve (viajes, cursor_siguiente o None, total o None).
+        """
+        data = {"usuario_id": usuario_id, "limite": limite + 1}
+        if despues:
+            data['cursor_fecha'], data['cursor_id'] = cls.leer_cursor(despues)
+        # El total solo se cuenta en la primera página
+        con_total = bool(con_total and not despues)
+        resultados = connectToMySQL(db).fetch_rows(CONSULTAS_DISPONIBLES[(bool(despues), con_total)], data) or []
+        total = None
+        if con_total:
+            total = resultados[0][7] if resultados else 0
+        # Se pide una fila de más para saber si existe una página siguiente
+        viajes = [cls.desde_fila(r) for r in resultados[:limite]]
+        siguiente = cls.crear_cursor(viajes[-1]) if len(resultados) > limite else None
+        return viajes, siguiente, total
+
+    @classmethod
+    def obtener_compatibles(cls, usuario_id, despues=None, limite=LIMITE_DISPONIBLES):
+        """
+        Página de viajes que caben en las fechas libres del usuario: no se
+        solapan con ninguno de sus viajes creados ni unidos. Pagina por cursor
+        igual que obtener_disponibles: devuelve (viajes, cursor_siguiente o None).
+        """
+        data = {"usuario_id": usuario_id, "limite": limite + 1,
+                "minima": FECHA_MINIMA, "maxima": FECHA_MAXIMA}
+        if despues:
+            data['cursor_fecha'], data['cursor_id'] = cls.leer_cursor(despues)
+            data['cursor_previo'] = data['cursor_fecha'] - timedelta(days=1)
+        resultados = connectToMySQL(db).fetch_rows(CONSULTAS_COMPATIBLES[bool(despues)], data) or []
+        viajes = [cls.desde_fila(r) for r in resultados[:limite]]
+        siguiente = cls.crear_cursor(viajes[-1]) if len(resultados) > limite else None
+        return viajes, siguiente
+
+    @classmethod
+    def conflictos(cls, usuario_id, viaje_id):
+        """Viajes creados o unidos por el usuario cuyas fechas se solapan con las del viaje."""
+        data = {"usuario_id": usuario_id, "viaje_id": viaje_id}
+        resultados = connectToMySQL(db).fetch_rows(CONSULTA_CONFLICTOS, data) or []
+        return [cls.desde_fila(r) for r in resultados]
+
+    @staticmethod
+    def crear_cursor(viaje):
+        """Cursor de paginación con la posición del viaje: 'AAAA-MM-DD_id'."""
+        return f"{viaje.fecha_inicio}_{viaje.id}"
+
+    @staticmethod
+    def leer_cursor(cursor):
+        """Convierte un cursor 'AAAA-MM-DD_id' en (fecha, id). Lanza ValueError si es inválido."""
+        fecha, _, viaje_id = cursor.partition('_')
+        return date.fromisoformat(fecha), int(viaje_id)
+
+    @classmethod
+    def _consulta_busqueda(cls, desde=None, hasta=None, creado_por=None, despues=None, limite=LIMITE_DISPONIBLES):
+        # Arma la consulta de búsqueda; cada filtro usa los índices
+        # (fecha_inicio, id, ...) o (creado_por, fecha_inicio, id, ...) de la migración 001
+        condiciones = []
+        data = {"limite": limite + 1}
+        if creado_por is not None:
+            condiciones.append("v.creado_por = %(creado_por)s")
+            data['creado_por'] = creado_por
+        if desde is not None:
+            condiciones.append("v.fecha_inicio >= %(desde)s")
+            data['desde'] = desde
+        if hasta is not None:
+            condiciones.append("v.fecha_inicio <= %(hasta)s")
+            data['hasta'] = hasta
+        if despues:
+            data['cursor_fecha'], data['cursor_id'] = cls.leer_cursor(despues)
+            condiciones.append(
+                "(v.fecha_inicio > %(cursor_fecha)s"
+                " OR (v.fecha_inicio = %(cursor_fecha)s AND v.id > %(cursor_id)s))"
+            )
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        query = f"""
+            SELECT {COLUMNAS_VIAJE} FROM viajes v
+            {where}
+            ORDER BY v.fecha_inicio, v.id
+            LIMIT %(limite)s;
+        """
+        return query, data
+
+    @classmethod
+    def buscar(cls, desde=None, hasta=None, creado_por=None, despues=None, limite=LIMITE_DISPONIBLES):
+        """
+        Busca viajes cuya fecha de inicio está entre `desde` y `hasta` (ambas
+        opcionales e inclusivas) y, opcionalmente, de un creador.
+        Pagina por cursor igual que obtener_disponibles: devuelve (viajes, cursor_siguiente o None).
+        """
+        query, data = cls._consulta_busqueda(desde, hasta, creado_por, despues, limite)
+        resultados = connectToMySQL(db).fetch_rows(query, data) or []
+        viajes = [cls.desde_fila(r) for r in resultados[:limite]]
+        siguiente = cls.crear_cursor(viajes[-1]) if len(resultados) > limite else None
+        return viajes, siguiente
+
+    @classmethod
+    def explicar_busqueda(cls, **filtros):
+        """Plan de ejecución (EXPLAIN) de la búsqueda con esos filtros."""
+        query, data = cls._consulta_busqueda(**filtros)
+        return connectToMySQL(db).fetch_all("EXPLAIN " + query.strip(), data) or []
+
+    @classmethod
+    def buscar_texto(cls, texto, pagina=1, por_pagina=POR_PAGINA_BUSQUEDA):
+        """
+        Busca viajes por título y descripción, ordenados por relevancia.
+        Usa el índice FULLTEXT de MySQL o, con BUSQUEDA_BACKEND=memoria, el
+        índice invertido en memoria. Devuelve (viajes, hay_pagina_siguiente).
+        """
+        pagina = max(1, min(pagina, MAX_PAGINAS_BUSQUEDA))
+        desplazamiento = (pagina - 1) * por_pagina
+        if BUSQUEDA_BACKEND == "memoria":
+            cls._construir_indice()
+            ids = indice_viajes.buscar(texto, por_pagina + 1, desplazamiento)
+            return cls.obtener_varios_por_id(ids[:por_pagina]), len(ids) > por_pagina
+
+        data = {"texto": texto, "limite": por_pagina + 1, "desplazamiento": desplazamiento}
+        resultados = connectToMySQL(db).fetch_rows(CONSULTA_TEXTO, data) or []
+        return [cls.desde_fila(r) for r in resultados[:por_pagina]], len(resultados) > por_pagina
+
+    @classmethod
+    def obtener_varios_por_id(cls, viaje_ids):
+        """Carga varios viajes en un solo SELECT ... IN, en el mismo orden de los ids."""
+        if not viaje_ids:
+            return []
+        resultados = connectToMySQL(db).fetch_rows(CONSULTA_VARIOS_POR_ID, {"ids": list(viaje_ids)}) or []
+        por_id = {r[0]: r for r in resultados}
+        return [cls.desde_fila(por_id[i]) for i in viaje_ids if i in por_id]
+
+    @classmethod
+    def _construir_indice(cls):
+        # El índice en memoria se llena una vez por proceso; luego lo mantienen las escrituras
+        if indice_viajes.construido:
+            return
+        for viaje_id, titulo, descripcion in connectToMySQL(db).fetch_rows(CONSULTA_INDICE) or []:
+            indice_viajes.agregar(viaje_id, titulo, descripcion)
+        indice_viajes.construido = True
+
+    def como_dict(self):
+        """Representación JSON del viaje (fechas en formato ISO)."""
+        return {
+            "id": self.id,
+            "titulo": self.titulo,
+            "descripcion": self.descripcion,
+            "fecha_inicio": self.fecha_inicio.isoformat(),
+            "fecha_fin": self.fecha_fin.isoformat(),
+            "creado_por": self.creado_por,
+        }
+
+    @classmethod
+    def cargar_participantes(cls, viajes):
+        """
+        Completa num_participantes (incluye al organizador) en cada viaje con
+        una sola consulta agrupada, sin importar cuántos sean.
+        """
+        if not viajes:
+            return viajes
+        data = {"ids": list({v.id for v in viajes})}
+        resumen = {r[0]: r for r in connectToMySQL(db).fetch_rows(CONSULTA_PARTICIPANTES, data) or []}
+        for viaje in viajes:
+            fila = resumen.get(viaje.id)
+            viaje.num_participantes = 1 + (int(fila[1]) if fila else 0)
+        return viajes
 
     @classmethod
     def usuario_ya_unido(cls, usuario_id, viaje_id):
         """Verifica si un usuario ya está unido a un viaje específico"""
-        query = """
-            SELECT 1 FROM usuarios_viajes 
-            WHERE usuario_id = %(usuario_id)s AND viaje_id = %(viaje_id)s;
-        """
         data = {"usuario_id": usuario_id, "viaje_id": viaje_id}
-        resultado = connectToMySQL(db).query_db(query, data)
+        resultado = connectToMySQL(db).fetch_one(CONSULTA_YA_UNIDO, data)
         return bool(resultado)
 
 
     
     @classmethod
-    def obtener_por_id(cls, viaje_id):
-        query = "SELECT * FROM viajes WHERE id = %(id)s;"
+    def obtener_por_id(cls, viaje_id, version=None):
+        # Si ya se cargó en esta petición no se vuelve a consultar. `version`
+        # es la de "viaje:<id>" con que la página arma su ETag
+        viaje = identidad.obtener(cls, viaje_id)
+        if viaje is not identidad.NO_CARGADO:
+            return viaje
         data = {'id': viaje_id}
-        resultado = connectToMySQL(db).query_db(query, data)
-        if not resultado:
-            return None
-        return cls(resultado[0])
-    
+        resultado = cache.obtener_o_cargar(
+            con_version(f"viaje:{viaje_id}", version), lambda: connectToMySQL(db).fetch_row(CONSULTA_POR_ID, data)
+        )
+        return identidad.registrar(cls, viaje_id, cls.desde_fila(resultado) if resultado else None)
+
     @classmethod
     def actualizar_viaje(cls, viaje_id, data):
-        query = """
-        UPDATE viajes SET titulo = %(titulo)s, descripcion = %(descripcion)s, 
-                           fecha_inicio = %(fecha_inicio)s, fecha_fin = %(fecha_fin)s 
-        WHERE id = %(id)s AND creado_por = %(creado_por)s;
-        """
         data['id'] = viaje_id
-        resultado = connectToMySQL(db).query_db(query, data)
+        resultado = connectToMySQL(db).execute(ACTUALIZAR_VIAJE, data)
+        identidad.olvidar(cls, viaje_id)
+        cache.invalidar(f"viaje:{viaje_id}")
+        if resultado:
+            versiones.incrementar("viajes", f"viaje:{viaje_id}")
+            # Título y fechas van ya formateados como en la página de detalle
+            # (Viaje.titulo capitaliza al mostrarse)
+            eventos.publicar(
+                f"viaje:{viaje_id}", "edicion", titulo=data['titulo'].capitalize(), descripcion=data['descripcion'],
+                fecha_inicio=formatear_fecha(data['fecha_inicio'], 'larga'),
+                fecha_fin=formatear_fecha(data['fecha_fin'], 'larga'),
+            )
+        if resultado and indice_viajes.construido:
+            indice_viajes.agregar(viaje_id, data['titulo'], data['descripcion'])
         return resultado
     
     @classmethod
     def eliminar_viaje(cls, viaje_id, usuario_id):
-        # Borrar relaciones primero por integridad referencial
-        connectToMySQL(db).query_db("DELETE FROM usuarios_viajes WHERE viaje_id = %(id)s;", {'id': viaje_id})
-        query = "DELETE FROM viajes WHERE id = %(id)s AND creado_por = %(creado_por)s;"
+        """
+        Elimina el viaje del usuario y sus uniones en una sola transacción.
+        Devuelve el número de viajes eliminados (0 si no es del usuario) o False si falla.
+        """
         data = {'id': viaje_id, 'creado_por': usuario_id}
-        resultado = connectToMySQL(db).query_db(query, data)
+        try:
+            with connectToMySQL(db).transaction() as conexion:
+                conexion.execute(ELIMINAR_UNIONES, data)
+                resultado = conexion.execute(ELIMINAR_VIAJE, data)
+        except Exception:
+            return False
+        identidad.olvidar(cls, viaje_id)
+        cache.invalidar(f"viaje:{viaje_id}", f"participantes:{viaje_id}")
+        if resultado:
+            versiones.incrementar("viajes", f"viaje:{viaje_id}")
+            indice_viajes.quitar(viaje_id)
+            eventos.publicar(f"viaje:{viaje_id}", "eliminacion")
         return resultado
     
     @classmethod
     def obtener_viajes_creados_por_usuario(cls, usuario_id):
-        query = "SELECT * FROM viajes WHERE creado_por = %(usuario_id)s;"
         data = {'usuario_id': usuario_id}
-        resultados = connectToMySQL(db).query_db(query, data)
-        viajes = [cls(viaje) for viaje in resultados]
+        resultados = connectToMySQL(db).fetch_rows(CONSULTA_CREADOS, data) or []
+        viajes = [cls.desde_fila(viaje) for viaje in resultados]
         return viajes
     
     @classmethod
     def obtener_viajes_unidos_por_usuario(cls, usuario_id):
-        query = """
-        SELECT v.* FROM viajes v
-        JOIN usuarios_viajes uv ON v.id = uv.viaje_id
-        WHERE uv.usuario_id = %(usuario_id)s;
-        """
         data = {'usuario_id': usuario_id}
-        resultados = connectToMySQL(db).query_db(query, data)
-        viajes = [cls(viaje) for viaje in resultados]
+        resultados = connectToMySQL(db).fetch_rows(CONSULTA_UNIDOS, data) or []
+        viajes = [cls.desde_fila(viaje) for viaje in resultados]
         return viajes
     
     @staticmethod
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark del filtro format_date: renderiza un listado de 1.000 viajes
+(la plantilla _filas_disponibles.html) con el filtro actual y con el filtro
+anterior basado en strptime, y comprueba que el actual no parsea texto.
+
+PyMySQL ya devuelve las columnas DATE como objetos date, así que en la
+aplicación el filtro anterior tampoco llegaba a usar strptime: con fechas
+date los dos filtros solo formatean y la diferencia es ruido. Las filas con
+fechas en texto miden el camino de strptime, que la aplicación no recorre.
+
+No se conecta a la base de datos (sí lee el .env). Uso:
+    python benchmarks/bench_format_date.py [--filas 1000] [--repeticiones 20]
+"""
+
+import argparse
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import create_app
+from app.config import fechas
+from app.config.cache import cache
+from app.models.viaje_model import Viaje
+
+
+def format_date_anterior(date_str):
+    # Filtro original: hasta dos strptime por fecha mostrada
+    if isinstance(date_str, str):
+        try:
+            date_obj = datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            try:
+                date_obj = datetime.strptime(date_str, '%Y-%m-%d')
+            except ValueError:
+                return date_str
+    else:
+        date_obj = date_str
+    return date_obj.strftime('%d/%m/%Y')
+
+
+def crear_viajes(cantidad, como_texto=False):
+    inicio = date(2026, 1, 1)
+    viajes = []
+    for i in range(cantidad):
+        fecha_inicio = inicio + timedelta(days=i % 365)
+        fecha_fin = fecha_inicio + timedelta(days=7)
+        if como_texto:
+            fecha_inicio, fecha_fin = fecha_inicio.isoformat(), fecha_fin.isoformat()
+        fila = (i + 1, f"viaje {i}", "descripción del viaje", fecha_inicio,
+                fecha_fin, 1, datetime(2025, 12, 1, 10, 30))
+        viaje = Viaje.desde_fila(fila)
+        viaje.num_participantes = 1
+        viajes.append(viaje)
+    return viajes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=1000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app()
+    entradas = {"date": crear_viajes(args.filas), "texto": crear_viajes(args.filas, como_texto=True)}
+    plantilla = app.jinja_env.get_template("_filas_disponibles.html")
+
+    # Cuenta las veces que el filtro actual recurre a parsear texto
+    parseos = 0
+    fecha_desde_texto = fechas.fecha_desde_texto
+
+    def contar_parseo(texto):
+        nonlocal parseos
+        parseos += 1
+        return fecha_desde_texto(texto)
+
+    fechas.fecha_desde_texto = contar_parseo
+
+    def medir(viajes):
+        def renderizar():
+            # Sin la caché de fragmentos, para medir el filtro en cada render
+            cache.local.clear()
+            with app.test_request_context():
+                plantilla.render(viajes_disponibles=viajes)
+
+        renderizar()  # calentamiento: compila la plantilla y llena la caché de formato
+        return min(timeit.repeat(renderizar, number=1, repeat=args.repeticiones))
+
+    filtro_actual = app.jinja_env.filters["format_date"]
+    resultados = {}
+    try:
+        for entrada, viajes in entradas.items():
+            app.jinja_env.filters["format_date"] = filtro_actual
+            parseos = 0
+            resultados[entrada, "actual"] = medir(viajes)
+            if entrada == "date":
+                parseos_actual = parseos
+            app.jinja_env.filters["format_date"] = format_date_anterior
+            resultados[entrada, "anterior"] = medir(viajes)
+    finally:
+        fechas.fecha_desde_texto = fecha_desde_texto
+        app.jinja_env.filters["format_date"] = filtro_actual
+
+    print(f"📊 {args.filas} filas, mejor de {args.repeticiones} repeticiones (ms por render)")
+    print(f"   {'fechas':<7} {'actual':>9} {'anterior':>9}")
+    for entrada in entradas:
+        print(f"   {entrada:<7} {resultados[entrada, 'actual'] * 1000:9.2f} {resultados[entrada, 'anterior'] * 1000:9.2f}")
+    print("   (la aplicación recibe fechas date de PyMySQL; la fila de texto es solo referencia)")
+    print(f"   caché de formato: {fechas.estadisticas()}")
+
+    if parseos_actual:
+        print(f"❌ El filtro actual parseó texto {parseos_actual} veces")
+        return 1
+    print("✅ El filtro actual no parseó ninguna fecha desde texto")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
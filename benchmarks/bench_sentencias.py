@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de las sentencias registradas (app/config/sentencias.py) que
+ejecutan el dashboard y el detalle de un viaje: cada una como texto (MySQL la
+analiza y planifica en cada llamada) y como sentencia preparada de SQL
+(PREPARE una vez por conexión, luego SET + EXECUTE: un viaje de red más por
+ejecución, pero sin volver a analizar el texto).
+
+Con --backend mysql corre contra la base de MYSQL_* y muestra los contadores
+del servidor (Com_prepare_sql, Com_execute_sql) para confirmar que cada
+sentencia se prepara una sola vez; sirve para decidir si conviene
+MYSQL_PREPARAR=1. Con el sustituto SQLite (por defecto) solo verifica el
+camino preparado: sus tiempos no dicen nada del análisis de MySQL.
+
+Uso:
+    python benchmarks/bench_sentencias.py
+    python benchmarks/bench_sentencias.py --backend mysql --repeticiones 500 --usuario-id 3 --viaje-id 10
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def preparar_entorno(backend):
+    # Se fija antes de importar la app: la configuración se lee al importar
+    if backend == "sqlite":
+        os.environ.setdefault("MYSQL_PORT", "3306")
+        os.environ.setdefault("MYSQL_DB", "benchmark")
+        os.environ["MYSQL_REPLICAS"] = ""
+        from benchmarks import sqlite_mysql
+        sqlite_mysql.instalar(Path(tempfile.mkdtemp(prefix="bench-sentencias-")) / "benchmark.sqlite3")
+
+
+def paginas():
+    from app.models import versiones, viaje_model, usuario_model
+    # Sentencias de cada página, en el orden en que se ejecutan
+    return {
+        "dashboard": (
+            versiones.CONSULTA_VERSIONES,
+            viaje_model.CONSULTA_AGENDA,
+            viaje_model.CONSULTAS_DISPONIBLES[(False, True)],
+            viaje_model.CONSULTA_PARTICIPANTES,
+        ),
+        "detalle": (
+            versiones.CONSULTA_VERSIONES,
+            viaje_model.CONSULTA_POR_ID,
+            usuario_model.CONSULTA_PARTICIPANTES,
+            usuario_model.CONSULTA_VARIOS_POR_ID,
+            viaje_model.CONSULTA_PARTICIPANTES,
+        ),
+    }
+
+
+def parametros(usuario_id, viaje_id):
+    # Todos los parámetros que usan las sentencias de paginas()
+    return {
+        "id": viaje_id, "usuario_id": usuario_id, "viaje_id": viaje_id,
+        "ids": [viaje_id, viaje_id + 1, viaje_id + 2], "limite": 51,
+        "claves": ["viajes", "usuarios", f"viaje:{viaje_id}"],
+    }
+
+
+def medir(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+
+def contadores(cursor, backend):
+    if backend != "mysql":
+        return {}
+    cursor.execute("SHOW SESSION STATUS WHERE Variable_name IN ('Com_prepare_sql', 'Com_execute_sql')")
+    return {fila["Variable_name"]: int(fila["Value"]) for fila in cursor.fetchall()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite")
+    parser.add_argument("--repeticiones", type=int, default=500)
+    parser.add_argument("--usuario-id", type=int, default=1)
+    parser.add_argument("--viaje-id", type=int, default=1)
+    args = parser.parse_args()
+
+    preparar_entorno(args.backend)
+    from app.config import sentencias
+    from app.config.mysqlconnection import pool
+
+    data = parametros(args.usuario_id, args.viaje_id)
+    conexion = pool.obtener()
+    try:
+        with conexion.cursor() as cursor:
+            antes = contadores(cursor, args.backend)
+            print(f"📊 {args.backend}: µs por sentencia ({args.repeticiones} repeticiones)")
+            print(f"   {'página':<11}{'sentencia':<30}{'texto':>10}{'preparada':>11}")
+            for pagina, lista in paginas().items():
+                total_texto = total_preparada = 0.0
+                for sentencia in lista:
+                    tiempos = []
+                    for preparar in (False, True):
+                        sentencias.MYSQL_PREPARAR = preparar
+
+                        def ejecutar():
+                            sentencias.enviar_sentencia(conexion, cursor, sentencia, data)
+                            cursor.fetchall()
+
+                        ejecutar()  # calentamiento (y PREPARE, si corresponde)
+                        tiempos.append(medir(ejecutar, args.repeticiones))
+                    nota = "" if sentencia.preparable(data) else "  (IN: siempre como texto)"
+                    total_texto += tiempos[0]
+                    total_preparada += tiempos[1]
+                    print(f"   {pagina:<11}{sentencia.nombre:<30}{tiempos[0]:>10.1f}{tiempos[1]:>11.1f}{nota}")
+                print(f"   {pagina:<11}{'total':<30}{total_texto:>10.1f}{total_preparada:>11.1f}")
+            despues = contadores(cursor, args.backend)
+    finally:
+        pool.devolver(conexion)
+    print("   preparadas en la conexión:", len(sentencias.preparadas_de(conexion)))
+    if despues:
+        print("   contadores del servidor:", {k: despues[k] - antes.get(k, 0) for k in despues})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
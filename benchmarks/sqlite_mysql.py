@@ -0,0 +1,385 @@
+"""
+Sustituto de MySQL sobre SQLite para correr los benchmarks sin red ni servidor.
+
+Ofrece la parte de la interfaz de PyMySQL que usa la app y traduce al vuelo
+las construcciones de MySQL que aparecen en sus consultas: parámetros
+%(nombre)s, listas en IN, INSERT IGNORE, el INSERT ... SELECT ... ON DUPLICATE
+KEY UPDATE id = LAST_INSERT_ID(id) de las uniones y el DELETE con JOIN, ON
+DUPLICATE KEY UPDATE en INSERT ... VALUES y las sentencias preparadas de SQL
+(PREPARE / SET @variable / EXECUTE ... USING / DEALLOCATE) por conexión.
+EXPLAIN SELECT devuelve el plan de SQLite con las columnas de MySQL que
+revisa migrar.py (table, type, key): un SCAN sin índice es type ALL.
+SHOW REPLICA STATUS informa el retraso simulado en `retrasos`.
+Con SSCursor las filas se leen de SQLite a medida que se piden.
+No implementa MATCH ... AGAINST (se usa BUSQUEDA_BACKEND=memoria).
+
+Solo para benchmarks: los tiempos absolutos no son los de MySQL, pero sí
+sirven para comparar una versión del código con otra en la misma máquina.
+"""
+
+import re
+import sqlite3
+from collections import Counter
+
+import pymysql
+import pymysql.constants.SERVER_STATUS
+import pymysql.cursors
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS usuarios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL,
+    apellido TEXT NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    password TEXT NOT NULL,
+    fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS viajes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    titulo TEXT NOT NULL,
+    descripcion TEXT,
+    fecha_inicio DATE NOT NULL,
+    fecha_fin DATE NOT NULL,
+    creado_por INT NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS roles_viaje (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS usuarios_viajes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    usuario_id INT NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+    viaje_id INT NOT NULL REFERENCES viajes(id) ON DELETE CASCADE,
+    fecha_union TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    rol_id INT NOT NULL DEFAULT 2 REFERENCES roles_viaje(id),
+    UNIQUE (usuario_id, viaje_id)
+);
+CREATE TABLE IF NOT EXISTS versiones (
+    clave TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMP NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+);
+-- Equivalentes a migraciones/001_indices_viajes.sql
+CREATE INDEX IF NOT EXISTS idx_viajes_fecha_inicio_id ON viajes (fecha_inicio, id, fecha_fin);
+CREATE INDEX IF NOT EXISTS idx_viajes_creado_por_fecha ON viajes (creado_por, fecha_inicio, id, fecha_fin);
+CREATE INDEX IF NOT EXISTS idx_usuarios_viajes_viaje ON usuarios_viajes (viaje_id, usuario_id);
+"""
+
+# Claves UNIQUE que usa la traducción de ON DUPLICATE KEY UPDATE
+CLAVES_UNICAS = {"usuarios_viajes": ("usuario_id", "viaje_id")}
+
+_PARAMETRO = re.compile(r"%\((\w+)\)s")
+_UPSERT = re.compile(
+    r"^\s*INSERT INTO (\w+)\s*\(([^)]*)\)\s*(SELECT .*?)\s*"
+    r"ON DUPLICATE KEY UPDATE \w+\.id = LAST_INSERT_ID\(\w+\.id\)\s*;?\s*$",
+    re.S | re.I,
+)
+_DELETE_JOIN = re.compile(r"^\s*DELETE (\w+) FROM (\w+) \1 (JOIN .*)$", re.S | re.I)
+_PREPARE = re.compile(r"^\s*PREPARE (\w+) FROM '(.*)'\s*;?\s*$", re.S | re.I)
+_SET = re.compile(r"^\s*SET @", re.I)
+_VARIABLE = re.compile(r"@(\w+)")
+_EXECUTE = re.compile(r"^\s*EXECUTE (\w+)(?: USING ([^;]*))?;?\s*$", re.S | re.I)
+_DEALLOCATE = re.compile(r"^\s*(?:DEALLOCATE|DROP) PREPARE (\w+)\s*;?\s*$", re.I)
+_EXPLAIN = re.compile(r"^\s*EXPLAIN\s+(SELECT\b.*)$", re.S | re.I)
+_ESTADO_REPLICA = re.compile(r"^\s*SHOW\s+REPLICA\s+STATUS\s*;?\s*$", re.I)
+# Paso del plan de SQLite: "SEARCH v USING INDEX idx (...)", "SCAN viajes AS v"...
+_PASO_PLAN = re.compile(
+    r"^(SCAN|SEARCH) (\w+)(?: AS (\w+))?"
+    r"(?: USING (?:COVERING )?(?:INDEX (\w+)|(?:INTEGER )?PRIMARY KEY))?(.*)$"
+)
+COLUMNAS_PLAN = ("id", "table", "type", "key", "Extra")
+
+_ruta = None
+# Todos los servidores (primaria y réplicas) comparten la misma base SQLite,
+# como réplicas sin retraso. Se cuentan las sentencias por servidor "host:puerto";
+# los servidores en `caidos` rechazan conexiones y cortan las ya abiertas, y
+# `retrasos` fija los segundos de retraso que informa cada réplica, para
+# probar el enrutamiento
+sentencias_por_servidor = Counter()
+caidos = set()
+retrasos = {}
+
+
+def _expandir_listas(query, data):
+    # Las listas en parámetros con nombre se expanden para IN (...)
+    if not isinstance(data, dict):
+        return query, data
+    data = dict(data)
+    for clave, valor in list(data.items()):
+        if isinstance(valor, (list, tuple, set)):
+            valores = list(valor)
+            nombres = [f"{clave}__{i}" for i in range(len(valores))]
+            query = query.replace(f"%({clave})s", "(" + ", ".join(f"%({n})s" for n in nombres) + ")")
+            data.update(zip(nombres, valores))
+            del data[clave]
+    return query, data
+
+
+def _paso_plan(numero, detalle):
+    # Traduce un paso de EXPLAIN QUERY PLAN a una fila al estilo de MySQL
+    paso = _PASO_PLAN.match(detalle)
+    if not paso:
+        return (numero, None, None, None, detalle)
+    accion, tabla, alias, indice, resto = paso.groups()
+    usa_clave = indice is not None or "PRIMARY KEY" in detalle
+    if accion == "SCAN":
+        tipo = "index" if usa_clave else "ALL"
+    else:
+        tipo = "range" if re.search(r"[<>]", resto) else "ref"
+    clave = indice or ("PRIMARY" if usa_clave else None)
+    return (numero, alias or tabla, tipo, clave, detalle)
+
+
+def traducir(query):
+    """Convierte la sintaxis MySQL de la app en SQL de SQLite."""
+    query = _PARAMETRO.sub(r":\1", query).replace("%s", "?")
+    query = re.sub(r"\bINSERT IGNORE\b", "INSERT OR IGNORE", query, flags=re.I)
+    query = re.sub(r"\bON DUPLICATE KEY UPDATE\b", "ON CONFLICT DO UPDATE SET", query, flags=re.I)
+    query = query.replace("CURRENT_TIMESTAMP(6)", "strftime('%Y-%m-%d %H:%M:%f', 'now')")
+    borrar = _DELETE_JOIN.match(query)
+    if borrar:
+        alias, tabla, resto = borrar.groups()
+        query = f"DELETE FROM {tabla} WHERE id IN (SELECT {alias}.id FROM {tabla} {alias} {resto.rstrip().rstrip(';')})"
+    return query
+
+
+class Cursor:
+    def __init__(self, conexion, como_dict, sin_buffer=False):
+        self._conexion = conexion
+        self._como_dict = como_dict
+        # Como SSCursor: las filas se leen de SQLite a medida que se piden
+        self._sin_buffer = sin_buffer
+        self._pendiente = None
+        self._filas = []
+        self.rowcount = -1
+        self.lastrowid = None
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _convertir(self, cursor):
+        self.description = cursor.description
+        self._pendiente = None
+        if self._sin_buffer and cursor.description and not self._como_dict:
+            self._pendiente, self._filas = cursor, []
+            self.rowcount, self.lastrowid = -1, None
+            return
+        filas = cursor.fetchall() if cursor.description else []
+        if self._como_dict and cursor.description:
+            columnas = [c[0] for c in cursor.description]
+            filas = [dict(zip(columnas, fila)) for fila in filas]
+        self._filas = list(filas)
+        self.rowcount = cursor.rowcount if cursor.rowcount != -1 else len(self._filas)
+        self.lastrowid = cursor.lastrowid
+
+    def execute(self, query, data=None):
+        self._conexion._verificar()
+        sentencias_por_servidor[self._conexion.servidor] += 1
+        if _PREPARE.match(query) or _SET.match(query) or _EXECUTE.match(query) or _DEALLOCATE.match(query):
+            return self._preparada(query, data)
+        return self._ejecutar(query, data)
+
+    def _preparada(self, query, data):
+        # Sentencias preparadas de SQL: viven en la conexión, como en MySQL
+        conexion = self._conexion
+        self._filas, self.description, self.rowcount = [], None, 0
+        preparar = _PREPARE.match(query)
+        if preparar:
+            nombre, texto = preparar.groups()
+            conexion.preparadas[nombre] = texto.replace("\\'", "'").replace("\\\\", "\\").replace("?", "%s")
+            return 0
+        liberar = _DEALLOCATE.match(query)
+        if liberar:
+            if conexion.preparadas.pop(liberar.group(1), None) is None:
+                raise pymysql.err.InternalError(1243, f"Unknown prepared statement handler ({liberar.group(1)}) given to DEALLOCATE PREPARE")
+            return 0
+        ejecutar = _EXECUTE.match(query)
+        if ejecutar:
+            nombre, usando = ejecutar.groups()
+            if nombre not in conexion.preparadas:
+                raise pymysql.err.InternalError(1243, f"Unknown prepared statement handler ({nombre}) given to EXECUTE")
+            valores = tuple(conexion.variables[v] for v in _VARIABLE.findall(usando or ""))
+            return self._ejecutar(conexion.preparadas[nombre], valores or None)
+        conexion.variables.update(zip(_VARIABLE.findall(query), data or ()))
+        return 0
+
+    def _ejecutar(self, query, data):
+        query, data = _expandir_listas(query, data)
+        upsert = _UPSERT.match(query)
+        explicar = _EXPLAIN.match(query)
+        try:
+            if upsert:
+                return self._upsert(upsert, data)
+            if explicar:
+                return self._explicar(explicar.group(1), data)
+            if _ESTADO_REPLICA.match(query):
+                return self._estado_replica()
+            self._convertir(self._conexion._db.execute(traducir(query), data if data is not None else ()))
+        except sqlite3.IntegrityError as e:
+            raise pymysql.err.IntegrityError(1062, str(e)) from e
+        except sqlite3.Error as e:
+            raise pymysql.err.ProgrammingError(1064, str(e)) from e
+        return self.rowcount
+
+    def _upsert(self, upsert, data):
+        # INSERT ... SELECT ... ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id):
+        # si la fila ya existía no se cuenta como afectada y lastrowid es su id
+        tabla, columnas, seleccion = upsert.groups()
+        columnas = [c.strip() for c in columnas.split(",")]
+        db = self._conexion._db
+        parametros = data if data is not None else ()
+        cursor = db.execute(f"INSERT OR IGNORE INTO {tabla} ({', '.join(columnas)}) {traducir(seleccion)}", parametros)
+        self._filas, self.description = [], None
+        self.rowcount = cursor.rowcount
+        self.lastrowid = cursor.lastrowid if cursor.rowcount else 0
+        if not cursor.rowcount:
+            candidata = db.execute(traducir(seleccion), parametros).fetchone()
+            if candidata:
+                valores = dict(zip(columnas, candidata))
+                clave = CLAVES_UNICAS[tabla]
+                existente = db.execute(
+                    f"SELECT id FROM {tabla} WHERE " + " AND ".join(f"{c} = ?" for c in clave),
+                    [valores[c] for c in clave],
+                ).fetchone()
+                self.lastrowid = existente[0] if existente else 0
+        return self.rowcount
+
+    def _explicar(self, seleccion, data):
+        plan = self._conexion._db.execute(
+            "EXPLAIN QUERY PLAN " + traducir(seleccion), data if data is not None else ()
+        ).fetchall()
+        filas = [_paso_plan(numero, fila[-1]) for numero, fila in enumerate(plan, 1)]
+        if self._como_dict:
+            filas = [dict(zip(COLUMNAS_PLAN, fila)) for fila in filas]
+        self._filas, self._pendiente = filas, None
+        self.description = tuple((c, None, None, None, None, None, None) for c in COLUMNAS_PLAN)
+        self.rowcount, self.lastrowid = len(filas), None
+        return self.rowcount
+
+    def _estado_replica(self):
+        # Sin retraso simulado el servidor no se presenta como réplica (sin filas)
+        retraso = retrasos.get(self._conexion.servidor)
+        filas = [] if retraso is None else [(retraso,)]
+        if self._como_dict:
+            filas = [{"Seconds_Behind_Source": retraso} for _ in filas]
+        self._filas, self._pendiente = filas, None
+        self.description = (("Seconds_Behind_Source", None, None, None, None, None, None),)
+        self.rowcount, self.lastrowid = len(filas), None
+        return self.rowcount
+
+    def executemany(self, query, datos):
+        total = 0
+        for data in datos:
+            total += self.execute(query, data) or 0
+        self.rowcount = total
+        return total
+
+    def fetchall(self):
+        filas, self._filas = self._filas, []
+        return tuple(filas) if not self._como_dict else filas
+
+    def fetchone(self):
+        return self._filas.pop(0) if self._filas else None
+
+    def fetchmany(self, size=1):
+        if self._pendiente is not None:
+            return self._pendiente.fetchmany(size)
+        filas, self._filas = self._filas[:size], self._filas[size:]
+        return filas
+
+    def __iter__(self):
+        while self._filas:
+            yield self._filas.pop(0)
+
+    def close(self):
+        self._filas = []
+        self._pendiente = None
+
+
+class Conexion:
+    """Conexión con la interfaz de pymysql.connections.Connection que usa la app."""
+
+    def __init__(self, autocommit=True, cursorclass=pymysql.cursors.Cursor, host=None, port=None, **_):
+        if _ruta is None:
+            raise RuntimeError("Llamar a instalar() antes de abrir conexiones")
+        self.servidor = f"{host}:{port}"
+        self.preparadas = {}
+        self.variables = {}
+        if self.servidor in caidos:
+            raise pymysql.err.OperationalError(2003, f"Can't connect to MySQL server on {self.servidor}")
+        self._db = sqlite3.connect(
+            _ruta, check_same_thread=False, isolation_level=None,
+            detect_types=sqlite3.PARSE_DECLTYPES, timeout=30,
+        )
+        self._db.execute("PRAGMA foreign_keys = ON")
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        self._autocommit = autocommit
+        self._cursorclass = cursorclass
+        self.open = True
+
+    def _verificar(self):
+        if not self.open:
+            raise pymysql.err.InterfaceError(0, "Conexión cerrada")
+        if self.servidor in caidos:
+            raise pymysql.err.OperationalError(2013, "Lost connection to MySQL server during query")
+
+    def cursor(self, cursorclass=None):
+        clase = cursorclass or self._cursorclass
+        return Cursor(
+            self, issubclass(clase, pymysql.cursors.DictCursorMixin), issubclass(clase, pymysql.cursors.SSCursor)
+        )
+
+    def ping(self, reconnect=True):
+        if not self.open:
+            if not reconnect:
+                raise pymysql.err.InterfaceError(0, "Conexión cerrada")
+            host, _, port = self.servidor.rpartition(":")
+            self.__init__(self._autocommit, self._cursorclass, host, port)
+
+    def begin(self):
+        self._db.execute("BEGIN")
+
+    def commit(self):
+        if self._db.in_transaction:
+            self._db.execute("COMMIT")
+
+    def rollback(self):
+        if self._db.in_transaction:
+            self._db.execute("ROLLBACK")
+
+    def autocommit(self, valor):
+        self._autocommit = bool(valor)
+
+    def get_autocommit(self):
+        return self._autocommit
+
+    @property
+    def server_status(self):
+        estado = pymysql.constants.SERVER_STATUS.SERVER_STATUS_AUTOCOMMIT if self._autocommit else 0
+        if self._db.in_transaction:
+            estado |= pymysql.constants.SERVER_STATUS.SERVER_STATUS_IN_TRANS
+        return estado
+
+    def close(self):
+        if self.open:
+            self._db.close()
+            self.open = False
+
+
+def instalar(ruta):
+    """
+    Reemplaza pymysql.connect por este sustituto, con la base SQLite en
+    `ruta`, y crea las tablas si no existen.
+    """
+    global _ruta
+    _ruta = str(ruta)
+    db = sqlite3.connect(_ruta, isolation_level=None)
+    db.executescript(ESQUEMA)
+    db.close()
+    pymysql.connect = Conexion
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga reproducible: siembra usuarios, viajes y membresías,
+recorre las rutas reales de la app con el cliente de pruebas de Flask y
+reporta latencia p50/p95/p99, peticiones por segundo y consultas por petición.
+
+Por defecto corre sobre el sustituto SQLite (sin red ni servidor). Con
+--backend mysql usa la base configurada en MYSQL_* (por ejemplo, el
+contenedor de benchmarks/docker-compose.yml) y antes le aplica las migraciones
+pendientes con migrar.py.
+
+Uso:
+    python benchmarks/suite.py                                # SQLite, tamaños por defecto
+    python benchmarks/suite.py --salida base.json             # guarda los resultados
+    python benchmarks/suite.py --comparar base.json           # falla (código 1) si hay regresión
+    python benchmarks/suite.py --backend mysql --reiniciar    # MySQL local, vacía las tablas antes
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+PASSWORD = "benchmark123"
+RUTAS = ("login", "dashboard", "detalle", "unir", "compatibles")
+# Al comparar: rutas con menos muestras no se juzgan por latencia (p. ej. login)
+MIN_MUESTRAS_LATENCIA = 20
+# Con varios usuarios en paralelo los aciertos de caché varían un poco entre corridas
+TOLERANCIA_CONSULTAS = 0.05
+
+
+def preparar_entorno(args):
+    # Se fija antes de importar la app: la configuración se lee al importar
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    if args.sin_cache:
+        os.environ["CACHE_TTL"] = os.environ["CACHE_TTL_LOCAL"] = "0"
+    if args.backend == "sqlite":
+        os.environ.setdefault("MYSQL_HOST", "primaria")
+        os.environ.setdefault("MYSQL_PORT", "3306")
+        os.environ.setdefault("MYSQL_DB", "benchmark")
+        # Réplicas simuladas: otros "servidores" sobre la misma base SQLite
+        os.environ["MYSQL_REPLICAS"] = ",".join(f"replica{i}:3306" for i in range(1, args.replicas + 1))
+        os.environ["BUSQUEDA_BACKEND"] = "memoria"
+        from benchmarks import sqlite_mysql
+        ruta = Path(tempfile.mkdtemp(prefix="bench-viajes-")) / "benchmark.sqlite3"
+        sqlite_mysql.instalar(ruta)
+        return str(ruta)
+    return os.getenv("MYSQL_DB")
+
+
+def sembrar(args):
+    """Carga datos deterministas (misma semilla, mismos datos) en lotes con executemany."""
+    from bcrypt import hashpw, gensalt
+    from app.config.mysqlconnection import pool
+
+    azar = random.Random(args.semilla)
+    password = hashpw(PASSWORD.encode("utf-8"), gensalt(args.bcrypt_rounds)).decode("utf-8")
+    conexion = pool.obtener()
+    try:
+        with conexion.cursor() as cursor:
+            # Las conexiones del pool devuelven filas como diccionarios
+            cursor.execute("SELECT COUNT(*) AS n FROM usuarios")
+            if cursor.fetchone()["n"] and not args.reiniciar:
+                raise SystemExit("❌ La base ya tiene usuarios; usar --reiniciar para vaciarla")
+            if args.reiniciar:
+                for tabla in ("usuarios_viajes", "viajes", "usuarios"):
+                    cursor.execute(f"DELETE FROM {tabla}")
+            cursor.execute("INSERT IGNORE INTO roles_viaje (id, nombre) VALUES (1, 'Organizador'), (2, 'Participante')")
+
+            cursor.executemany(
+                "INSERT INTO usuarios (nombre, apellido, email, password) VALUES (%s, %s, %s, %s)",
+                [(f"usuario{i}", f"apellido{i}", f"usuario{i}@bench.test", password) for i in range(args.usuarios)],
+            )
+            cursor.execute("SELECT id FROM usuarios ORDER BY id")
+            usuarios = [f["id"] for f in cursor.fetchall()]
+
+            hoy = date.today()
+            viajes = []
+            for i in range(args.viajes):
+                inicio = hoy + timedelta(days=azar.randint(0, 365))
+                viajes.append((
+                    f"viaje {i} a {azar.choice(('paris', 'roma', 'lima', 'cusco', 'tokio', 'madrid'))}",
+                    "descripción del viaje número %d con varias palabras de relleno" % i,
+                    inicio, inicio + timedelta(days=azar.randint(1, 21)), azar.choice(usuarios),
+                ))
+            cursor.executemany(
+                "INSERT INTO viajes (titulo, descripcion, fecha_inicio, fecha_fin, creado_por) VALUES (%s, %s, %s, %s, %s)",
+                viajes,
+            )
+            cursor.execute("SELECT id, creado_por FROM viajes ORDER BY id")
+            creadores = {f["id"]: f["creado_por"] for f in cursor.fetchall()}
+
+            membresias = set()
+            ids_viajes = list(creadores)
+            while len(membresias) < min(args.membresias, len(usuarios) * len(ids_viajes) // 2):
+                usuario_id, viaje_id = azar.choice(usuarios), azar.choice(ids_viajes)
+                if creadores[viaje_id] != usuario_id:
+                    membresias.add((usuario_id, viaje_id))
+            cursor.executemany(
+                "INSERT INTO usuarios_viajes (usuario_id, viaje_id, rol_id) VALUES (%s, %s, 2)",
+                sorted(membresias),
+            )
+        conexion.commit()
+    finally:
+        pool.devolver(conexion)
+    return usuarios, ids_viajes
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano (valores ya ordenados)."""
+    if not valores:
+        return 0.0
+    return valores[max(0, math.ceil(p / 100 * len(valores)) - 1)]
+
+
+def correr_usuario(app, email, ids_viajes, peticiones, semilla, medidas, lock):
+    # Un usuario virtual: inicia sesión y recorre dashboard, detalle, unir y compatibles
+    azar = random.Random(semilla)
+    cliente = app.test_client()
+    locales = defaultdict(list)
+
+    def medir(ruta, metodo, url, **kwargs):
+        inicio = time.perf_counter()
+        respuesta = getattr(cliente, metodo)(url, **kwargs)
+        duracion = time.perf_counter() - inicio
+        if respuesta.status_code >= 500:
+            raise RuntimeError(f"{url} respondió {respuesta.status_code}")
+        locales[ruta].append((duracion, int(respuesta.headers.get("X-Consultas-DB", 0))))
+
+    medir("login", "post", "/usuarios/procesar_login", data={"email": email, "password": PASSWORD})
+    for _ in range(peticiones):
+        viaje_id = azar.choice(ids_viajes)
+        medir("dashboard", "get", "/travels/")
+        medir("detalle", "get", f"/travels/detalle/{viaje_id}")
+        medir("unir", "post", f"/travels/unir/{azar.choice(ids_viajes)}")
+        medir("compatibles", "get", "/travels/compatibles")
+    with lock:
+        for ruta, valores in locales.items():
+            medidas[ruta].extend(valores)
+
+
+def ejecutar(args):
+    base = preparar_entorno(args)
+    from app import create_app
+    if args.backend == "mysql":
+        # Sin la tabla versiones, por ejemplo, no habría ETag ni 304 que medir
+        import migrar
+        if not migrar.aplicar_migraciones():
+            raise SystemExit("❌ No se pudieron aplicar las migraciones")
+
+    inicio = time.perf_counter()
+    usuarios, ids_viajes = sembrar(args)
+    siembra = time.perf_counter() - inicio
+
+    app = create_app()
+    app.testing = True  # habilita el encabezado X-Consultas-DB
+    medidas = defaultdict(list)
+    lock = threading.Lock()
+    azar = random.Random(args.semilla)
+    emails = [f"usuario{azar.randrange(len(usuarios))}@bench.test" for _ in range(args.concurrencia)]
+
+    # Calentamiento: compila plantillas y abre conexiones sin contar en las medidas
+    correr_usuario(app, emails[0], ids_viajes, 2, args.semilla, defaultdict(list), lock)
+
+    hilos = [
+        threading.Thread(
+            target=correr_usuario,
+            args=(app, email, ids_viajes, args.peticiones, args.semilla + i, medidas, lock),
+        )
+        for i, email in enumerate(emails)
+    ]
+    if args.backend == "sqlite":
+        from benchmarks import sqlite_mysql
+        sqlite_mysql.sentencias_por_servidor.clear()
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+    if args.backend == "sqlite":
+        sentencias = dict(sqlite_mysql.sentencias_por_servidor)
+
+    total = sum(len(v) for v in medidas.values())
+    resultados = {
+        "configuracion": {
+            "backend": args.backend, "base": base, "usuarios": args.usuarios,
+            "viajes": args.viajes, "membresias": args.membresias,
+            "concurrencia": args.concurrencia, "peticiones": args.peticiones,
+            "semilla": args.semilla, "sin_cache": args.sin_cache, "replicas": args.replicas,
+            "siembra_s": round(siembra, 2),
+        },
+        "peticiones_por_segundo": round(total / duracion, 1),
+        "rutas": {},
+    }
+    if args.backend == "sqlite" and args.replicas:
+        resultados["sentencias_por_servidor"] = sentencias
+    for ruta in RUTAS:
+        valores = medidas.get(ruta, [])
+        tiempos = sorted(d * 1000 for d, _ in valores)
+        consultas = [c for _, c in valores]
+        resultados["rutas"][ruta] = {
+            "n": len(valores),
+            "p50_ms": round(percentil(tiempos, 50), 2),
+            "p95_ms": round(percentil(tiempos, 95), 2),
+            "p99_ms": round(percentil(tiempos, 99), 2),
+            "consultas_media": round(sum(consultas) / len(consultas), 2) if consultas else 0.0,
+        }
+    return resultados
+
+
+def imprimir(resultados):
+    config = resultados["configuracion"]
+    print(f"📊 {config['backend']}: {config['usuarios']} usuarios, {config['viajes']} viajes, "
+          f"{config['membresias']} membresías (siembra {config['siembra_s']} s)")
+    print(f"   {config['concurrencia']} usuarios virtuales x {config['peticiones']} iteraciones, "
+          f"{resultados['peticiones_por_segundo']} peticiones/s")
+    print(f"   {'ruta':<12}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'consultas':>11}")
+    for ruta, r in resultados["rutas"].items():
+        print(f"   {ruta:<12}{r['n']:>6}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['consultas_media']:>11}")
+    if "sentencias_por_servidor" in resultados:
+        reparto = ", ".join(f"{s} {n}" for s, n in sorted(resultados["sentencias_por_servidor"].items()))
+        print(f"   sentencias por servidor: {reparto}")
+
+
+def comparar(resultados, base, tolerancia):
+    """
+    Devuelve las regresiones frente a `base`: p95 más lento que la tolerancia
+    relativa o más consultas por petición (salvo la variación de la caché).
+    """
+    regresiones = []
+    for ruta, actual in resultados["rutas"].items():
+        anterior = base.get("rutas", {}).get(ruta)
+        if not anterior:
+            continue
+        if actual["consultas_media"] > anterior["consultas_media"] * (1 + TOLERANCIA_CONSULTAS) + 0.01:
+            regresiones.append(f"{ruta}: consultas por petición {anterior['consultas_media']} -> {actual['consultas_media']}")
+        if min(actual["n"], anterior["n"]) < MIN_MUESTRAS_LATENCIA:
+            continue
+        if anterior["p95_ms"] and actual["p95_ms"] > anterior["p95_ms"] * (1 + tolerancia):
+            regresiones.append(f"{ruta}: p95 {anterior['p95_ms']} ms -> {actual['p95_ms']} ms")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite")
+    parser.add_argument("--usuarios", type=int, default=1000)
+    parser.add_argument("--viajes", type=int, default=5000)
+    parser.add_argument("--membresias", type=int, default=20000)
+    parser.add_argument("--concurrencia", type=int, default=4, help="usuarios virtuales en paralelo")
+    parser.add_argument("--peticiones", type=int, default=50, help="iteraciones por usuario virtual")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--bcrypt-rounds", type=int, default=4,
+                        help="costo de bcrypt (bajo por defecto para no medir solo el hash)")
+    parser.add_argument("--sin-cache", action="store_true", help="desactiva la caché de lectura")
+    parser.add_argument("--replicas", type=int, default=0,
+                        help="réplicas simuladas con el sustituto SQLite (con mysql, usar MYSQL_REPLICAS)")
+    parser.add_argument("--reiniciar", action="store_true", help="vacía las tablas antes de sembrar")
+    parser.add_argument("--salida", help="guarda los resultados en este archivo JSON")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para detectar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=0.20,
+                        help="empeoramiento relativo de p95 permitido al comparar (0.20 = 20%%)")
+    args = parser.parse_args()
+
+    resultados = ejecutar(args)
+    imprimir(resultados)
+    if args.salida:
+        Path(args.salida).write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"💾 Resultados guardados en {args.salida}")
+    if args.comparar:
+        base = json.loads(Path(args.comparar).read_text(encoding="utf-8"))
+        regresiones = comparar(resultados, base, args.tolerancia)
+        if regresiones:
+            print("❌ Regresiones frente a", args.comparar)
+            for regresion in regresiones:
+                print("   -", regresion)
+            return 1
+        print("✅ Sin regresiones frente a", args.comparar)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
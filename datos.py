@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Importa y exporta usuarios, viajes y membresías en CSV o JSONL sin cargar el
+archivo completo en memoria: la exportación recorre la tabla con un cursor del
+lado del servidor y la importación inserta en lotes (INSERT de varias filas),
+cada lote en su propia transacción.
+
+Uso:
+    python datos.py exportar viajes viajes.jsonl
+    python datos.py exportar usuarios - --formato csv      # a la salida estándar
+    python datos.py importar usuarios usuarios.csv
+    python datos.py importar viajes viajes.jsonl --lote 5000 --ignorar-duplicados
+
+Al importar, las columnas salen del encabezado CSV (o de la primera línea
+JSONL); las que se omiten toman su valor por defecto. Conviene importar en
+orden usuarios, viajes, membresias por las claves foráneas. Cada lote
+importado sube las versiones de las páginas afectadas (ver app/models/versiones.py).
+Los usuarios se exportan con el hash de la contraseña: tratar esos archivos
+como secretos.
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+from datetime import datetime
+from itertools import chain, islice
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.config.cache import cache
+from app.config.mysqlconnection import connectToMySQL, MYSQL_DB
+from app.models import versiones
+
+# Entidad -> (tabla, columnas exportadas, columnas obligatorias al importar)
+ENTIDADES = {
+    "usuarios": (
+        "usuarios",
+        ("id", "nombre", "apellido", "email", "password", "fecha_registro"),
+        ("nombre", "apellido", "email", "password"),
+    ),
+    "viajes": (
+        "viajes",
+        ("id", "titulo", "descripcion", "fecha_inicio", "fecha_fin", "creado_por", "fecha_creacion"),
+        ("titulo", "fecha_inicio", "fecha_fin", "creado_por"),
+    ),
+    "membresias": (
+        "usuarios_viajes",
+        ("id", "usuario_id", "viaje_id", "rol_id", "fecha_union"),
+        ("usuario_id", "viaje_id"),
+    ),
+}
+LOTE = 1000
+# Cada cuántas filas se informa el avance
+AVANCE = 50000
+
+
+def formato_de(ruta, formato):
+    if formato:
+        return formato
+    if ruta != "-" and Path(ruta).suffix.lower() == ".csv":
+        return "csv"
+    return "jsonl"
+
+
+def abrir(ruta, modo):
+    if ruta == "-":
+        return sys.stdin if modo == "r" else sys.stdout
+    return open(ruta, modo, encoding="utf-8", newline="")
+
+
+def _a_texto(valor):
+    return valor.isoformat(sep=" ") if isinstance(valor, datetime) else valor.isoformat()
+
+
+# Exportación
+
+
+def exportar(entidad, ruta, formato, informe):
+    tabla, columnas, _ = ENTIDADES[entidad]
+    query = f"SELECT {', '.join(columnas)} FROM {tabla} ORDER BY id;"
+    filas = connectToMySQL(MYSQL_DB).iterar_filas(query)
+    inicio = time.perf_counter()
+    total = 0
+    salida = abrir(ruta, "w")
+    try:
+        if formato == "csv":
+            escritor = csv.writer(salida)
+            escritor.writerow(columnas)
+            for fila in filas:
+                escritor.writerow(fila)
+                total += 1
+                if total % AVANCE == 0:
+                    print(f"   {total} filas...", file=informe)
+        else:
+            for fila in filas:
+                salida.write(json.dumps(dict(zip(columnas, fila)), ensure_ascii=False, default=_a_texto))
+                salida.write("\n")
+                total += 1
+                if total % AVANCE == 0:
+                    print(f"   {total} filas...", file=informe)
+    finally:
+        filas.close()
+        if salida is not sys.stdout:
+            salida.close()
+    return total, time.perf_counter() - inicio
+
+
+# Importación
+
+
+def leer(entrada, formato):
+    """
+    Devuelve (columnas, registros): las columnas del encabezado CSV o de la
+    primera línea JSONL (None si el JSONL está vacío) y un generador de
+    diccionarios columna -> valor; los vacíos del CSV son NULL.
+    """
+    if formato == "csv":
+        lector = csv.DictReader(entrada)
+        registros = (
+            {clave: (valor if valor != "" else None) for clave, valor in registro.items()}
+            for registro in lector
+        )
+        return tuple(lector.fieldnames or ()), registros
+    registros = _leer_jsonl(entrada)
+    primero = next(registros, None)
+    if primero is None:
+        return None, iter(())
+    return tuple(primero), chain([primero], registros)
+
+
+def _leer_jsonl(entrada):
+    for numero, linea in enumerate(entrada, 1):
+        if linea.strip():
+            try:
+                yield json.loads(linea)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Línea {numero}: JSON inválido ({e})") from e
+
+
+def invalidar(entidad, columnas, bloque):
+    """
+    Sube las versiones y borra de la caché compartida lo que pudo cambiar el
+    lote, como hacen los modelos al escribir: sin esto las páginas seguirían
+    respondiendo 304 con los datos de antes. La copia local de cada worker
+    vence sola (CACHE_TTL_LOCAL).
+    """
+    if entidad == "usuarios":
+        versiones.incrementar("usuarios")
+    elif entidad == "viajes":
+        versiones.incrementar("viajes")
+    else:
+        posicion = columnas.index("viaje_id")
+        viaje_ids = {fila[posicion] for fila in bloque}
+        cache.invalidar(*(f"participantes:{viaje_id}" for viaje_id in viaje_ids))
+        versiones.incrementar("viajes", *(f"viaje:{viaje_id}" for viaje_id in viaje_ids))
+
+
+def importar(entidad, ruta, formato, lote, ignorar_duplicados, informe):
+    tabla, permitidas, obligatorias = ENTIDADES[entidad]
+    entrada = abrir(ruta, "r")
+    try:
+        columnas, registros = leer(entrada, formato)
+        if columnas is None:
+            return 0, 0.0
+        # Se valida antes de leer filas: un CSV con solo el encabezado también
+        desconocidas = [c for c in columnas if c not in permitidas]
+        faltantes = [c for c in obligatorias if c not in columnas]
+        if desconocidas or faltantes:
+            raise ValueError(f"Columnas desconocidas: {desconocidas}; obligatorias que faltan: {faltantes}")
+
+        verbo = "INSERT IGNORE" if ignorar_duplicados else "INSERT"
+        query = (
+            f"{verbo} INTO {tabla} ({', '.join(columnas)}) "
+            f"VALUES ({', '.join(['%s'] * len(columnas))});"
+        )
+        filas = (tuple(r.get(c) for c in columnas) for r in registros)
+        inicio = time.perf_counter()
+        # Filas leídas del archivo e insertadas (con INSERT IGNORE se omiten
+        # las duplicadas)
+        leidas = total = 0
+        while True:
+            bloque = list(islice(filas, lote))
+            if not bloque:
+                break
+            # Un lote por transacción: si falla, los lotes anteriores quedan guardados
+            try:
+                with connectToMySQL(MYSQL_DB).transaction() as conexion:
+                    insertadas = conexion.execute_many(query, bloque)
+            except Exception as e:
+                raise RuntimeError(f"{total} filas importadas; falló el lote desde la fila {leidas + 1}: {e}") from e
+            if insertadas:
+                invalidar(entidad, columnas, bloque)
+            leidas += len(bloque)
+            total += insertadas
+            if leidas % AVANCE < len(bloque):
+                print(f"   {leidas} filas...", file=informe)
+        if leidas > total:
+            print(f"   {leidas - total} filas duplicadas omitidas", file=informe)
+        return total, time.perf_counter() - inicio
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("accion", choices=("importar", "exportar"))
+    parser.add_argument("entidad", choices=tuple(ENTIDADES))
+    parser.add_argument("archivo", help="ruta del archivo, o - para stdin/stdout")
+    parser.add_argument("--formato", choices=("csv", "jsonl"), help="por defecto, según la extensión")
+    parser.add_argument("--lote", type=int, default=LOTE, help="filas por INSERT/transacción al importar")
+    parser.add_argument("--ignorar-duplicados", action="store_true", help="usa INSERT IGNORE al importar")
+    args = parser.parse_args()
+
+    formato = formato_de(args.archivo, args.formato)
+    # Con - la salida estándar lleva los datos; los mensajes van a stderr
+    informe = sys.stderr if args.archivo == "-" else sys.stdout
+    try:
+        if args.accion == "exportar":
+            total, segundos = exportar(args.entidad, args.archivo, formato, informe)
+            verbo = "exportadas"
+        else:
+            total, segundos = importar(args.entidad, args.archivo, formato, args.lote,
+                                       args.ignorar_duplicados, informe)
+            verbo = "importadas"
+    except Exception as e:
+        print(f"❌ Error al {args.accion} {args.entidad}: {e}", file=sys.stderr)
+        return 1
+    velocidad = total / segundos if segundos else 0
+    print(f"✅ {total} filas de {args.entidad} {verbo} en {segundos:.2f} s ({velocidad:.0f} filas/s)", file=informe)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
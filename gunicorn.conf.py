@@ -0,0 +1,72 @@
+# Configuración de gunicorn para producción:
+#     gunicorn server:app
+# (gunicorn lee este archivo automáticamente desde el directorio actual)
+import multiprocessing
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = os.getenv("WEB_BIND", "0.0.0.0:8000")
+# Procesos y, dentro de cada uno, hilos que atienden peticiones
+workers = int(os.getenv("WEB_WORKERS", str(multiprocessing.cpu_count() * 2 + 1)))
+threads = int(os.getenv("WEB_THREADS", "4"))
+worker_class = "gthread"
+# Se carga create_app() una vez en el maestro y los workers lo heredan por fork.
+# Las conexiones MySQL se abren después del fork, en cada worker
+# (ver ConnectionPool.reiniciar_tras_fork)
+preload_app = True
+# Segundos para terminar las peticiones en curso al recibir SIGTERM
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WEB_TIMEOUT", "60"))
+keepalive = 5
+# Reciclar workers de a poco evita que crezca la memoria en procesos longevos
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", "2000"))
+max_requests_jitter = max_requests // 10
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("WEB_LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    # Antes de crear los workers (heredan la decisión): los eventos en vivo
+    # necesitan un bus compartido entre ellos
+    from app.config.servidor_eventos import servidor_eventos
+    if not servidor_eventos.comprobar_bus(workers):
+        server.log.warning(
+            "Eventos en vivo desactivados: %s workers con el bus local perderían "
+            "eventos (fijar EVENTOS_BACKEND=redis://...)", workers,
+        )
+
+
+def when_ready(server):
+    from app.config.cache import CACHE_BACKEND, CACHE_TTL_LOCAL
+    if workers > 1 and not CACHE_BACKEND:
+        server.log.warning(
+            "Caché sin backend compartido con %s workers: una escritura puede tardar "
+            "hasta %s s (CACHE_TTL_LOCAL) en verse en los demás", workers, CACHE_TTL_LOCAL,
+        )
+
+
+def post_fork(server, worker):
+    # Por si el intérprete no ofrece os.register_at_fork
+    from app.config.mysqlconnection import pool, replicas
+    pool.reiniciar_tras_fork()
+    replicas.reiniciar_tras_fork()
+    # Cada worker sirve los eventos en vivo en EVENTOS_BIND (puerto compartido,
+    # detrás del proxy)
+    from app.config.servidor_eventos import servidor_eventos
+    servidor_eventos.iniciar()
+    server.log.info("Worker %s listo", worker.pid)
+
+
+def worker_exit(server, worker):
+    # Apagado ordenado: cierra las suscripciones a eventos, las conexiones y
+    # los procesos de bcrypt
+    from app.config.mysqlconnection import pool, replicas
+    from app.config import seguridad
+    from app.config.servidor_eventos import servidor_eventos
+    servidor_eventos.cerrar()
+    pool.cerrar()
+    replicas.cerrar()
+    seguridad.cerrar()
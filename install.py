@@ -70,11 +70,11 @@ def setup_database():
         load_dotenv()
         db = os.getenv("MYSQL_DB")
         
-        # Insertar roles básicos
+        # Insertar roles básicos en una sola sentencia
         roles = [(1, 'Organizador'), (2, 'Participante')]
+        query = "INSERT IGNORE INTO roles_viaje (id, nombre) VALUES (%s, %s);"
+        connectToMySQL(db).execute_many(query, roles)
         for rol_id, nombre in roles:
-            query = "INSERT IGNORE INTO roles_viaje (id, nombre) VALUES (%s, %s);"
-            connectToMySQL(db).query_db(query, (rol_id, nombre))
             print(f"✅ Rol '{nombre}' insertado")
         
         print("✅ Base de datos configurada correctamente")
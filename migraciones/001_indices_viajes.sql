@@ -0,0 +1,15 @@
+-- Índices para las consultas de listado, paginación y búsqueda de viajes, y
+-- para detectar viajes con fechas solapadas. fecha_fin va al final: no cambia
+-- el orden (fecha_inicio, id), pero permite filtrar por ella sin leer la fila
+
+USE compañero_de_viaje_db;
+
+-- Paginación por cursor y búsqueda por rango de fechas (ORDER BY fecha_inicio, id);
+-- viajes que caben en un hueco libre de la agenda
+CREATE INDEX idx_viajes_fecha_inicio_id ON viajes (fecha_inicio, id, fecha_fin);
+
+-- Viajes de un creador filtrados u ordenados por fecha, o que se solapan con un período
+CREATE INDEX idx_viajes_creado_por_fecha ON viajes (creado_por, fecha_inicio, id, fecha_fin);
+
+-- Participantes de un viaje (la clave UNIQUE solo cubre usuario_id, viaje_id)
+CREATE INDEX idx_usuarios_viajes_viaje ON usuarios_viajes (viaje_id, usuario_id);
@@ -0,0 +1,5 @@
+-- Búsqueda de texto sobre título y descripción de los viajes
+
+USE compañero_de_viaje_db;
+
+CREATE FULLTEXT INDEX ft_viajes_titulo_descripcion ON viajes (titulo, descripcion);
@@ -0,0 +1,14 @@
+-- Versiones de los datos que muestran las páginas, para responder 304 (ETag /
+-- Last-Modified) sin volver a consultar ni renderizar. Los métodos de escritura
+-- de los modelos incrementan la versión de cada clave que modifican:
+--   'viajes'      cualquier viaje o unión (dashboard)
+--   'viaje:<id>'  un viaje y sus participantes (detalle)
+--   'usuarios'    nombres de usuario que aparecen en las páginas
+
+USE compañero_de_viaje_db;
+
+CREATE TABLE versiones (
+    clave VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+);
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Aplica las migraciones SQL pendientes de la carpeta migraciones/ y verifica
+con EXPLAIN que las búsquedas de viajes usan índices.
+
+Uso:
+    python migrar.py              # aplica las migraciones pendientes
+    python migrar.py --verificar  # además comprueba los planes de ejecución
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.config.mysqlconnection import connectToMySQL, MYSQL_DB
+
+CARPETA_MIGRACIONES = Path(__file__).parent / "migraciones"
+
+
+def sentencias(archivo):
+    """Separa un archivo .sql en sentencias, ignorando comentarios y USE."""
+    texto = "\n".join(
+        linea for linea in archivo.read_text(encoding="utf-8").splitlines()
+        if not linea.strip().startswith("--")
+    )
+    for sentencia in texto.split(";"):
+        sentencia = sentencia.strip()
+        if sentencia and not sentencia.upper().startswith("USE "):
+            yield sentencia
+
+
+def aplicar_migraciones():
+    conexion = connectToMySQL(MYSQL_DB)
+    conexion.execute(
+        "CREATE TABLE IF NOT EXISTS migraciones ("
+        " nombre VARCHAR(255) PRIMARY KEY,"
+        " aplicada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP);"
+    )
+    aplicadas = {fila['nombre'] for fila in conexion.fetch_all("SELECT nombre FROM migraciones;") or []}
+
+    for archivo in sorted(CARPETA_MIGRACIONES.glob("*.sql")):
+        if archivo.name in aplicadas:
+            continue
+        print(f"🔄 Aplicando {archivo.name}...")
+        # MySQL confirma implícitamente los DDL, por eso cada sentencia se ejecuta por separado
+        for sentencia in sentencias(archivo):
+            if conexion.execute(sentencia) is False:
+                print(f"❌ Error aplicando {archivo.name}")
+                return False
+        conexion.execute("INSERT INTO migraciones (nombre) VALUES (%(nombre)s);", {"nombre": archivo.name})
+        print(f"✅ {archivo.name} aplicada")
+    return True
+
+
+def planes_busqueda():
+    """
+    Revisa con EXPLAIN las búsquedas típicas de viajes. Devuelve, por cada
+    caso, (nombre, fila del plan que recorre viajes completa o None). En tablas
+    casi vacías MySQL puede preferir el recorrido completo, así que conviene
+    ejecutarla con un volumen de datos realista.
+    """
+    from datetime import date
+    from app.models.viaje_model import Viaje
+
+    hoy = date.today()
+    casos = {
+        "viajes que empiezan en un rango": dict(desde=hoy, hasta=hoy.replace(year=hoy.year + 1)),
+        "viajes que aún no empiezan": dict(desde=hoy),
+        "viajes de un creador": dict(creado_por=1, desde=hoy),
+    }
+    planes = []
+    for nombre, filtros in casos.items():
+        completo = next(
+            (fila for fila in Viaje.explicar_busqueda(**filtros)
+             if fila.get('table') in ('v', 'viajes') and fila.get('type') == 'ALL'),
+            None,
+        )
+        planes.append((nombre, completo))
+    return planes
+
+
+def verificar_planes():
+    """Falla si alguna búsqueda de viajes termina en un recorrido completo de la tabla."""
+    correcto = True
+    for nombre, completo in planes_busqueda():
+        if completo is None:
+            print(f"✅ {nombre}: usa índice")
+        else:
+            print(f"❌ {nombre}: recorrido completo de viajes (key={completo.get('key')})")
+            correcto = False
+    return correcto
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migraciones de la base de datos")
+    parser.add_argument("--verificar", action="store_true", help="comprobar los planes de ejecución con EXPLAIN")
+    args = parser.parse_args()
+
+    if not aplicar_migraciones():
+        sys.exit(1)
+    if args.verificar and not verificar_planes():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
 from app import create_app
+import os
     
 app = create_app()
 
-# Punto de entrada de la aplicacion Flask
+# Punto de entrada de la aplicacion Flask (servidor de desarrollo).
+# En producción se usa gunicorn con gunicorn.conf.py: `gunicorn server:app`
 if __name__ == '__main__':
-    app.run(port=5014, debug=True)
-
+    debug = os.getenv("FLASK_DEBUG", "True") == "True"
+    # Con el recargador, solo el proceso hijo (el que atiende) sirve los eventos
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        from app.config.servidor_eventos import servidor_eventos
+        servidor_eventos.iniciar()
+    app.run(port=5014, debug=debug)
@@ -0,0 +1,80 @@
+# Las pruebas corren sobre el sustituto SQLite de benchmarks/sqlite_mysql.py.
+# Con PRUEBAS_BACKEND=mysql usan la base configurada en MYSQL_* (con el esquema
+# y las migraciones ya aplicados: install.py y migrar.py), que se vacía antes
+# de cada prueba; así se comprueban las sentencias con la semántica real de MySQL.
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+BACKEND = os.getenv("PRUEBAS_BACKEND", "sqlite")
+PASSWORD_HASH = "$2b$04$" + "a" * 53
+
+# La configuración se lee al importar la app: se fija antes
+os.environ.setdefault("SECRET_KEY", "pruebas")
+os.environ.update(
+    BCRYPT_ROUNDS="4", MYSQL_REPLICAS="", CACHE_BACKEND="", EVENTOS_BACKEND="", EVENTOS_BIND="",
+    BUSQUEDA_BACKEND="memoria", DASHBOARD_STREAMING="", MYSQL_SLOW_QUERY_MS="0",
+)
+if BACKEND == "sqlite":
+    os.environ.update(MYSQL_HOST="primaria", MYSQL_PORT="3306", MYSQL_DB="pruebas")
+    from benchmarks import sqlite_mysql
+    sqlite_mysql.instalar(Path(tempfile.mkdtemp(prefix="pruebas-viajes-")) / "pruebas.sqlite3")
+
+from app import create_app
+from app.config.cache import cache
+from app.config.mysqlconnection import connectToMySQL, MYSQL_DB
+
+
+@pytest.fixture(scope="session")
+def app():
+    app = create_app()
+    app.testing = True
+    return app
+
+
+@pytest.fixture(autouse=True)
+def base_limpia():
+    conexion = connectToMySQL(MYSQL_DB)
+    for tabla in ("usuarios_viajes", "viajes", "usuarios", "versiones"):
+        conexion.execute(f"DELETE FROM {tabla};")
+    conexion.execute("INSERT IGNORE INTO roles_viaje (id, nombre) VALUES (1, 'Organizador'), (2, 'Participante');")
+    cache.local.clear()
+    yield
+
+
+@pytest.fixture
+def crear_usuario():
+    def crear(nombre, apellido="pruebas"):
+        return connectToMySQL(MYSQL_DB).insert(
+            "INSERT INTO usuarios (nombre, apellido, email, password) VALUES (%s, %s, %s, %s);",
+            (nombre, apellido, f"{nombre}@pruebas.co", PASSWORD_HASH),
+        )
+    return crear
+
+
+@pytest.fixture
+def crear_viaje():
+    def crear(creado_por, titulo, fecha_inicio, fecha_fin, descripcion="descripción del viaje"):
+        return connectToMySQL(MYSQL_DB).insert(
+            "INSERT INTO viajes (titulo, descripcion, fecha_inicio, fecha_fin, creado_por)"
+            " VALUES (%s, %s, %s, %s, %s);",
+            (titulo, descripcion, fecha_inicio, fecha_fin, creado_por),
+        )
+    return crear
+
+
+@pytest.fixture
+def cliente(app):
+    """Cliente de pruebas con la sesión iniciada por el usuario indicado."""
+    def iniciar(usuario_id):
+        cliente = app.test_client()
+        with cliente.session_transaction() as sesion:
+            sesion['usuario_id'] = usuario_id
+        return cliente
+    return iniciar
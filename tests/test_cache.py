@@ -0,0 +1,58 @@
+import threading
+
+from app.config.cache import FALTA, BackendMemoria, Cache
+
+
+def test_lectura_a_traves_de_la_cache():
+    cache = Cache()
+    cargas = []
+    cargar = lambda: cargas.append(1) or "valor"
+    assert cache.obtener_o_cargar("clave", cargar) == "valor"
+    assert cache.obtener_o_cargar("clave", cargar) == "valor"
+    assert len(cargas) == 1
+
+
+def test_no_guarda_lo_cargado_antes_de_una_invalidacion():
+    # Una escritura de otro hilo invalida la clave mientras esta se carga
+    cache = Cache(BackendMemoria())
+
+    def cargar():
+        cache.invalidar("clave")
+        return "viejo"
+
+    assert cache.obtener_o_cargar("clave", cargar) == "viejo"
+    assert cache.local.get("clave") is FALTA
+    assert cache.backend.get("clave") is None
+    assert cache.obtener_o_cargar("clave", lambda: "nuevo") == "nuevo"
+    assert cache.get("clave") == "nuevo"
+
+
+def test_copia_local_corta():
+    cache = Cache(ttl=60, ttl_local=0)
+    cache.set("clave", "valor")
+    assert cache.get("clave") is FALTA
+
+
+def test_contadores_entre_hilos():
+    cache = Cache()
+    cache.set("clave", "valor")
+
+    def leer():
+        for _ in range(2000):
+            cache.get("clave")
+            cache.get("otra")
+
+    hilos = [threading.Thread(target=leer) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    estadisticas = cache.estadisticas()
+    assert estadisticas["aciertos"] == estadisticas["fallos"] == 8 * 2000
+    assert estadisticas["tasa_aciertos"] == 0.5
+
+
+def test_estadisticas_en_salud(app):
+    respuesta = app.test_client().get("/salud/lista")
+    assert respuesta.status_code == 200
+    assert {"aciertos", "fallos", "tasa_aciertos", "expulsiones"} <= set(respuesta.get_json()["cache"])
@@ -0,0 +1,100 @@
+# Viajes compatibles con la agenda (Viaje.obtener_compatibles, paginado por
+# cursor sobre los huecos de la agenda) y fechas solapadas (Viaje.conflictos),
+# comparados con el cálculo directo viaje contra viaje. Las fechas son
+# inclusivas: terminar el día en que otro empieza es solaparse.
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from app.models.viaje_model import Viaje
+
+INICIO = date(2026, 1, 1)
+
+
+@pytest.fixture
+def personas(crear_usuario):
+    return crear_usuario("ana"), crear_usuario("bob")
+
+
+def recorrer(usuario_id, limite):
+    # Todas las páginas siguiendo el cursor
+    viajes, despues = [], None
+    while True:
+        pagina, despues = Viaje.obtener_compatibles(usuario_id, despues=despues, limite=limite)
+        assert len(pagina) <= limite
+        viajes += pagina
+        if despues is None:
+            return [v.id for v in viajes]
+
+
+def esperados(agenda, todos):
+    # Viajes que no comparten ningún día con la agenda, en orden de (inicio, id)
+    libres = [
+        (inicio, viaje_id) for viaje_id, (inicio, fin) in todos.items()
+        if all(inicio > a_fin or fin < a_inicio for a_inicio, a_fin in agenda)
+    ]
+    return [viaje_id for _, viaje_id in sorted(libres)]
+
+
+def test_recorrido_por_paginas(personas, crear_usuario, crear_viaje):
+    ana, bob = personas
+    azar = random.Random(7)
+    todos = {}
+    for i in range(80):
+        inicio = INICIO + timedelta(days=azar.randint(0, 120))
+        fin = inicio + timedelta(days=azar.randint(0, 6))
+        todos[crear_viaje(bob, f"viaje {i}", inicio, fin)] = (inicio, fin)
+    agenda = []
+    for viaje_id in azar.sample(sorted(todos), 3):
+        assert Viaje.unir_usuario(ana, viaje_id) == Viaje.UNION_CREADA
+        agenda.append(todos[viaje_id])
+    for i in range(3):
+        inicio = INICIO + timedelta(days=20 + 35 * i)
+        fin = inicio + timedelta(days=4)
+        todos[crear_viaje(ana, f"propio {i}", inicio, fin)] = (inicio, fin)
+        agenda.append((inicio, fin))
+
+    ids = recorrer(ana, limite=7)
+    assert len(ids) > 7 * 2
+    assert ids == esperados(agenda, todos)
+    # Sin agenda, el único hueco abarca todos los viajes
+    assert recorrer(crear_usuario("eva"), limite=7) == esperados([], todos)
+
+
+def test_limites_inclusivos(personas, crear_viaje):
+    ana, bob = personas
+    propio = crear_viaje(ana, "propio", date(2026, 3, 10), date(2026, 3, 20))
+    termina_el_dia_que_empieza = crear_viaje(bob, "a", date(2026, 3, 5), date(2026, 3, 10))
+    empieza_el_dia_que_termina = crear_viaje(bob, "b", date(2026, 3, 20), date(2026, 3, 25))
+    dia_antes = crear_viaje(bob, "c", date(2026, 3, 1), date(2026, 3, 9))
+    dia_despues = crear_viaje(bob, "d", date(2026, 3, 21), date(2026, 3, 22))
+    cubre_todo = crear_viaje(bob, "e", date(2026, 3, 1), date(2026, 3, 31))
+
+    assert recorrer(ana, limite=10) == [dia_antes, dia_despues]
+    for viaje_id in (termina_el_dia_que_empieza, empieza_el_dia_que_termina, cubre_todo):
+        assert [v.id for v in Viaje.conflictos(ana, viaje_id)] == [propio]
+    for viaje_id in (dia_antes, dia_despues):
+        assert Viaje.conflictos(ana, viaje_id) == []
+
+
+def test_conflictos_con_viajes_unidos(personas, crear_viaje):
+    ana, bob = personas
+    propio = crear_viaje(ana, "propio", date(2026, 6, 1), date(2026, 6, 5))
+    unido = crear_viaje(bob, "unido", date(2026, 6, 4), date(2026, 6, 8))
+    assert Viaje.unir_usuario(ana, unido) == Viaje.UNION_CREADA
+    nuevo = crear_viaje(bob, "nuevo", date(2026, 6, 5), date(2026, 6, 6))
+    # Ordenados por fecha de inicio; el propio viaje consultado no se cuenta
+    assert [v.id for v in Viaje.conflictos(ana, nuevo)] == [propio, unido]
+    assert [v.id for v in Viaje.conflictos(ana, unido)] == [propio]
+
+
+def test_empates_de_fecha_entre_paginas(personas, crear_viaje):
+    ana, bob = personas
+    crear_viaje(ana, "propio", date(2026, 2, 1), date(2026, 2, 3))
+    empatados = [crear_viaje(bob, f"viaje {i}", date(2026, 4, 1), date(2026, 4, 2)) for i in range(5)]
+    despues = crear_viaje(bob, "despues", date(2026, 4, 2), date(2026, 4, 4))
+    # Con páginas de 2 el cursor cae en medio de los empates: ni se repiten ni se saltan
+    assert recorrer(ana, limite=2) == empatados + [despues]
+    pagina, cursor = Viaje.obtener_compatibles(ana, limite=2)
+    assert cursor == Viaje.crear_cursor(pagina[-1]) == f"2026-04-01_{empatados[1]}"
@@ -0,0 +1,103 @@
+# Consultas por petición (cabecera X-Consultas-DB, solo con app.testing): si
+# una página empieza a hacer consultas de más, estas pruebas lo detectan.
+from datetime import date
+
+import pytest
+
+from app.config.cache import cache
+from app.config.mysqlconnection import connectToMySQL, MYSQL_DB
+from app.models import versiones
+from app.models.viaje_model import Viaje
+
+
+@pytest.fixture
+def escenario(crear_usuario, crear_viaje):
+    ana, bob = crear_usuario("ana"), crear_usuario("bob")
+    paris = crear_viaje(ana, "paris", date(2026, 3, 1), date(2026, 3, 10))
+    lima = crear_viaje(bob, "lima", date(2026, 4, 1), date(2026, 4, 10))
+    crear_viaje(ana, "roma", date(2026, 5, 1), date(2026, 5, 10))
+    assert Viaje.unir_usuario(bob, paris) == Viaje.UNION_CREADA
+    return {"ana": ana, "bob": bob, "paris": paris, "lima": lima}
+
+
+def consultas(respuesta):
+    return int(respuesta.headers["X-Consultas-DB"])
+
+
+def test_dashboard(escenario, cliente):
+    c = cliente(escenario["bob"])
+    primera = c.get("/travels/")
+    assert primera.status_code == 200
+    # Versiones, usuario, agenda, disponibles y participantes
+    assert consultas(primera) == 5
+    # El usuario ya está en caché; la agenda y los disponibles no se cachean
+    assert consultas(c.get("/travels/")) == 4
+
+
+def test_dashboard_sin_cambios(escenario, cliente):
+    c = cliente(escenario["bob"])
+    etag = c.get("/travels/").headers["ETag"]
+    respuesta = c.get("/travels/", headers={"If-None-Match": etag})
+    assert respuesta.status_code == 304
+    # Solo la lectura de versiones
+    assert consultas(respuesta) == 1
+
+
+def test_detalle(escenario, cliente):
+    c = cliente(escenario["bob"])
+    ruta = f"/travels/detalle/{escenario['paris']}"
+    primera = c.get(ruta)
+    assert primera.status_code == 200
+    # Versiones, usuario, viaje, ids de participantes y sus filas
+    assert consultas(primera) == 5
+    # Viaje, usuarios y participantes salen de la caché
+    assert consultas(c.get(ruta)) == 1
+    respuesta = c.get(ruta, headers={"If-None-Match": primera.headers["ETag"]})
+    assert respuesta.status_code == 304
+    assert consultas(respuesta) == 1
+
+
+def test_detalle_sin_participantes(escenario, cliente):
+    # Sin participantes no se consultan sus filas; el organizador es el mismo
+    # usuario, que ya está en el mapa de identidad
+    respuesta = cliente(escenario["bob"]).get(f"/travels/detalle/{escenario['lima']}")
+    assert respuesta.status_code == 200
+    assert consultas(respuesta) == 4
+
+
+def test_unir_viaje(escenario, cliente):
+    # La unión en una sola sentencia, versiones y los conflictos
+    respuesta = cliente(escenario["ana"]).post(f"/travels/unir/{escenario['lima']}")
+    assert respuesta.status_code == 302
+    assert consultas(respuesta) == 3
+
+
+@pytest.mark.parametrize("ruta", ["/travels/", "/travels/detalle/{paris}"])
+def test_cuenta_eliminada(escenario, cliente, ruta):
+    # La sesión de una cuenta borrada se cierra en vez de fallar al renderizar
+    c = cliente(escenario["bob"])
+    connectToMySQL(MYSQL_DB).execute("DELETE FROM usuarios WHERE id = %(id)s;", {"id": escenario["bob"]})
+    cache.invalidar(f"usuario:{escenario['bob']}")
+    respuesta = c.get(ruta.format(paris=escenario["paris"]))
+    assert respuesta.status_code == 302
+    assert respuesta.headers["Location"] == "/"
+    with c.session_transaction() as sesion:
+        assert "usuario_id" not in sesion
+
+
+@pytest.mark.parametrize("ruta", ["/travels/", "/travels/detalle/{paris}"])
+def test_escritura_de_otro_worker(escenario, cliente, ruta):
+    # Otro proceso edita el viaje y sube las versiones, pero la caché local de
+    # este sigue con los datos de antes: el ETag nuevo no debe ir con ellos
+    c = cliente(escenario["bob"])
+    ruta = ruta.format(paris=escenario["paris"])
+    primera = c.get(ruta)
+    assert "Paris" in primera.get_data(as_text=True)
+    connectToMySQL(MYSQL_DB).execute(
+        "UPDATE viajes SET titulo = 'berlin' WHERE id = %(id)s;", {"id": escenario["paris"]}
+    )
+    versiones.incrementar("viajes", f"viaje:{escenario['paris']}")
+    respuesta = c.get(ruta, headers={"If-None-Match": primera.headers["ETag"]})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["ETag"] != primera.headers["ETag"]
+    assert "Berlin" in respuesta.get_data(as_text=True)
@@ -0,0 +1,49 @@
+import io
+from datetime import date
+
+import pytest
+
+import datos
+from app.models import versiones
+
+
+def importar(entidad, ruta, formato="csv", ignorar_duplicados=False):
+    return datos.importar(entidad, str(ruta), formato, 2, ignorar_duplicados, io.StringIO())
+
+
+def test_csv_con_solo_encabezado_se_valida(tmp_path):
+    archivo = tmp_path / "usuarios.csv"
+    archivo.write_text("nombre,apellido,email\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="password"):
+        importar("usuarios", archivo)
+
+
+def test_jsonl_vacio(tmp_path):
+    archivo = tmp_path / "usuarios.jsonl"
+    archivo.write_text("", encoding="utf-8")
+    assert importar("usuarios", archivo, "jsonl")[0] == 0
+
+
+def test_cuenta_solo_las_filas_insertadas(tmp_path):
+    archivo = tmp_path / "usuarios.csv"
+    archivo.write_text(
+        "nombre,apellido,email,password\n"
+        "ana,pruebas,ana@ejemplo.com,x\n"
+        "bob,pruebas,bob@ejemplo.com,x\n"
+        "ana,pruebas,ana@ejemplo.com,x\n",
+        encoding="utf-8",
+    )
+    assert importar("usuarios", archivo, ignorar_duplicados=True)[0] == 2
+    assert importar("usuarios", archivo, ignorar_duplicados=True)[0] == 0
+
+
+def test_sube_las_versiones(tmp_path, crear_usuario, crear_viaje):
+    ana, bob = crear_usuario("ana"), crear_usuario("bob")
+    viaje = crear_viaje(ana, "paris", date(2026, 3, 1), date(2026, 3, 10))
+    antes, _ = versiones.obtener("viajes", f"viaje:{viaje}")
+    archivo = tmp_path / "membresias.jsonl"
+    archivo.write_text(f'{{"usuario_id": {bob}, "viaje_id": {viaje}}}\n', encoding="utf-8")
+    assert importar("membresias", archivo, "jsonl")[0] == 1
+    despues, _ = versiones.obtener("viajes", f"viaje:{viaje}")
+    assert despues["viajes"] == antes["viajes"] + 1
+    assert despues[f"viaje:{viaje}"] == antes[f"viaje:{viaje}"] + 1
@@ -0,0 +1,93 @@
+# Eventos en vivo: el despliegue debe repartirlos entre todos los workers y la
+# página debe poder mostrarlos tal como llegan
+import http.client
+import json
+from datetime import date
+
+import pytest
+
+from app.config.eventos import eventos
+from app.config.servidor_eventos import ServidorEventos
+from app.models.viaje_model import Viaje
+
+
+def test_varios_workers_requieren_bus_compartido(monkeypatch):
+    assert ServidorEventos(bind="127.0.0.1:8001").comprobar_bus(1)
+    # Con el bus local y varios workers se desactivan en vez de perder eventos
+    servidor = ServidorEventos(bind="127.0.0.1:8001")
+    assert not servidor.comprobar_bus(4)
+    assert not servidor.habilitado
+    monkeypatch.setattr(eventos, "backend", object())
+    assert ServidorEventos(bind="127.0.0.1:8001").comprobar_bus(4)
+
+
+def test_edicion_con_el_titulo_de_la_pagina(crear_usuario, crear_viaje):
+    ana = crear_usuario("ana")
+    viaje = crear_viaje(ana, "paris", date(2026, 3, 1), date(2026, 3, 10))
+    recibidos = []
+    oyente = lambda canal, mensaje: recibidos.append(json.loads(mensaje))
+    eventos.escuchar(oyente)
+    try:
+        Viaje.actualizar_viaje(viaje, {
+            "titulo": "berlín en primavera", "descripcion": "otra descripción",
+            "fecha_inicio": "2026-04-01", "fecha_fin": "2026-04-10", "creado_por": ana,
+        })
+    finally:
+        eventos.dejar(oyente)
+    assert recibidos[-1]["tipo"] == "edicion"
+    assert recibidos[-1]["titulo"] == Viaje.obtener_por_id(viaje).titulo == "Berlín en primavera"
+
+
+@pytest.fixture
+def servidor(app):
+    # Servidor propio en un puerto libre, suscrito al bus como en un worker
+    servidor = ServidorEventos(bind="127.0.0.1:0")
+    servidor.configurar(app)
+    assert servidor.iniciar()
+    yield servidor
+    servidor.cerrar()
+
+
+def pedir(servidor, viaje, **cabeceras):
+    conexion = http.client.HTTPConnection(*servidor.direccion, timeout=5)
+    conexion.request("GET", f"/travels/eventos/{viaje}", headers=cabeceras)
+    return conexion.getresponse()
+
+
+def cookie_de(app, usuario_id):
+    valor = app.session_interface.get_signing_serializer(app).dumps({"usuario_id": usuario_id})
+    return f"{app.config['SESSION_COOKIE_NAME']}={valor}"
+
+
+def test_sin_sesion_valida(servidor, app):
+    assert pedir(servidor, 1).status == 401
+    assert pedir(servidor, 1, Cookie=f"{app.config['SESSION_COOKIE_NAME']}=alterada").status == 401
+    assert servidor.conexiones == 0
+
+
+def test_otro_origen(servidor, app):
+    respuesta = pedir(servidor, 1, Cookie=cookie_de(app, 1), Origin="https://otro.sitio", Host="127.0.0.1:8001")
+    assert respuesta.status == 403
+    assert respuesta.getheader("Access-Control-Allow-Origin") is None
+    # El mismo host en otro puerto (la aplicación sin proxy) sí puede
+    respuesta = pedir(servidor, 1, Cookie=cookie_de(app, 1), Origin="http://127.0.0.1:5014", Host="127.0.0.1:8001")
+    assert respuesta.status == 200
+    assert respuesta.getheader("Access-Control-Allow-Origin") == "http://127.0.0.1:5014"
+    respuesta.close()
+
+
+def test_union_llega_al_suscrito(servidor, app, crear_usuario, crear_viaje):
+    ana, bob = crear_usuario("ana"), crear_usuario("bob")
+    viaje = crear_viaje(ana, "paris", date(2026, 3, 1), date(2026, 3, 10))
+    respuesta = pedir(servidor, viaje, Cookie=cookie_de(app, ana))
+    assert respuesta.status == 200
+    assert respuesta.getheader("Content-Type").startswith("text/event-stream")
+    # La suscripción existe antes de enviar la cabecera
+    assert Viaje.unir_usuario(bob, viaje) == Viaje.UNION_CREADA
+    linea = respuesta.readline()
+    while not linea.startswith(b"data: "):
+        linea = respuesta.readline()
+    evento = json.loads(linea[len(b"data: "):])
+    assert evento["tipo"] == "union"
+    assert evento["usuario_id"] == bob
+    respuesta.close()
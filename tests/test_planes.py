@@ -0,0 +1,24 @@
+# Lo mismo que `python migrar.py --verificar`: ninguna búsqueda de viajes debe
+# recorrer la tabla completa
+from datetime import date, timedelta
+
+import migrar
+from app.config.mysqlconnection import connectToMySQL, MYSQL_DB
+
+
+def test_busquedas_usan_indices(crear_usuario):
+    creadores = [crear_usuario(f"creador{i}") for i in range(20)]
+    inicio = date.today() - timedelta(days=365)
+    filas = [
+        {"titulo": f"viaje {i}", "creado_por": creadores[i % len(creadores)],
+         "inicio": inicio + timedelta(days=i % 730), "fin": inicio + timedelta(days=i % 730 + 7)}
+        for i in range(2000)
+    ]
+    connectToMySQL(MYSQL_DB).execute_many(
+        "INSERT INTO viajes (titulo, descripcion, fecha_inicio, fecha_fin, creado_por)"
+        " VALUES (%(titulo)s, '', %(inicio)s, %(fin)s, %(creado_por)s);",
+        filas,
+    )
+    planes = migrar.planes_busqueda()
+    assert len(planes) == 3
+    assert [(nombre, completo) for nombre, completo in planes if completo is not None] == []
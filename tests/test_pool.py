@@ -0,0 +1,40 @@
+# Pool de conexiones de app/config/mysqlconnection.py
+from app.config.mysqlconnection import ConnectionPool, connectToMySQL, MYSQL_DB
+
+
+def contar_viajes(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) AS n FROM viajes;")
+        return cursor.fetchone()["n"]
+
+
+def test_reutiliza_conexiones():
+    pool = ConnectionPool(max_size=2)
+    primera = pool.obtener()
+    pool.devolver(primera)
+    assert pool.obtener() is primera
+    pool.devolver(primera)
+    assert pool.estadisticas()["creadas"] == 1
+    pool.cerrar()
+
+
+def test_transaccion_abierta_se_deshace_al_devolver(crear_usuario):
+    usuario_id = crear_usuario("ana")
+    pool = ConnectionPool(max_size=1)
+    connection = pool.obtener()
+    # BEGIN explícito con autocommit activado, sin commit
+    connection.begin()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO viajes (titulo, descripcion, fecha_inicio, fecha_fin, creado_por)"
+            " VALUES ('roma', 'sin confirmar', '2026-05-01', '2026-05-10', %s);",
+            (usuario_id,),
+        )
+    pool.devolver(connection)
+
+    reutilizada = pool.obtener()
+    assert reutilizada is connection
+    assert contar_viajes(reutilizada) == 0
+    pool.devolver(reutilizada)
+    pool.cerrar()
+    assert connectToMySQL(MYSQL_DB).fetch_row("SELECT COUNT(*) FROM viajes;")[0] == 0
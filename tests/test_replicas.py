@@ -0,0 +1,109 @@
+# Réplicas de lectura (app/config/mysqlconnection.py): reparto, lectura de lo
+# propio escrito y salida de la rotación. Las réplicas se simulan con el
+# sustituto SQLite, que cuenta las sentencias por servidor.
+import os
+from datetime import date
+
+import pytest
+
+from app.config import mysqlconnection
+from app.config.mysqlconnection import Replicas
+from app.models.viaje_model import Viaje
+from benchmarks import sqlite_mysql
+
+pytestmark = pytest.mark.skipif(
+    os.getenv("PRUEBAS_BACKEND", "sqlite") != "sqlite", reason="las réplicas se simulan con el sustituto SQLite"
+)
+
+PRIMARIA, REPLICA1, REPLICA2 = "primaria:3306", "replica1:3306", "replica2:3306"
+
+
+@pytest.fixture
+def replicas(monkeypatch):
+    conjunto = Replicas([("replica1", 3306), ("replica2", 3306)])
+    monkeypatch.setattr(mysqlconnection, "replicas", conjunto)
+    yield conjunto
+    sqlite_mysql.caidos.clear()
+    sqlite_mysql.retrasos.clear()
+    conjunto.cerrar()
+
+
+@pytest.fixture
+def escenario(crear_usuario, crear_viaje):
+    ana, bob = crear_usuario("ana"), crear_usuario("bob")
+    paris = crear_viaje(ana, "paris", date(2026, 3, 1), date(2026, 3, 10))
+    return {"ana": ana, "bob": bob, "paris": paris}
+
+
+def servidores(c, metodo, ruta):
+    # Servidores que recibieron sentencias durante la petición
+    sqlite_mysql.sentencias_por_servidor.clear()
+    respuesta = getattr(c, metodo)(ruta)
+    assert respuesta.status_code in (200, 302)
+    return {s for s, n in sqlite_mysql.sentencias_por_servidor.items() if n}
+
+
+def test_reparto_round_robin(replicas, escenario, cliente):
+    c = cliente(escenario["bob"])
+    ruta = f"/travels/detalle/{escenario['paris']}"
+    # Cada petición lee de una sola réplica, por turnos
+    assert [servidores(c, "get", ruta) for _ in range(4)] == [{REPLICA1}, {REPLICA2}, {REPLICA1}, {REPLICA2}]
+
+
+def test_lee_lo_propio_escrito(replicas, escenario, cliente):
+    c = cliente(escenario["bob"])
+    ruta = f"/travels/detalle/{escenario['paris']}"
+    assert servidores(c, "post", f"/travels/unir/{escenario['paris']}") == {PRIMARIA}
+    with c.session_transaction() as sesion:
+        assert "_leer_primaria_hasta" in sesion
+    # La página siguiente ya muestra la unión: sale de la primaria
+    assert servidores(c, "get", ruta) == {PRIMARIA}
+
+
+def test_escritura_sin_cambios_no_desvia(replicas, escenario, cliente):
+    assert Viaje.unir_usuario(escenario["bob"], escenario["paris"]) == Viaje.UNION_CREADA
+    # Unirse otra vez no cambia filas: las lecturas siguen en las réplicas
+    c = cliente(escenario["bob"])
+    servidores(c, "post", f"/travels/unir/{escenario['paris']}")
+    with c.session_transaction() as sesion:
+        assert "_leer_primaria_hasta" not in sesion
+    assert servidores(c, "get", f"/travels/detalle/{escenario['paris']}") <= {REPLICA1, REPLICA2}
+
+
+def test_replica_caida_durante_la_consulta(replicas, escenario, cliente):
+    c = cliente(escenario["bob"])
+    ruta = f"/travels/detalle/{escenario['paris']}"
+    servidores(c, "get", ruta)
+    servidores(c, "get", ruta)
+    # replica1 tiene una conexión libre en su pool y se cae: la consulta se
+    # repite en la primaria, la conexión se descarta y la réplica sale de la rotación
+    sqlite_mysql.caidos.add(REPLICA1)
+    assert REPLICA1 not in servidores(c, "get", ruta)
+    replica1 = replicas.lista[0]
+    assert not replica1.disponible()
+    assert replica1.fallos == 1
+    assert replica1.pool.estadisticas()["libres"] == replica1.pool.estadisticas()["en_uso"] == 0
+    assert [servidores(c, "get", ruta) for _ in range(2)] == [{REPLICA2}, {REPLICA2}]
+
+
+def test_replica_que_no_acepta_conexiones(replicas, escenario, cliente):
+    sqlite_mysql.caidos.add(REPLICA1)
+    c = cliente(escenario["bob"])
+    ruta = f"/travels/detalle/{escenario['paris']}"
+    assert REPLICA1 not in servidores(c, "get", ruta)
+    assert not replicas.lista[0].disponible()
+    assert servidores(c, "get", ruta) == {REPLICA2}
+
+
+def test_replica_atrasada_sale_de_la_rotacion(replicas, escenario, cliente):
+    # replica2 está dentro de MYSQL_REPLICA_MAX_RETRASO; replica1 no
+    sqlite_mysql.retrasos.update({REPLICA1: 60, REPLICA2: 2})
+    c = cliente(escenario["bob"])
+    ruta = f"/travels/detalle/{escenario['paris']}"
+    servidores(c, "get", ruta)
+    replica1, replica2 = replicas.lista
+    assert replica1.retraso == 60
+    assert not replica1.disponible()
+    assert [servidores(c, "get", ruta) for _ in range(2)] == [{REPLICA2}, {REPLICA2}]
+    assert replica2.retraso == 2
+    assert replica2.disponible()
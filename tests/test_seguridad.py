@@ -0,0 +1,48 @@
+# bcrypt en el pool de procesos de app/config/seguridad.py
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.config import seguridad
+from app.config.seguridad import HashingSobrecargadoError
+
+
+def test_hash_y_verificacion():
+    password_hash = seguridad.hashear_password("12345678")
+    assert seguridad.verificar_password("12345678", password_hash)
+    assert not seguridad.verificar_password("otra cosa", password_hash)
+
+
+def test_hash_desde_varios_hilos():
+    # Los procesos de bcrypt salen de un forkserver, no de un fork del worker
+    # con hilos, así que el pool arranca aunque haya peticiones concurrentes
+    with ThreadPoolExecutor(max_workers=min(4, seguridad.BCRYPT_MAX_PENDIENTES)) as hilos:
+        hashes = list(hilos.map(seguridad.hashear_password, ["12345678"] * 16))
+    assert all(seguridad.verificar_password("12345678", h) for h in hashes)
+    assert os.getpid() not in {seguridad._ejecutar(os.getpid) for _ in range(4)}
+
+
+def test_espera_vencida_es_sobrecarga(monkeypatch):
+    monkeypatch.setattr(seguridad, "BCRYPT_TIMEOUT", 0.05)
+    with pytest.raises(HashingSobrecargadoError):
+        seguridad._ejecutar(time.sleep, 1)
+
+
+def test_pool_roto_se_reemplaza():
+    # El proceso que corre la tarea muere: la petición recibe 503, no 500
+    with pytest.raises(HashingSobrecargadoError):
+        seguridad._ejecutar(os._exit, 1)
+    assert seguridad.verificar_password("12345678", seguridad.hashear_password("12345678"))
+
+
+def test_registro_con_pool_roto_responde_503(app, monkeypatch):
+    def roto(password):
+        return seguridad._ejecutar(os._exit, 1)
+
+    monkeypatch.setattr("app.controllers.usuarios.hashear_password", roto)
+    respuesta = app.test_client().post("/usuarios/procesar_registro", data=dict(
+        nombre="ana", apellido="lopez", email="ana@pruebas.co", password="12345678", confirm_password="12345678",
+    ))
+    assert respuesta.status_code == 503
@@ -0,0 +1,22 @@
+from datetime import date
+
+from app.config import sentencias
+from app.config.mysqlconnection import pool
+from app.models.viaje_model import CONSULTA_POR_ID
+
+
+def test_vuelve_a_preparar_si_el_servidor_la_olvido(monkeypatch, crear_usuario, crear_viaje):
+    viaje = crear_viaje(crear_usuario("ana"), "paris", date(2026, 3, 1), date(2026, 3, 10))
+    monkeypatch.setattr(sentencias, "MYSQL_PREPARAR", True)
+    conexion = pool.obtener()
+    try:
+        with conexion.cursor() as cursor:
+            sentencias.enviar_sentencia(conexion, cursor, CONSULTA_POR_ID, {"id": viaje})
+            assert cursor.fetchall()[0]["id"] == viaje
+            assert CONSULTA_POR_ID.nombre in sentencias.preparadas_de(conexion)
+            # La conexión cree tenerla preparada, pero el servidor ya no (error 1243)
+            cursor.execute("DEALLOCATE PREPARE s_viaje_por_id;")
+            sentencias.enviar_sentencia(conexion, cursor, CONSULTA_POR_ID, {"id": viaje})
+            assert cursor.fetchall()[0]["id"] == viaje
+    finally:
+        pool.devolver(conexion)
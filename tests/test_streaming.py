@@ -0,0 +1,57 @@
+# Dashboard en streaming (DASHBOARD_STREAMING=1): la agenda se lee con un
+# cursor del lado del servidor sobre la conexión de la petición mientras se
+# envía la página, y esa conexión debe volver al pool al terminar o al cortarse.
+from datetime import date, timedelta
+
+import pytest
+
+from app.config.mysqlconnection import pool
+from app.controllers import viajes
+
+NUM_VIAJES = 80
+
+
+@pytest.fixture
+def agenda_grande(monkeypatch, crear_usuario, crear_viaje):
+    monkeypatch.setattr(viajes, "DASHBOARD_STREAMING", True)
+    ana = crear_usuario("ana")
+    inicio = date(2026, 1, 1)
+    for i in range(NUM_VIAJES):
+        crear_viaje(ana, f"destino{i}", inicio + timedelta(days=i), inicio + timedelta(days=i + 1))
+    return ana
+
+
+def en_uso():
+    return pool.estadisticas()["en_uso"]
+
+
+def test_agenda_completa_y_mensajes(agenda_grande, cliente):
+    c = cliente(agenda_grande)
+    with c.session_transaction() as sesion:
+        sesion["_flashes"] = [("exito", "¡Viaje creado exitosamente!")]
+    antes = en_uso()
+    respuesta = c.get("/travels/")
+    cuerpo = respuesta.get_data(as_text=True)
+    assert respuesta.status_code == 200
+    assert all(f"Destino{i}" in cuerpo for i in range(NUM_VIAJES))
+    assert "¡Viaje creado exitosamente!" in cuerpo
+    # El mensaje se consumió: la cookie enviada antes del cuerpo ya no lo tiene
+    with c.session_transaction() as sesion:
+        assert "_flashes" not in sesion
+    assert en_uso() == antes
+
+
+def test_conexion_liberada_al_cortar(agenda_grande, cliente):
+    c = cliente(agenda_grande)
+    antes = en_uso()
+    respuesta = c.get("/travels/", buffered=False)
+    partes = iter(respuesta.response)
+    # Se lee hasta la primera fila de la agenda: el cursor queda abierto
+    recibido = ""
+    while "Destino0" not in recibido:
+        recibido += next(partes).decode()
+    assert f"Destino{NUM_VIAJES - 1}" not in recibido
+    assert en_uso() == antes + 1
+    # El cliente se desconecta a mitad de la agenda
+    respuesta.close()
+    assert en_uso() == antes
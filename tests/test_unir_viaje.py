@@ -0,0 +1,86 @@
+# Unión a un viaje en una sola sentencia (Viaje.unir_usuario): el resultado se
+# deduce de las filas afectadas y de LAST_INSERT_ID. Con PRUEBAS_BACKEND=mysql
+# se comprueba contra el servidor real.
+from datetime import date
+
+import pymysql
+import pytest
+from pymysql.constants import CLIENT
+
+from app.config.mysqlconnection import ConnectionPool, connectToMySQL, MYSQL_DB
+from app.models.viaje_model import Viaje
+
+
+@pytest.fixture
+def viaje(crear_usuario, crear_viaje):
+    ana = crear_usuario("ana")
+    return crear_viaje(ana, "paris", date(2026, 3, 1), date(2026, 3, 10)), ana
+
+
+def uniones(usuario_id, viaje_id):
+    fila = connectToMySQL(MYSQL_DB).fetch_row(
+        "SELECT COUNT(*) FROM usuarios_viajes WHERE usuario_id = %s AND viaje_id = %s;", (usuario_id, viaje_id)
+    )
+    return fila[0]
+
+
+def test_union_nueva(viaje, crear_usuario):
+    viaje_id, _ = viaje
+    bob = crear_usuario("bob")
+    assert Viaje.unir_usuario(bob, viaje_id) == Viaje.UNION_CREADA
+    assert uniones(bob, viaje_id) == 1
+
+
+def test_union_repetida(viaje, crear_usuario):
+    viaje_id, _ = viaje
+    bob = crear_usuario("bob")
+    Viaje.unir_usuario(bob, viaje_id)
+    assert Viaje.unir_usuario(bob, viaje_id) == Viaje.UNION_EXISTENTE
+    assert uniones(bob, viaje_id) == 1
+
+
+def test_viaje_inexistente(viaje, crear_usuario):
+    viaje_id, _ = viaje
+    bob = crear_usuario("bob")
+    assert Viaje.unir_usuario(bob, viaje_id + 1000) == Viaje.VIAJE_NO_DISPONIBLE
+    assert uniones(bob, viaje_id + 1000) == 0
+
+
+def test_viaje_propio(viaje):
+    viaje_id, ana = viaje
+    assert Viaje.unir_usuario(ana, viaje_id) == Viaje.VIAJE_NO_DISPONIBLE
+    assert uniones(ana, viaje_id) == 0
+
+
+def test_union_existente_de_otro_usuario_no_confunde(viaje, crear_usuario):
+    # LAST_INSERT_ID de la unión de otro usuario no debe leerse como "ya unido"
+    viaje_id, _ = viaje
+    bob, eva = crear_usuario("bob"), crear_usuario("eva")
+    Viaje.unir_usuario(bob, viaje_id)
+    assert Viaje.unir_usuario(eva, viaje_id) == Viaje.UNION_CREADA
+
+
+def test_salir(viaje, crear_usuario):
+    viaje_id, _ = viaje
+    bob = crear_usuario("bob")
+    Viaje.unir_usuario(bob, viaje_id)
+    assert Viaje.salir_usuario(bob, viaje_id) == 1
+    assert Viaje.salir_usuario(bob, viaje_id) == 0
+
+
+def test_conexiones_sin_found_rows(monkeypatch):
+    # unir_usuario reconoce la unión repetida porque el UPDATE sin cambios
+    # afecta 0 filas; con CLIENT_FOUND_ROWS contaría 1 y parecería nueva
+    recibidos = {}
+    conectar = pymysql.connect
+
+    def conectar_registrando(**kwargs):
+        recibidos.update(kwargs)
+        return conectar(**kwargs)
+
+    monkeypatch.setattr(pymysql, "connect", conectar_registrando)
+    pool = ConnectionPool(max_size=1)
+    pool.devolver(pool.obtener())
+    pool.cerrar()
+    assert recibidos
+    assert not recibidos.get("client_flag", 0) & CLIENT.FOUND_ROWS